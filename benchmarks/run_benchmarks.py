@@ -0,0 +1,273 @@
+"""
+Benchmarks for the engine's hot paths, runnable without the trained pickles.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --output new.json --baseline bench.json --tolerance 0.25
+
+Each benchmark reports `seconds` (best of --repeats, lower is better) plus derived
+latency/throughput figures. With --baseline, any benchmark slower than
+baseline x (1 + tolerance) is flagged and the exit code is 1.
+"""
+import os
+import sys
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)  # Ensure src/ and benchmarks/ are importable
+
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from benchmarks.standin_models import build_standin_models, make_applicants, make_prosper_csv
+from src.pricing_engine import LoanPricingEngine
+from src.pricing_surface import PricingSurface
+from src.monitor_util import calculate_psi, check_drift
+from src.sythetic_data_generator import generate_synthetic_data
+
+RESULTS_FORMAT = 1
+
+# Problem sizes: (full, --quick)
+SIZES = {
+    'single_quotes': (500, 100),
+    'surface_lookups': (20000, 2000),
+    'batch_small': (1000, 1000),
+    'batch_large': (100000, 20000),
+    'psi_rows': (5000000, 500000),
+    'drift_rows': (1000000, 100000),
+    'synthetic_loans': (50000, 5000),
+}
+
+
+def best_of(fn, repeats):
+    """Runs fn() `repeats` times; returns (best seconds, last return value)."""
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench_single_quote(ctx, repeats):
+    engine = ctx['engine']
+    applicants = make_applicants(ctx['sizes']['single_quotes'], seed=1).to_dict('records')
+    engine.get_optimal_rate(applicants[0])  # warm-up
+
+    latencies = []
+    for applicant in applicants:
+        started = time.perf_counter()
+        engine.get_optimal_rate(applicant)
+        latencies.append(time.perf_counter() - started)
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'seconds': float(np.median(latencies)),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'quotes': len(applicants),
+    }
+
+
+def bench_surface_lookup(ctx, repeats):
+    engine = ctx['engine']
+    surface = PricingSurface.build(engine, validation_points=2000)
+    applicants = make_applicants(ctx['sizes']['surface_lookups'], seed=1)
+    pds = engine._predict_pd_batch(applicants).tolist()
+    quotes = list(zip(pds, applicants['risk_score_norm'].tolist(), applicants['LoanOriginalAmount'].tolist(),
+                      applicants['term_years'].tolist()))
+    sources = [surface.lookup(*quote)['source'] for quote in quotes]  # warm-up (builds the cof slice)
+
+    # Time interpolated quotes only (not the PD pre-check rejects or exact fallbacks)
+    max_pd = engine.policy_config['MAX_PD_THRESHOLD']
+    served = [quote for quote, source in zip(quotes, sources) if source == 'surface' and quote[0] <= max_pd]
+    latencies = []
+    for quote in served:
+        started = time.perf_counter()
+        surface.lookup(*quote)
+        latencies.append(time.perf_counter() - started)
+    latencies_us = np.array(latencies) * 1e6
+    return {
+        'seconds': float(np.median(latencies)),
+        'p50_us': float(np.percentile(latencies_us, 50)),
+        'p99_us': float(np.percentile(latencies_us, 99)),
+        'interpolated_fraction': len(served) / len(quotes),
+        'max_rate_error': surface.error_bound['max_rate_error'],
+    }
+
+
+def _bench_batch(ctx, repeats, size_key):
+    engine = ctx['engine']
+    applicants = make_applicants(ctx['sizes'][size_key], seed=2)
+    engine.get_optimal_rates(applicants.head(100))  # warm-up
+    seconds, _ = best_of(lambda: engine.get_optimal_rates(applicants), repeats)
+    return {'seconds': seconds, 'applicants': len(applicants), 'throughput_per_s': len(applicants) / seconds}
+
+
+def bench_batch_small(ctx, repeats):
+    return _bench_batch(ctx, repeats, 'batch_small')
+
+
+def bench_batch_large(ctx, repeats):
+    return _bench_batch(ctx, repeats, 'batch_large')
+
+
+def bench_calculate_psi(ctx, repeats):
+    rng = np.random.default_rng(3)
+    n = ctx['sizes']['psi_rows']
+    expected, actual = rng.normal(0, 1, n), rng.normal(0.1, 1.1, n)
+    seconds, psi = best_of(lambda: calculate_psi(expected, actual), repeats)
+    return {'seconds': seconds, 'rows': n, 'psi': float(psi)}
+
+
+def bench_check_drift(ctx, repeats):
+    rng = np.random.default_rng(4)
+    n = ctx['sizes']['drift_rows']
+    features = ['risk_score_norm', 'annual_inc', 'dti', 'revol_util', 'total_acc', 'LoanOriginalAmount']
+    train_df = pd.DataFrame({feat: rng.gamma(2.0, 1.0, n) for feat in features})
+    prod_df = pd.DataFrame({feat: rng.gamma(2.2, 1.0, n) for feat in features})
+    seconds, _ = best_of(lambda: check_drift(train_df, prod_df, features), repeats)
+    return {'seconds': seconds, 'rows': n, 'features': len(features)}
+
+
+def bench_synthetic_generation(ctx, repeats):
+    n = ctx['sizes']['synthetic_loans']
+    input_path = make_prosper_csv(os.path.join(ctx['workdir'], 'prosper.csv'), n, seed=5)
+    output_path = os.path.join(ctx['workdir'], 'synthetic.parquet')
+    seconds, stats = best_of(lambda: generate_synthetic_data(input_path, output_path, seed=42), repeats)
+    return {'seconds': seconds, 'input_rows': n, 'output_rows': stats['rows'],
+            'rows_per_s': stats['rows'] / seconds}
+
+
+BENCHMARKS = {
+    'single_quote_latency': bench_single_quote,
+    'surface_lookup_latency': bench_surface_lookup,
+    'batch_1k': bench_batch_small,
+    'batch_100k': bench_batch_large,
+    'calculate_psi': bench_calculate_psi,
+    'check_drift': bench_check_drift,
+    'synthetic_generation': bench_synthetic_generation,
+}
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'format': RESULTS_FORMAT,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(names=None, quick=False, repeats=3, models_dir=None, optimizer='grid'):
+    """
+    Runs the selected benchmarks (all by default) and returns the results dict that is saved as JSON.
+    Uses the pickles in `models_dir` when given, otherwise trains the stand-in models in a temp dir.
+    """
+    names = names or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {sorted(unknown)}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        if models_dir:
+            risk_path = os.path.join(models_dir, 'risk_model_xgb.pkl')
+            elasticity_path = os.path.join(models_dir, 'elasticity_model_logit.pkl')
+        else:
+            risk_path, elasticity_path = build_standin_models(os.path.join(workdir, 'models'))
+
+        ctx = {
+            'engine': LoanPricingEngine(risk_path, elasticity_path, optimizer=optimizer),
+            'sizes': {key: sizes[1 if quick else 0] for key, sizes in SIZES.items()},
+            'workdir': workdir,
+        }
+
+        results = {}
+        for name in names:
+            print(f"⏱️  {name}...", end=' ', flush=True)
+            results[name] = BENCHMARKS[name](ctx, repeats)
+            print(f"{results[name]['seconds'] * 1000:.2f} ms")
+
+    meta = environment_info()
+    meta.update({'quick': quick, 'repeats': repeats, 'optimizer': optimizer,
+                 'models': models_dir or 'stand-in'})
+    return {'meta': meta, 'results': results}
+
+
+def compare(current, baseline, tolerance=0.25):
+    """
+    Compares `seconds` per benchmark against a baseline results dict.
+    Returns a list of rows; `regression` is True when current > baseline x (1 + tolerance).
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        ratio = result['seconds'] / base['seconds'] if base['seconds'] > 0 else float('inf')
+        rows.append({
+            'benchmark': name,
+            'baseline_s': base['seconds'],
+            'current_s': result['seconds'],
+            'ratio': ratio,
+            'regression': ratio > 1 + tolerance,
+        })
+    return rows
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Adaptive Loan Pricing Engine - Benchmarks')
+    parser.add_argument('--output', default=None, help='Where to write the results JSON')
+    parser.add_argument('--baseline', default=None, help='Results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown vs baseline before flagging (0.25 = 25%%)')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=None)
+    parser.add_argument('--quick', action='store_true', help='Smaller problem sizes (smoke run)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--models-dir', default=None,
+                        help='Benchmark the real pickles in this directory instead of the stand-ins')
+    parser.add_argument('--optimizer', choices=['grid', 'continuous'], default='grid')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    current = run_benchmarks(args.only, quick=args.quick, repeats=args.repeats, models_dir=args.models_dir,
+                             optimizer=args.optimizer)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=4)
+        print(f"\n✅ Results saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('quick') != args.quick:
+            print("⚠️ Baseline was recorded with different problem sizes (--quick); ratios are not comparable.")
+
+        rows = compare(current, baseline, args.tolerance)
+        print(f"\n=== Comparison vs {args.baseline} (tolerance {args.tolerance:.0%}) ===")
+        for row in rows:
+            flag = "❌ REGRESSION" if row['regression'] else "✅"
+            print(f"{row['benchmark']:<22} {row['baseline_s'] * 1000:>10.2f} ms -> "
+                  f"{row['current_s'] * 1000:>10.2f} ms  x{row['ratio']:.2f}  {flag}")
+
+        if any(row['regression'] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
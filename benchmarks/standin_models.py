@@ -0,0 +1,128 @@
+"""
+Tiny, deterministic stand-ins for models/risk_model_xgb.pkl and models/elasticity_model_logit.pkl.
+
+The trained pickles are not in the repo. These have the feature names and parameter names
+the engine expects, so every code path (pickle load, artifacts, batch pricing) can run
+anywhere. Their predictions are only plausible, not meaningful: use them for timing,
+never for business numbers.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# Subset of the Lending Club features the real booster is trained on (notebook 04); the engine
+# scores any booster feature missing from an applicant as 0, as it does in production
+RISK_FEATURES = [
+    'loan_amnt', 'term_years', 'annual_inc', 'dti', 'revol_util', 'total_acc',
+    'risk_score_norm', 'loan_to_income', 'inq_last_6mths', 'emp_length',
+    'home_ownership_RENT', 'purpose_debt_consolidation',
+]
+
+ELASTICITY_COLUMNS = ['const', 'risk_score_norm', 'Rate_Subprime', 'Rate_NearPrime', 'Rate_Prime',
+                      'LoanOriginalAmount']
+
+
+def _risk_training_set(rng, n):
+    X = pd.DataFrame({
+        'loan_amnt': rng.uniform(1000, 40000, n),
+        'term_years': rng.choice([3, 5], n),
+        'annual_inc': rng.uniform(20000, 200000, n),
+        'dti': rng.uniform(0, 1, n),
+        'revol_util': rng.uniform(0, 100, n),
+        'total_acc': rng.integers(1, 50, n),
+        'risk_score_norm': rng.uniform(0, 1, n),
+        'inq_last_6mths': rng.integers(0, 6, n),
+        'emp_length': rng.integers(0, 11, n),
+        'home_ownership_RENT': rng.integers(0, 2, n),
+        'purpose_debt_consolidation': rng.integers(0, 2, n),
+    })
+    X['loan_to_income'] = X['loan_amnt'] / X['annual_inc']
+    logit = -2.5 - 3 * (X['risk_score_norm'] - 0.5) + 2 * X['dti'] + 0.3 * X['term_years'] + 0.1 * X['inq_last_6mths']
+    y = (rng.uniform(size=n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return X[RISK_FEATURES], y
+
+
+def _elasticity_training_set(rng, n):
+    E = pd.DataFrame({'const': 1.0, 'risk_score_norm': rng.uniform(0, 1, n)})
+    rates = rng.uniform(0.05, 0.40, n)
+    segment = np.digitize(E['risk_score_norm'], [0.4, 0.75], right=True)
+    E['Rate_Subprime'] = rates * (segment == 0)
+    E['Rate_NearPrime'] = rates * (segment == 1)
+    E['Rate_Prime'] = rates * (segment == 2)
+    E['LoanOriginalAmount'] = rng.uniform(1000, 40000, n)
+    logit = (3 - 12 * E['Rate_Subprime'] - 15 * E['Rate_NearPrime'] - 20 * E['Rate_Prime']
+             + 0.5 * E['risk_score_norm'] - 1e-5 * E['LoanOriginalAmount'])
+    accepted = (rng.uniform(size=n) < 1 / (1 + np.exp(-logit))).astype(int)
+    return E[ELASTICITY_COLUMNS], accepted
+
+
+def build_standin_models(out_dir, seed=0, n_samples=4000, n_estimators=30, max_depth=3):
+    """
+    Trains the stand-in XGBClassifier and statsmodels Logit and pickles them into `out_dir`
+    under the production file names. Returns (risk_model_path, elasticity_model_path).
+    """
+    import joblib
+    import statsmodels.api as sm
+    import xgboost as xgb
+
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    X, y = _risk_training_set(rng, n_samples)
+    risk_model = xgb.XGBClassifier(n_estimators=n_estimators, max_depth=max_depth, random_state=seed,
+                                   n_jobs=1, tree_method='hist')
+    risk_model.fit(X, y)
+    risk_model_path = os.path.join(out_dir, 'risk_model_xgb.pkl')
+    joblib.dump(risk_model, risk_model_path)
+
+    E, accepted = _elasticity_training_set(rng, n_samples)
+    elasticity_model = sm.Logit(accepted, E).fit(disp=0)
+    elasticity_model_path = os.path.join(out_dir, 'elasticity_model_logit.pkl')
+    joblib.dump(elasticity_model, elasticity_model_path)
+
+    return risk_model_path, elasticity_model_path
+
+
+def make_applicants(n, seed=0):
+    """Random applicants with the fields the engine reads (see pricing_service.build_applicant_data)."""
+    rng = np.random.default_rng(seed)
+    applicants = pd.DataFrame({
+        'risk_score_norm': rng.uniform(0.1, 1.0, n),
+        'annual_inc': rng.uniform(20000, 200000, n),
+        'LoanOriginalAmount': rng.uniform(1000, 40000, n),
+        'dti': rng.uniform(0, 0.6, n),
+        'revol_util': rng.uniform(0, 100, n),
+        'inq_last_6mths': rng.integers(0, 6, n),
+        'total_acc': rng.integers(1, 50, n),
+        'term_years': rng.choice([3, 5], n),
+        'emp_length': 5,
+        'home_ownership_RENT': rng.integers(0, 2, n),
+        'purpose_debt_consolidation': 1,
+    })
+    applicants['loan_amnt'] = applicants['LoanOriginalAmount']
+    applicants['loan_to_income'] = applicants['loan_amnt'] / applicants['annual_inc']
+    return applicants
+
+
+def make_prosper_csv(path, n, seed=0, extra_columns=60):
+    """
+    A Prosper-shaped CSV (the kept columns plus `extra_columns` of filler, like the ~80 column
+    original) for timing the synthetic data generator.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({f'Filler{i}': rng.random(n) for i in range(extra_columns)})
+    df['LoanStatus'] = rng.choice(['Completed', 'Current', 'Chargedoff', 'Defaulted'], n)
+    df['BorrowerRate'] = rng.uniform(0.05, 0.35, n)
+    df['LoanOriginalAmount'] = rng.integers(1000, 35000, n)
+    df['Term'] = rng.choice([12, 36, 60], n)
+    df['ProsperScore'] = np.where(rng.random(n) < 0.2, np.nan, rng.integers(1, 12, n))
+    df['CreditScoreRangeLower'] = rng.choice([600.0, 640.0, 700.0, 760.0], n)
+    df['DebtToIncomeRatio'] = rng.uniform(0, 1, n)
+    df['StatedMonthlyIncome'] = rng.uniform(1000, 20000, n)
+    df['EmploymentStatus'] = rng.choice(['Employed', 'Self-employed', 'Other'], n)
+    df['IsBorrowerHomeowner'] = rng.choice([True, False], n)
+    df['FirstRecordedCreditLine'] = '2001-01-01 00:00:00'
+    df['ListingCreationDate'] = '2010-05-01 00:00:00'
+    df.to_csv(path, index=False)
+    return path
@@ -0,0 +1,490 @@
+"""
+Decision audit log: every priced decision, kept for fair-lending audits.
+
+    audit = AuditSink('audit/')
+    engine = LoanPricingEngine(..., audit=audit)
+    ...
+    audit.flush()                                            # wait until everything queued is on disk
+    read_audit('audit/', start='2026-10-01', end='2026-10-08',
+               segments=['Subprime'], decisions=['REJECT_RISK'])  # DataFrame of matching decisions
+    audit.close()
+
+The pricing path only appends a reference to the result (a Quote or QuoteBatch) to a bounded
+in-memory buffer. A background thread turns the buffered results into one Arrow record batch per
+flush and appends it to the current segment file, an Arrow IPC stream:
+
+    audit/audit-<first ns>.open.arrows            the segment being written (readable while open)
+    audit/audit-<first ns>-<last ns>.arrows       sealed segments, never written again
+
+A segment is sealed after `segment_rows` records or `segment_seconds`. Each record batch carries
+its time range and the decisions / segments it contains as metadata, so filtered reads skip
+whole files (by name) and whole batches (by metadata) before touching any column.
+
+When the buffer is full, policy='block' makes the pricing call wait (up to `block_timeout`
+seconds, then the records are dropped) and policy='drop' drops them at once; drops are counted
+in stats(). One sink per directory.
+
+    python src/audit_log.py audit/ --start 2026-10-01 --segment Subprime --decision REJECT_RISK --output rejects.csv
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import argparse
+import atexit
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+try:
+    from src.engine_metrics import DECISIONS, SEGMENTS
+    from src.pricing_results import notes_from_flags
+except ImportError:
+    from engine_metrics import DECISIONS, SEGMENTS
+    from pricing_results import notes_from_flags
+
+AUDIT_VERSION = 1
+PREFIX = 'audit-'
+SOURCES = ('single', 'batch')  # the engine entry point, as in EngineMetrics paths
+
+SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('ns', tz='UTC')),
+    ('source', pa.uint8()),          # index into SOURCES
+    ('applicant', pa.string()),      # the batch row's index label; null for single quotes
+    ('decision', pa.uint8()),        # index into DECISIONS
+    ('risk_segment', pa.uint8()),    # index into SEGMENTS
+    ('optimal_rate', pa.float64()),
+    ('max_profit', pa.float64()),
+    ('prob_default', pa.float64()),
+    ('policy_notes', pa.string()),   # '; '-joined
+    ('pd_multiplier', pa.float64()),
+    ('cost_of_funds', pa.float64()),
+], metadata={b'audit_version': str(AUDIT_VERSION).encode()})
+
+_SEGMENT_FILE = re.compile(re.escape(PREFIX) + r'(\d+)(?:-(\d+)|\.open)\.arrows$')
+_NOTES_SEPARATOR = '; '
+
+
+def _to_ns(value):
+    """A time bound (ns int, datetime, Timestamp or string; naive means UTC) -> ns since the epoch."""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    ts = pd.Timestamp(value)
+    return (ts.tz_localize('UTC') if ts.tzinfo is None else ts).value
+
+
+def _bitmask(codes):
+    return int(np.bitwise_or.reduce(np.left_shift(1, np.unique(codes).astype(np.int64)))) if len(codes) else 0
+
+
+def _wanted_mask(labels, names, kind):
+    """Labels -> (bitmask, code array) for a decisions / segments filter; None means no filter."""
+    if labels is None:
+        return None, None
+    labels = [labels] if isinstance(labels, str) else list(labels)
+    unknown = [label for label in labels if label not in names]
+    if unknown:
+        raise ValueError(f"Unknown {kind} {unknown}; expected any of {list(names)}")
+    codes = np.array([names.index(label) for label in labels], dtype=np.uint8)
+    return _bitmask(codes), codes
+
+
+# --- Turning buffered results into columns (writer thread only) ---
+
+def _single_columns(items):
+    """Consecutive single-quote items -> a dict of column arrays."""
+    return {
+        'timestamp': np.array([ts for ts, _, _, _, _ in items], dtype=np.int64),
+        'source': np.zeros(len(items), dtype=np.uint8),
+        'applicant': np.full(len(items), None, dtype=object),
+        'decision': np.array([DECISIONS.index(q.decision) for _, _, q, _, _ in items], dtype=np.uint8),
+        'risk_segment': np.array([SEGMENTS.index(q.risk_segment) for _, _, q, _, _ in items], dtype=np.uint8),
+        'optimal_rate': np.array([q.optimal_rate for _, _, q, _, _ in items], dtype=np.float64),
+        'max_profit': np.array([q.max_profit for _, _, q, _, _ in items], dtype=np.float64),
+        'prob_default': np.array([q.prob_default for _, _, q, _, _ in items], dtype=np.float64),
+        'policy_notes': np.array([_NOTES_SEPARATOR.join(q.policy_notes) for _, _, q, _, _ in items], dtype=object),
+        'pd_multiplier': np.array([m for _, _, _, m, _ in items], dtype=np.float64),
+        'cost_of_funds': np.array([c for _, _, _, _, c in items], dtype=np.float64),
+    }
+
+
+def _batch_columns(item):
+    """One QuoteBatch item -> a dict of column arrays; each distinct flag value is decoded once."""
+    ts, _, batch, pd_multiplier, cost_of_funds = item
+    n = len(batch)
+    distinct, inverse = np.unique(batch.flags, return_inverse=True)
+    notes = np.array([_NOTES_SEPARATOR.join(notes_from_flags(int(flags), batch.prime_note)) for flags in distinct],
+                     dtype=object)
+    return {
+        'timestamp': np.full(n, ts, dtype=np.int64),
+        'source': np.ones(n, dtype=np.uint8),
+        'applicant': batch.index.astype(str).to_numpy(dtype=object),
+        'decision': batch.decision_codes.astype(np.uint8),
+        'risk_segment': batch.segment_codes.astype(np.uint8),
+        'optimal_rate': np.asarray(batch.optimal_rate, dtype=np.float64),
+        'max_profit': np.asarray(batch.max_profit, dtype=np.float64),
+        'prob_default': np.asarray(batch.prob_default, dtype=np.float64),
+        'policy_notes': notes[inverse.reshape(-1)],
+        'pd_multiplier': np.full(n, pd_multiplier, dtype=np.float64),
+        'cost_of_funds': np.full(n, cost_of_funds, dtype=np.float64),
+    }
+
+
+def _record_batch(items):
+    """Buffered (timestamp, source, result, pd_multiplier, cost_of_funds) items -> (RecordBatch, metadata)."""
+    parts, singles = [], []
+    for item in items:
+        if item[1] == 0:
+            singles.append(item)
+            continue
+        if singles:
+            parts.append(_single_columns(singles))
+            singles = []
+        parts.append(_batch_columns(item))
+    if singles:
+        parts.append(_single_columns(singles))
+
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in SCHEMA.names}
+    timestamps = columns['timestamp']
+    metadata = {
+        'min_ts': str(int(timestamps.min())),
+        'max_ts': str(int(timestamps.max())),
+        'decisions': str(_bitmask(columns['decision'])),
+        'segments': str(_bitmask(columns['risk_segment'])),
+    }
+    arrays = [pa.array(columns[field.name], type=field.type, from_pandas=True) for field in SCHEMA]
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA), metadata
+
+
+class AuditSink:
+    """
+    Bounded, non-blocking (unless policy='block' and full) decision audit log; see the module docstring.
+    capacity and flush_rows count decisions (a QuoteBatch of N counts N).
+    """
+    def __init__(self, directory, capacity=1_000_000, flush_rows=50_000, flush_interval=1.0,
+                 segment_rows=5_000_000, segment_seconds=3600, policy='block', block_timeout=5.0):
+        if policy not in ('block', 'drop'):
+            raise ValueError(f"Unknown audit policy {policy!r} (expected 'block' or 'drop')")
+        if flush_rows > capacity:
+            raise ValueError("flush_rows cannot exceed capacity")
+        self.directory = directory
+        self.capacity = capacity
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.segment_rows = segment_rows
+        self.segment_seconds = segment_seconds
+        self.policy = policy
+        self.block_timeout = block_timeout
+        os.makedirs(directory, exist_ok=True)
+        seal_orphans(directory)
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._items = deque()
+        self._rows = 0             # buffered decisions
+        self._accepted = 0         # decisions ever buffered
+        self._settled = 0          # of those, written or lost to a write error
+        self._flush_requested = False
+        self._closed = False
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.write_errors = 0
+        self.last_error = None
+        self.segments_sealed = 0
+
+        self._file = self._writer = self._segment_path = None
+        self._segment_start = self._segment_end = None
+        self._segment_written = 0
+        self._segment_opened_at = 0.0
+
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- Pricing path ---
+
+    def record_quote(self, quote, pd_multiplier, cost_of_funds):
+        """Queues one Quote. Returns False if it was dropped."""
+        return self._put(0, quote, pd_multiplier, cost_of_funds, 1)
+
+    def record_batch(self, batch, pd_multiplier, cost_of_funds):
+        """Queues every decision of a QuoteBatch (by reference: do not modify it afterwards)."""
+        return self._put(1, batch, pd_multiplier, cost_of_funds, len(batch))
+
+    def _put(self, source, result, pd_multiplier, cost_of_funds, rows):
+        with self._lock:  # the bare lock: cheaper to take than the Condition wrapping it
+            if not self._has_room(rows) and self.policy == 'block' and not self._closed:
+                self.blocked += 1
+                self._cond.wait_for(lambda: self._has_room(rows) or self._closed, self.block_timeout)
+            if self._closed or not self._has_room(rows):
+                self.dropped += rows
+                return False
+            # Stamped under the lock, so timestamps never go backwards within the log
+            self._items.append((time.time_ns(), source, result, pd_multiplier, cost_of_funds))
+            self._rows += rows
+            self._accepted += rows
+            if self._rows >= self.flush_rows:
+                self._cond.notify_all()
+        return True
+
+    def _has_room(self, rows):
+        # An oversized batch is still taken when the buffer is empty
+        return self._rows + rows <= self.capacity or self._rows == 0
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while self._rows < self.flush_rows and not self._flush_requested and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                items, rows = list(self._items), self._rows
+                self._items.clear()
+                self._rows = 0
+                self._flush_requested = False
+                closing = self._closed
+                self._cond.notify_all()   # room for blocked producers
+
+            if items:
+                self._write(items, rows)
+            if self._writer is not None and (closing or self._segment_written >= self.segment_rows
+                                             or time.monotonic() - self._segment_opened_at >= self.segment_seconds):
+                self._seal()
+            with self._cond:
+                self._settled += rows
+                self._cond.notify_all()   # wake flush() callers
+            if closing:
+                return
+
+    def _write(self, items, rows):
+        try:
+            batch, metadata = _record_batch(items)
+            if self._writer is None:
+                self._open_segment(int(metadata['min_ts']))
+            self._writer.write_batch(batch, custom_metadata=metadata)
+            self._file.flush()
+            self._segment_written += rows
+            self._segment_end = int(metadata['max_ts'])
+            self.written += rows
+        except Exception as e:  # a full disk must not take pricing down; the loss is counted
+            self.write_errors += 1
+            self.dropped += rows
+            self.last_error = repr(e)
+
+    def _open_segment(self, start_ns):
+        self._segment_path = os.path.join(self.directory, f"{PREFIX}{start_ns}.open.arrows")
+        self._file = open(self._segment_path, 'ab')
+        self._writer = pa.ipc.new_stream(self._file, SCHEMA)
+        self._segment_start = self._segment_end = start_ns
+        self._segment_written = 0
+        self._segment_opened_at = time.monotonic()
+
+    def _seal(self):
+        try:
+            self._writer.close()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self._segment_path, os.path.join(
+                self.directory, f"{PREFIX}{self._segment_start}-{self._segment_end}.arrows"))
+            self.segments_sealed += 1
+        except Exception as e:
+            self.write_errors += 1
+            self.last_error = repr(e)
+        self._file = self._writer = self._segment_path = None
+
+    # --- Control ---
+
+    def flush(self, timeout=None):
+        """Waits until every decision queued before this call is written. Returns False on timeout."""
+        with self._cond:
+            target = self._accepted
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._settled >= target, timeout)
+
+    def close(self, timeout=None):
+        """Writes what is buffered, seals the open segment and stops the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'buffered': self._rows,
+                'written': self.written,
+                'dropped': self.dropped,
+                'blocked_calls': self.blocked,
+                'write_errors': self.write_errors,
+                'last_error': self.last_error,
+                'segments_sealed': self.segments_sealed,
+                'policy': self.policy,
+            }
+
+    def read(self, **filters):
+        """read_audit() over this sink's directory (decisions still buffered are not included; see flush())."""
+        return read_audit(self.directory, **filters)
+
+
+# --- Reading ---
+
+def _segment_files(directory):
+    """(start_ns, end_ns or None if still open, path) per segment, oldest first."""
+    files = []
+    for name in os.listdir(directory):
+        match = _SEGMENT_FILE.match(name)
+        if match:
+            end = match.group(2)
+            files.append((int(match.group(1)), int(end) if end else None, os.path.join(directory, name)))
+    return sorted(files, key=lambda f: f[0])
+
+
+def _sealed_name(directory, start_ns):
+    """The sealed path of a segment that was open when listed (it may have been sealed since)."""
+    for start, end, path in _segment_files(directory):
+        if start == start_ns and end is not None:
+            return path
+    return None
+
+
+def _iter_batches(path):
+    """(RecordBatch, metadata) per batch; a segment still being written ends at its last complete batch."""
+    with pa.memory_map(path, 'r') as source:
+        try:
+            reader = pa.ipc.open_stream(source)
+        except (pa.ArrowInvalid, OSError):
+            return
+        version = (reader.schema.metadata or {}).get(b'audit_version')
+        if version != str(AUDIT_VERSION).encode():
+            raise ValueError(f"Audit log v{version.decode() if version else '?'} not supported "
+                             f"(expected v{AUDIT_VERSION}): {path}")
+        while True:
+            try:
+                batch, metadata = reader.read_next_batch_with_custom_metadata()
+            except StopIteration:
+                return
+            except (pa.ArrowInvalid, OSError):
+                return
+            yield batch, {k.decode(): int(v) for k, v in (metadata or {}).items()}
+
+
+def read_audit(directory, start=None, end=None, segments=None, decisions=None, columns=None):
+    """
+    Logged decisions with start <= timestamp < end, in any of `segments` / `decisions` (labels;
+    None = all), as a DataFrame in log order. Decision and segment are categoricals, source is
+    'single' / 'batch'. Files and batches that cannot match are skipped without reading them.
+    """
+    start_ns, end_ns = _to_ns(start), _to_ns(end)
+    segment_bits, segment_codes = _wanted_mask(segments, SEGMENTS, 'segments')
+    decision_bits, decision_codes = _wanted_mask(decisions, DECISIONS, 'decisions')
+    names = list(columns) if columns is not None else SCHEMA.names
+
+    tables = []
+    for first_ns, last_ns, path in _segment_files(directory):
+        if end_ns is not None and first_ns >= end_ns:
+            break
+        if start_ns is not None and last_ns is not None and last_ns < start_ns:
+            continue
+        if last_ns is None and not os.path.exists(path):
+            path = _sealed_name(directory, first_ns)
+            if path is None:
+                continue
+        for batch, metadata in _iter_batches(path):
+            if start_ns is not None and metadata['max_ts'] < start_ns:
+                continue
+            if end_ns is not None and metadata['min_ts'] >= end_ns:
+                continue
+            if segment_bits is not None and not metadata['segments'] & segment_bits:
+                continue
+            if decision_bits is not None and not metadata['decisions'] & decision_bits:
+                continue
+
+            mask = None
+            if start_ns is not None or end_ns is not None:
+                ts = batch.column('timestamp').view(pa.int64()).to_numpy()
+                mask = np.ones(len(ts), dtype=bool)
+                if start_ns is not None:
+                    mask &= ts >= start_ns
+                if end_ns is not None:
+                    mask &= ts < end_ns
+            for column, codes in (('risk_segment', segment_codes), ('decision', decision_codes)):
+                if codes is not None:
+                    hit = np.isin(batch.column(column).to_numpy(), codes)
+                    mask = hit if mask is None else mask & hit
+            rows = batch.select(names)
+            if mask is not None:
+                if not mask.any():
+                    continue
+                rows = rows.filter(pa.array(mask)) if not mask.all() else rows
+            tables.append(rows)
+
+    if tables:
+        data = pa.Table.from_batches(tables).to_pandas()
+    else:
+        data = SCHEMA.empty_table().select(names).to_pandas()
+    if 'decision' in data:
+        data['decision'] = pd.Categorical.from_codes(data['decision'].astype(np.int8), DECISIONS)
+    if 'risk_segment' in data:
+        data['risk_segment'] = pd.Categorical.from_codes(data['risk_segment'].astype(np.int8), SEGMENTS)
+    if 'source' in data:
+        data['source'] = pd.Categorical.from_codes(data['source'].astype(np.int8), SOURCES)
+    return data
+
+
+def seal_orphans(directory):
+    """Seals segments left open by a process that did not close its sink (e.g. it crashed)."""
+    for start_ns, end_ns, path in _segment_files(directory):
+        if end_ns is not None:
+            continue
+        last_ns = None
+        for _, metadata in _iter_batches(path):
+            last_ns = metadata['max_ts']
+        if last_ns is None:
+            os.remove(path)  # nothing complete was written
+        else:
+            os.replace(path, os.path.join(directory, f"{PREFIX}{start_ns}-{last_ns}.arrows"))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Query the decision audit log')
+    parser.add_argument('directory', help='Audit log directory (the AuditSink / --audit-dir directory)')
+    parser.add_argument('--start', default=None, help='Earliest decision time, inclusive (e.g. 2026-10-01)')
+    parser.add_argument('--end', default=None, help='Latest decision time, exclusive')
+    parser.add_argument('--segment', action='append', choices=SEGMENTS, help='Risk segment (repeatable)')
+    parser.add_argument('--decision', action='append', choices=DECISIONS, help='Decision (repeatable)')
+    parser.add_argument('--output', default=None, help='Write the matching decisions to this CSV')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if not os.path.isdir(args.directory):
+        print(f"❌ CRITICAL ERROR: Audit log directory not found: {args.directory}")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    decisions = read_audit(args.directory, args.start, args.end, args.segment, args.decision)
+    print(f"✅ {len(decisions):,} decisions matched in {time.perf_counter() - started:.2f}s")
+    if len(decisions):
+        print(f"   {decisions['timestamp'].min()} -> {decisions['timestamp'].max()}")
+        print(pd.crosstab(decisions['risk_segment'], decisions['decision']).to_string())
+    if args.output:
+        decisions.to_csv(args.output, index=False)
+        print(f"✅ Decisions written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
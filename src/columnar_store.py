@@ -0,0 +1,214 @@
+"""
+Columnar, memory-mapped access to the CSV inputs (test sets, raw Lending Club / Prosper files).
+
+A CSV is converted once to an Arrow IPC file next to it (<name>.arrow, uncompressed so it can
+be memory-mapped). Later opens map that file: reading a column touches only that column's
+pages and, where Arrow allows it, returns a zero-copy NumPy view. The CSV's size and mtime are
+recorded in the file, so a changed CSV is re-converted on the next open.
+
+    table = ColumnarTable.from_source('data/processed/prosper_X_test.csv')
+    table['risk_score_norm']                                  # one column as a NumPy array
+    for chunk in table.iter_chunks(['dti', 'annual_inc'], chunk_size=100000):
+        ...                                                   # dict of NumPy arrays per chunk
+    table.to_frame(['dti', 'annual_inc'], start, stop)        # projected rows as a DataFrame
+
+Convert ahead of time:
+    python src/columnar_store.py data/processed/prosper_X_test.csv data/processed/prosper_y_test.csv
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+STORE_VERSION = 1
+SUFFIX = '.arrow'
+BLOCK_SIZE = 1 << 20     # CSV bytes parsed per step (the reader's memory scales with this)
+BATCH_BYTES = 64 << 20   # parsed blocks are regrouped into record batches of about this size
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + SUFFIX
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _storage_type(field_type):
+    # Integer columns are widened to float64 from the first block's inference, so a later block
+    # with a blank or a decimal cannot break the streaming conversion. A column that is all blank
+    # in the first block may hold anything later, so it is kept as text.
+    if pa.types.is_integer(field_type):
+        return pa.float64()
+    if pa.types.is_null(field_type):
+        return pa.string()
+    return field_type
+
+
+def _infer_column_types(csv_path, read_options, column_types):
+    """
+    Whole-file pass for when the first block's types do not hold: reads every column as text
+    and demotes to string any column some block cannot be cast to its first-block type.
+    """
+    text_options = pacsv.ConvertOptions(column_types={name: pa.string() for name in column_types},
+                                        strings_can_be_null=True)
+    pending = {name: t for name, t in column_types.items() if not pa.types.is_string(t)}
+    column_types = dict(column_types)
+    with pacsv.open_csv(csv_path, read_options=read_options, convert_options=text_options) as reader:
+        for batch in reader:
+            for name, field_type in list(pending.items()):
+                try:
+                    batch.column(name).cast(field_type)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+                    column_types[name] = pa.string()
+                    del pending[name]
+            if not pending:
+                break
+    return column_types
+
+
+def _write_arrow(csv_path, tmp_path, read_options, column_types, metadata, batch_bytes):
+    convert_options = pacsv.ConvertOptions(column_types=column_types)
+    with pacsv.open_csv(csv_path, read_options=read_options, convert_options=convert_options) as reader:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, reader.schema.with_metadata(metadata)) as writer:
+                pending, pending_bytes = [], 0
+                for batch in reader:
+                    pending.append(batch)
+                    pending_bytes += batch.nbytes
+                    if pending_bytes >= batch_bytes:
+                        writer.write_table(pa.Table.from_batches(pending).combine_chunks())
+                        pending, pending_bytes = [], 0
+                if pending:
+                    writer.write_table(pa.Table.from_batches(pending).combine_chunks())
+
+
+def convert_csv(csv_path, out_path=None, block_size=BLOCK_SIZE, batch_bytes=BATCH_BYTES):
+    """
+    Streams a CSV into an Arrow IPC file without loading it whole. Record batches are large
+    (about `batch_bytes`) so row ranges are usually served from one batch, without a copy.
+    Column types come from the first block; if a later block contradicts them, the file is
+    converted again with types inferred from the whole file. Returns the output path.
+    """
+    out_path = out_path or columnar_path(csv_path)
+    read_options = pacsv.ReadOptions(block_size=block_size)
+    with pacsv.open_csv(csv_path, read_options=read_options) as reader:
+        inferred = reader.schema
+    column_types = {field.name: _storage_type(field.type) for field in inferred}
+
+    metadata = {b'store_version': str(STORE_VERSION).encode(), b'source': _source_stamp(csv_path).encode()}
+    tmp_path = out_path + '.tmp'
+    try:
+        try:
+            _write_arrow(csv_path, tmp_path, read_options, column_types, metadata, batch_bytes)
+        except pa.ArrowInvalid:
+            column_types = _infer_column_types(csv_path, read_options, column_types)
+            _write_arrow(csv_path, tmp_path, read_options, column_types, metadata, batch_bytes)
+        os.replace(tmp_path, out_path)  # readers never see a half-written file
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return out_path
+
+
+def _is_fresh(csv_path, arrow_path):
+    if not os.path.exists(arrow_path):
+        return False
+    with pa.memory_map(arrow_path, 'r') as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    return (metadata.get(b'store_version') == str(STORE_VERSION).encode()
+            and metadata.get(b'source') == _source_stamp(csv_path).encode())
+
+
+def _to_numpy(column):
+    """ChunkedArray -> NumPy: a read-only view for one null-free numeric chunk, else a copy."""
+    if column.num_chunks == 1:
+        return column.chunk(0).to_numpy(zero_copy_only=False)
+    return column.to_numpy()
+
+
+class ColumnarTable:
+    """A memory-mapped Arrow IPC file, read by column and by row range."""
+    def __init__(self, path):
+        self.path = path
+        self._source = pa.memory_map(path, 'r')
+        reader = pa.ipc.open_file(self._source)
+        metadata = reader.schema.metadata or {}
+        version = metadata.get(b'store_version')
+        if version is not None and version != str(STORE_VERSION).encode():
+            raise ValueError(f"Columnar store v{version.decode()} not supported (expected v{STORE_VERSION}). "
+                             f"Re-convert with src/columnar_store.py.")
+        self.table = reader.read_all()  # zero-copy: the buffers point into the map
+
+    @classmethod
+    def from_source(cls, path):
+        """Opens an .arrow file, or the (freshly converted if needed) columnar copy of a CSV."""
+        if not path.endswith('.csv'):
+            return cls(path)
+        arrow_path = columnar_path(path)
+        if not _is_fresh(path, arrow_path):
+            convert_csv(path, arrow_path)
+        return cls(arrow_path)
+
+    @property
+    def columns(self):
+        return self.table.column_names
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def __getitem__(self, column):
+        return _to_numpy(self.table.column(column))
+
+    def read(self, columns=None, start=0, stop=None):
+        """Rows [start, stop) of `columns` (default: all) as a dict of NumPy arrays."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        rows = self.table.slice(start, max(stop - start, 0))
+        return {col: _to_numpy(rows.column(col)) for col in (columns or self.columns)}
+
+    def iter_chunks(self, columns=None, chunk_size=100000):
+        """Streams `columns` in row chunks of `chunk_size` (dicts of NumPy arrays)."""
+        for start in range(0, len(self), chunk_size):
+            yield self.read(columns, start, start + chunk_size)
+
+    def to_frame(self, columns=None, start=0, stop=None):
+        """Rows [start, stop) of `columns` as a DataFrame indexed by row number, as pd.read_csv would."""
+        arrays = self.read(columns, start, stop)
+        n = len(next(iter(arrays.values()))) if arrays else 0
+        return pd.DataFrame(arrays, index=pd.RangeIndex(start, start + n), copy=False)
+
+    def close(self):
+        self.table = None
+        self._source.close()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Convert CSV inputs to memory-mappable Arrow files')
+    parser.add_argument('csv', nargs='+', help='CSV files to convert (written next to them as .arrow)')
+    parser.add_argument('--force', action='store_true', help='Re-convert even if the .arrow file is current')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    for csv_path in args.csv:
+        arrow_path = columnar_path(csv_path)
+        if not args.force and _is_fresh(csv_path, arrow_path):
+            print(f"✅ Up to date: {arrow_path}")
+            continue
+        try:
+            convert_csv(csv_path, arrow_path)
+        except FileNotFoundError as e:
+            print(f"❌ CRITICAL ERROR: Input file not found. {e}")
+            sys.exit(1)
+        print(f"✅ {csv_path} -> {arrow_path} ({os.path.getsize(arrow_path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
+from engine_metrics import DECISIONS, SEGMENTS
+from features import applicant_features
 from pricing_engine import LoanPricingEngine
+from pricing_results import QuoteBatch
 
 
 st.set_page_config(page_title="Adaptive Pricing Engine", page_icon="🏦", layout="wide")
@@ -47,114 +55,258 @@ def load_engine():
 
 engine = load_engine()
 
-engine.cost_of_funds = cof_input
+# --- Portfolio tab helpers ---
+BOOK_CHUNK = 20000        # rows priced between progress-bar updates
+DECISION_MEMO_SIZE = 32   # priced (file, cost of funds, risk multiplier) settings kept in memory
+RATE_BINS = np.linspace(engine.policy_config['GLOBAL_MIN_RATE'], engine.policy_config['GLOBAL_MAX_RATE'], 31)
+PROFIT_BIN_COUNT = 30
+
+# Engine fields an uploaded book may omit (same defaults as the single-applicant form / backtest)
+BOOK_DEFAULTS = {
+    'risk_score_norm': 0.5, 'annual_inc': 50000, 'dti': 0.25, 'LoanOriginalAmount': 15000,
+    'revol_util': 30, 'inq_last_6mths': 0, 'total_acc': 15, 'home_ownership_RENT': 0,
+    'term_years': 3, 'emp_length': 5, 'purpose_debt_consolidation': 1,
+}
+
+@st.cache_resource(max_entries=4, show_spinner="Reading applicant file...")
+def load_book(file_hash, _data, file_name):
+    """The uploaded applicants, shared read-only across reruns (keyed on the file hash)."""
+    source = io.BytesIO(_data)
+    book = pd.read_parquet(source) if file_name.endswith('.parquet') else pd.read_csv(source)
+    book = book.reset_index(drop=True)
+    for col, default in BOOK_DEFAULTS.items():
+        if col not in book.columns:
+            book[col] = default
+    return book
+
+@st.cache_resource(max_entries=4, show_spinner="Scoring default risk...")
+def book_base_pd(file_hash, _book):
+    """Unstressed PDs: the stress sliders never change them, so Brain 1 runs once per file."""
+    return engine._predict_pd_batch(_book)
+
+@st.cache_resource
+def decision_memo():
+    """(file hash, cost of funds, risk multiplier) -> QuoteBatch, least recently used first."""
+    return OrderedDict(), threading.Lock()
+
+def price_book(file_hash, book, cost_of_funds, pd_multiplier):
+    """The book's decisions at one stress setting: from the memo, or priced in chunks with a progress bar."""
+    memo, lock = decision_memo()
+    key = (file_hash, round(cost_of_funds, 6), round(pd_multiplier, 6))
+    with lock:
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+
+    base_pd = book_base_pd(file_hash, book)
+    progress = st.progress(0.0, text="Pricing book...")
+    chunks = []
+    for start in range(0, len(book), BOOK_CHUNK):
+        stop = min(start + BOOK_CHUNK, len(book))
+        chunks.append(engine.quote_batch(book.iloc[start:stop], pd_multiplier=pd_multiplier,
+                                         cost_of_funds=cost_of_funds, base_pd=base_pd[start:stop]))
+        progress.progress(stop / len(book), text=f"Pricing book... {stop:,} / {len(book):,}")
+    progress.empty()
+
+    quotes = QuoteBatch.concat(chunks)
+    with lock:
+        memo[key] = quotes
+        while len(memo) > DECISION_MEMO_SIZE:
+            memo.popitem(last=False)
+    return quotes
+
+def bin_book(quotes, profit_bins):
+    """Aggregates for the portfolio view: totals and histogram counts, no per-row data."""
+    codes = quotes.decision_codes
+    approved = codes == 0
+    by_segment = np.bincount(quotes.segment_codes.astype(np.intp) * len(DECISIONS) + codes,
+                             minlength=len(SEGMENTS) * len(DECISIONS)).reshape(len(SEGMENTS), len(DECISIONS))
+    profits = np.clip(quotes.max_profit[approved], profit_bins[0], profit_bins[-1])
+    return {
+        'applicants': len(quotes),
+        'approval_rate': approved.mean() if len(quotes) else 0.0,
+        'avg_rate': quotes.optimal_rate[approved].mean() if approved.any() else 0.0,
+        'total_profit': quotes.max_profit[approved].sum(),
+        'by_segment': by_segment,
+        'rate_counts': np.histogram(quotes.optimal_rate[approved], RATE_BINS)[0],
+        'profit_counts': np.histogram(profits, profit_bins)[0],
+    }
+
+def profit_bins_for(quotes):
+    """Profit bins fixed per book (from its baseline pricing), so stressed histograms stay comparable."""
+    profits = quotes.max_profit[quotes.decision_codes == 0]
+    top = np.percentile(profits, 99) if len(profits) else 1.0
+    return np.linspace(min(profits.min(), 0.0) if len(profits) else 0.0, max(top, 1.0), PROFIT_BIN_COUNT + 1)
 
 st.title("Adaptive Loan Pricing Dashboard")
 st.markdown("Optimization Engine V1.0 | Active Policy Layer: **Enabled**")
 
-if submitted:
-    applicant_data = {
-        'risk_score_norm': (fico - 300) / 550,
-        'annual_inc': income,
-        'dti': dti,
-        'LoanOriginalAmount': loan_amt,
-        'revol_util': util,
-        'inq_last_6mths': inquiries,
-        # Defaults
-        'term_years': term_months / 12, 'emp_length': 5, 'home_ownership_RENT': 1, 
-        'purpose_debt_consolidation': 1, 'total_acc': 20
-    }
+tab_single, tab_portfolio = st.tabs(["🧍 Single Applicant", "📊 Portfolio"])
+
+with tab_single:
+    if submitted:
+        # Same feature transform as training (src/features.py); unasked fields use its defaults
+        applicant_data = applicant_features({
+            'fico_range_low': fico,
+            'annual_inc': income,
+            'loan_amnt': loan_amt,
+            'term': term_months,
+            'dti': dti,
+            'revol_util': util,
+            'inq_last_6mths': inquiries,
+        })
 
-    decision = engine.get_optimal_rate(applicant_data, pd_multiplier=risk_multiplier)
+        decision = engine.get_optimal_rate(applicant_data, pd_multiplier=risk_multiplier, cost_of_funds=cof_input)
 
-    col1, col2, col3, col4 = st.columns(4)
+        col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        st.metric("Risk Segment", decision['risk_segment'])
-    with col2:
-        st.metric("Prob. of Default (PD)", f"{decision['prob_default']:.2%}", delta_color="inverse")
-    with col3:
-        st.metric("Exp. Profit", f"${decision['max_profit']:.0f}")
-    with col4:
-        if decision['decision'] == 'APPROVE':
-            st.success(f"OFFER: {decision['optimal_rate']:.2%}")
-        else:
-            st.error(f"{decision['decision']}")
+        with col1:
+            st.metric("Risk Segment", decision['risk_segment'])
+        with col2:
+            st.metric("Prob. of Default (PD)", f"{decision['prob_default']:.2%}", delta_color="inverse")
+        with col3:
+            st.metric("Exp. Profit", f"${decision['max_profit']:.0f}")
+        with col4:
+            if decision['decision'] == 'APPROVE':
+                st.success(f"OFFER: {decision['optimal_rate']:.2%}")
+            else:
+                st.error(f"{decision['decision']}")
 
-    st.markdown("---")
+        st.markdown("---")
 
-    c1, c2 = st.columns([2, 1])
+        c1, c2 = st.columns([2, 1])
 
-    with c1:
-        st.subheader("Optimization Curve")
-        if decision['curve_data'] is not None:
-            curve = decision['curve_data']
+        with c1:
+            st.subheader("Optimization Curve")
+            if decision['curve_data'] is not None:
+                curve = decision['curve_data']
 
-            fig, ax1 = plt.subplots(figsize=(10, 5))
+                fig, ax1 = plt.subplots(figsize=(10, 5))
                 
-            sns.lineplot(data=curve, x='Rate', y='Exp_Profit', ax=ax1, color='green', linewidth=3, legend=False)
-            ax1.set_ylabel("Expected Profit ($)", color='green', fontweight='bold')
-            ax1.set_xlabel("Interest Rate Offer")
-            ax1.axhline(0, color='black', alpha=0.2)
+                sns.lineplot(data=curve, x='Rate', y='Exp_Profit', ax=ax1, color='green', linewidth=3, legend=False)
+                ax1.set_ylabel("Expected Profit ($)", color='green', fontweight='bold')
+                ax1.set_xlabel("Interest Rate Offer")
+                ax1.axhline(0, color='black', alpha=0.2)
                 
-            ax2 = ax1.twinx()
-            sns.lineplot(data=curve, x='Rate', y='Prob_Accept', ax=ax2, color='gray', linestyle='--', alpha=0.6, legend=False)
-            ax2.set_ylabel("Probability of Acceptance", color='gray')
-            ax2.set_ylim(0, 1.05)
+                ax2 = ax1.twinx()
+                sns.lineplot(data=curve, x='Rate', y='Prob_Accept', ax=ax2, color='gray', linestyle='--', alpha=0.6, legend=False)
+                ax2.set_ylabel("Probability of Acceptance", color='gray')
+                ax2.set_ylim(0, 1.05)
                 
-            if decision['decision'] == 'APPROVE':
-                ax1.plot(decision['optimal_rate'], decision['max_profit'], 'ro', markersize=10, zorder=5)
-                ax1.annotate(f" Optimal: {decision['optimal_rate']:.1%}", 
-                            (decision['optimal_rate'], decision['max_profit']),
-                            xytext=(0, 15), textcoords='offset points', ha='center', fontweight='bold', color='red')
+                if decision['decision'] == 'APPROVE':
+                    ax1.plot(decision['optimal_rate'], decision['max_profit'], 'ro', markersize=10, zorder=5)
+                    ax1.annotate(f" Optimal: {decision['optimal_rate']:.1%}", 
+                                (decision['optimal_rate'], decision['max_profit']),
+                                xytext=(0, 15), textcoords='offset points', ha='center', fontweight='bold', color='red')
                 
-            from matplotlib.lines import Line2D
-            legend_elements = [
-                    Line2D([0], [0], color='green', lw=3, label='Expected Profit ($)'),
-                    Line2D([0], [0], color='gray', lw=2, linestyle='--', label='Prob. Acceptance')
-                ]
+                from matplotlib.lines import Line2D
+                legend_elements = [
+                        Line2D([0], [0], color='green', lw=3, label='Expected Profit ($)'),
+                        Line2D([0], [0], color='gray', lw=2, linestyle='--', label='Prob. Acceptance')
+                    ]
                 
-            ax1.legend(handles=legend_elements, loc='lower center', bbox_to_anchor=(0.5, 1.02), ncol=2, frameon=False)
+                ax1.legend(handles=legend_elements, loc='lower center', bbox_to_anchor=(0.5, 1.02), ncol=2, frameon=False)
                 
-            st.pyplot(fig)
+                st.pyplot(fig)
                 
-            st.info("💡 **How to read this:** The Green Line is profit. The Grey Dashed Line is customer demand. We pick the peak of the Green Line.")
-        else:
-            st.warning("No optimization curve generated (Loan Rejected early).")
+                st.info("💡 **How to read this:** The Green Line is profit. The Grey Dashed Line is customer demand. We pick the peak of the Green Line.")
+            else:
+                st.warning("No optimization curve generated (Loan Rejected early).")
 
-    with c2:
-        st.subheader("Policy Guardrails")
+        with c2:
+            st.subheader("Policy Guardrails")
         
-        policy_checks = {
-            "Risk Assessment": "Pass" if decision['decision'] != 'REJECT_RISK' else "Fail",
-            "Profitability Check": "Pass" if decision['decision'] != 'REJECT_ECONOMICS' else "Fail",
-            "Usury Cap (36%)": "Pass",
-            "Prime Rate Cap (18%)": "Applied" if "Prime Max" in str(decision['policy_notes']) else "N/A"
-        }
+            policy_checks = {
+                "Risk Assessment": "Pass" if decision['decision'] != 'REJECT_RISK' else "Fail",
+                "Profitability Check": "Pass" if decision['decision'] != 'REJECT_ECONOMICS' else "Fail",
+                "Usury Cap (36%)": "Pass",
+                "Prime Rate Cap (18%)": "Applied" if "Prime Max" in str(decision['policy_notes']) else "N/A"
+            }
         
-        for check, status in policy_checks.items():
-            if status == "Pass":
-                st.markdown(f"✅ **{check}**")
-            elif status == "Fail":
-                st.markdown(f"❌ **{check}**")
-            elif status == "Applied":
-                st.markdown(f"🔒 **{check}** (Triggered)")
+            for check, status in policy_checks.items():
+                if status == "Pass":
+                    st.markdown(f"✅ **{check}**")
+                elif status == "Fail":
+                    st.markdown(f"❌ **{check}**")
+                elif status == "Applied":
+                    st.markdown(f"🔒 **{check}** (Triggered)")
+                else:
+                    st.markdown(f"⚪ {check}")
+
+            st.markdown("### 📝 Governance Notes")
+            if decision['policy_notes']:
+                for note in decision['policy_notes']:
+                    st.warning(note)
             else:
-                st.markdown(f"⚪ {check}")
+                st.success("No manual overrides applied. Pure ML pricing.")
 
-        st.markdown("### 📝 Governance Notes")
-        if decision['policy_notes']:
-            for note in decision['policy_notes']:
-                st.warning(note)
-        else:
-            st.success("No manual overrides applied. Pure ML pricing.")
+        with st.expander("📉 Stress Grid (Recession x Rate Hike)"):
+            stress = engine.run_stress_scenarios(
+                pd.DataFrame([applicant_data]),
+                pd_multipliers=[1.0, 1.25, 1.5, 1.75, 2.0],
+                costs_of_funds=[0.02, 0.04, 0.06, 0.08, 0.10]
+            )
+            stress['Offer'] = np.where(stress['decision'] == 'APPROVE',
+                                       stress['optimal_rate'].map('{:.2%}'.format), stress['decision'])
+            grid = stress.pivot(index='pd_multiplier', columns='cost_of_funds', values='Offer')
+            grid.index = [f"PD x{m:g}" for m in grid.index]
+            grid.columns = [f"CoF {c:.0%}" for c in grid.columns]
+            st.dataframe(grid, use_container_width=True)
 
-else:
-    st.info("👈 Enter applicant details in the sidebar to generate a loan offer.")
+    else:
+        st.info("👈 Enter applicant details in the sidebar to generate a loan offer.")
     
-    st.markdown("""
-    ### Quick Start Guide
-    1. **Adjust FICO:** Drag FICO to **750** to see a "Prime" offer.
-    2. **Stress Test:** Open "Economic Stress Test" in the sidebar and set **Cost of Funds** to **8%**. Watch the offer rate jump up!
-    3. **Break It:** Drag FICO to **500** to trigger a **REJECT_RISK**.
-    """)
+        st.markdown("""
+        ### Quick Start Guide
+        1. **Adjust FICO:** Drag FICO to **750** to see a "Prime" offer.
+        2. **Stress Test:** Open "Economic Stress Test" in the sidebar and set **Cost of Funds** to **8%**. Watch the offer rate jump up!
+        3. **Break It:** Drag FICO to **500** to trigger a **REJECT_RISK**.
+        """)
+
+with tab_portfolio:
+    st.markdown("Upload an applicant book (CSV or Parquet, one row per applicant, engine feature columns). "
+                "It is priced under the sidebar's **Economic Stress Test** settings.")
+    uploaded = st.file_uploader("Applicant file", type=['csv', 'parquet'])
+
+    if uploaded is None:
+        st.info("📂 Upload a file to see the book's approval, rate and profit distributions.")
+    else:
+        data = uploaded.getvalue()
+        file_hash = hashlib.sha256(data).hexdigest()
+        book = load_book(file_hash, data, uploaded.name)
+
+        if book.empty:
+            st.warning("The uploaded file has no rows.")
+        else:
+            baseline = price_book(file_hash, book, engine.cost_of_funds, 1.0)
+            stressed = price_book(file_hash, book, cof_input, risk_multiplier)
+            profit_bins = profit_bins_for(baseline)
+            base, view = bin_book(baseline, profit_bins), bin_book(stressed, profit_bins)
+
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Applicants", f"{view['applicants']:,}")
+            with col2:
+                st.metric("Approval Rate", f"{view['approval_rate']:.1%}",
+                          delta=f"{view['approval_rate'] - base['approval_rate']:+.1%} vs baseline")
+            with col3:
+                st.metric("Avg. Approved Rate", f"{view['avg_rate']:.2%}",
+                          delta=f"{view['avg_rate'] - base['avg_rate']:+.2%} vs baseline", delta_color="inverse")
+            with col4:
+                st.metric("Total Exp. Profit", f"${view['total_profit']:,.0f}",
+                          delta=f"${view['total_profit'] - base['total_profit']:+,.0f} vs baseline")
+            st.caption(f"Baseline: cost of funds {engine.cost_of_funds:.0%}, risk multiplier x1.0")
+
+            st.markdown("---")
+            c1, c2 = st.columns(2)
+            with c1:
+                st.subheader("Decisions by Risk Segment")
+                st.bar_chart(pd.DataFrame(view['by_segment'], index=list(SEGMENTS), columns=list(DECISIONS)))
+            with c2:
+                st.subheader("Offered Rate Distribution")
+                st.bar_chart(pd.DataFrame({'Approved loans': view['rate_counts']},
+                                          index=pd.Index(np.round(RATE_BINS[:-1] * 100, 1), name='Rate (%)')))
+
+            st.subheader("Expected Profit per Approved Loan")
+            st.bar_chart(pd.DataFrame({'Approved loans': view['profit_counts']},
+                                      index=pd.Index(np.round(profit_bins[:-1]).astype(int), name='Exp. Profit ($)')))
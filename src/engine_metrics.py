@@ -0,0 +1,217 @@
+"""
+Optional per-stage instrumentation for LoanPricingEngine.
+
+    metrics = EngineMetrics()
+    engine = LoanPricingEngine(..., metrics=metrics)
+    ...
+    metrics.snapshot()        # dict: latency histograms + decision counters
+    metrics.to_prometheus()   # Prometheus text exposition format
+
+Each pricing call gets a StageTimer that accumulates time per stage and flushes once when
+the call finishes: one histogram observation per stage per call, whatever the optimizer
+does inside. With metrics=None the engine uses NULL_TIMER, whose methods do nothing.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+# Upper bounds (seconds) of the latency buckets; +Inf is implied
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Stages, in pricing order ('total' is the whole call)
+STAGES = ('feature_alignment', 'risk_model', 'elasticity_model', 'profit', 'optimizer', 'governance',
+          'output', 'total')
+
+DECISIONS = ('APPROVE', 'REJECT_RISK', 'REJECT_ECONOMICS')
+SEGMENTS = ('Subprime', 'NearPrime', 'Prime', 'High Risk')  # codes 0-3 in count_decisions()
+
+
+class StageHistogram:
+    """Cumulative latency histogram for one (path, stage)."""
+    __slots__ = ('bounds', 'counts', 'count', 'sum', 'items')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.items = 0
+
+    def observe(self, seconds, items=1):
+        self.counts[bisect_left(self.bounds, seconds)] += 1  # le is inclusive
+        self.count += 1
+        self.sum += seconds
+        self.items += items
+
+    def quantile(self, q):
+        """Estimated quantile, interpolated inside the bucket (as Prometheus' histogram_quantile)."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count > 0:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.bounds[-1]
+
+
+class StageTimer:
+    """Times the stages of one pricing call; lap(stage) closes the stage that just ran."""
+    __slots__ = ('metrics', 'path', 'stages', 'started', 'last')
+
+    def __init__(self, metrics, path):
+        self.metrics = metrics
+        self.path = path
+        self.stages = {}
+        self.started = self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self.last)
+        self.last = now
+
+    def count_decision(self, decision, segment):
+        self.metrics.count_decision(self.path, decision, segment)
+
+    def count_decisions(self, decisions, segment_codes):
+        self.metrics.count_decisions(self.path, decisions, segment_codes)
+
+    def finish(self, items=1):
+        self.stages['total'] = time.perf_counter() - self.started
+        self.metrics.record(self.path, self.stages, items)
+
+
+class _NullTimer:
+    """What the engine uses when instrumentation is off: every call is a no-op."""
+    __slots__ = ()
+
+    def lap(self, stage):
+        pass
+
+    def count_decision(self, decision, segment):
+        pass
+
+    def count_decisions(self, decisions, segment_codes):
+        pass
+
+    def finish(self, items=1):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class EngineMetrics:
+    """
+    Thread-safe store of per-(path, stage) latency histograms and per-(path, decision, segment)
+    counters. `path` is the engine entry point: 'single', 'batch', 'stress', 'sensitivity'
+    or 'counter_offer'.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._decisions = {}
+            self.started_at = time.time()
+
+    def timer(self, path):
+        return StageTimer(self, path)
+
+    def record(self, path, stages, items=1):
+        with self._lock:
+            for stage, seconds in stages.items():
+                hist = self._histograms.get((path, stage))
+                if hist is None:
+                    hist = self._histograms[(path, stage)] = StageHistogram(self.buckets)
+                hist.observe(seconds, items)
+
+    def _decision_table(self, path):
+        table = self._decisions.get(path)
+        if table is None:
+            table = self._decisions[path] = np.zeros((len(DECISIONS), len(SEGMENTS)), dtype=np.int64)
+        return table
+
+    def count_decision(self, path, decision, segment):
+        with self._lock:
+            self._decision_table(path)[DECISIONS.index(decision), SEGMENTS.index(segment)] += 1
+
+    def count_decisions(self, path, decisions, segment_codes):
+        """Batch counts: `decisions` holds the labels, `segment_codes` 0-3 (see SEGMENTS)."""
+        decision_codes = np.zeros(len(decisions), dtype=np.int64)
+        decision_codes[decisions == 'REJECT_RISK'] = 1
+        decision_codes[decisions == 'REJECT_ECONOMICS'] = 2
+        counts = np.bincount(decision_codes * len(SEGMENTS) + np.asarray(segment_codes),
+                             minlength=len(DECISIONS) * len(SEGMENTS))
+        with self._lock:
+            self._decision_table(path)[:] += counts.reshape(len(DECISIONS), len(SEGMENTS))
+
+    def snapshot(self):
+        """Plain-dict view of everything recorded so far (JSON-serializable)."""
+        with self._lock:
+            stages = {}
+            for (path, stage), hist in sorted(self._histograms.items(), key=lambda kv: (kv[0][0], _stage_order(kv[0][1]))):
+                stages.setdefault(path, {})[stage] = {
+                    'count': hist.count,
+                    'items': hist.items,
+                    'sum_s': hist.sum,
+                    'mean_ms': hist.sum / hist.count * 1000 if hist.count else None,
+                    'p50_ms': _to_ms(hist.quantile(0.5)),
+                    'p99_ms': _to_ms(hist.quantile(0.99)),
+                }
+            decisions = {
+                path: {decision: {segment: int(table[i, j]) for j, segment in enumerate(SEGMENTS) if table[i, j]}
+                       for i, decision in enumerate(DECISIONS)}
+                for path, table in self._decisions.items()
+            }
+            return {'since': self.started_at, 'stages': stages, 'decisions': decisions}
+
+    def to_prometheus(self, prefix='loan_pricing'):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per pricing stage, per engine call.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda kv: (kv[0][0], _stage_order(kv[0][1])))
+            for (path, stage), hist in histograms:
+                labels = f'path="{path}",stage="{stage}"'
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, hist.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {hist.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {hist.count}')
+
+            lines.append(f"# HELP {prefix}_stage_items_total Applicants processed per pricing stage.")
+            lines.append(f"# TYPE {prefix}_stage_items_total counter")
+            for (path, stage), hist in histograms:
+                lines.append(f'{prefix}_stage_items_total{{path="{path}",stage="{stage}"}} {hist.items}')
+
+            lines.append(f"# HELP {prefix}_decisions_total Pricing decisions by outcome and risk segment.")
+            lines.append(f"# TYPE {prefix}_decisions_total counter")
+            for path, table in sorted(self._decisions.items()):
+                for i, decision in enumerate(DECISIONS):
+                    for j, segment in enumerate(SEGMENTS):
+                        lines.append(f'{prefix}_decisions_total{{path="{path}",decision="{decision}",'
+                                     f'segment="{segment}"}} {int(table[i, j])}')
+        return '\n'.join(lines) + '\n'
+
+
+def _stage_order(stage):
+    return STAGES.index(stage) if stage in STAGES else len(STAGES)
+
+
+def _to_ms(seconds):
+    return seconds * 1000 if seconds is not None else None
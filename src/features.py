@@ -0,0 +1,499 @@
+"""
+Feature engineering shared by training and serving.
+
+The transforms of notebooks 04 (Lending Club, risk model) and 05 (Prosper, elasticity model)
+as one pipeline per dataset. Each dataset's derived columns are written once, in a function
+that works on whole columns (NumPy arrays) and on single values alike, so a training chunk and a
+live applicant go through the same code:
+
+    pipeline = FeaturePipeline.load('models/features_lending_club.json')
+    pipeline.transform_chunk(raw_df)          # (X, y) for a chunk of the raw CSV
+    pipeline.transform_record(application)    # one applicant's feature dict, in microseconds
+    applicant_features({'fico_range_low': 720, 'annual_inc': 75000, 'loan_amnt': 15000, 'term': 36})
+
+Training runs chunk by chunk with explicit dtypes, so memory is bounded by the chunk size: a
+first pass fits the encodings (the categories get_dummies sees and the clv_segment terciles;
+cached as JSON next to the models and re-fitted when the CSV changes), a second pass writes
+sharded Parquet per split:
+
+    python src/features.py lending_club data/accepted_2007_to_2018Q4.csv --out data/processed/lending_club
+    python src/features.py prosper data/Prosper_Synthetic_Elasticity.csv --out data/processed/prosper
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import argparse
+import json
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENCODINGS_VERSION = 1
+SPLITS = (('train', 0.6), ('val', 0.2), ('test', 0.2))  # the notebooks' 60 / 20 / 20 split
+
+GRADE_MAP = {"A": 1, "B": 2, "C": 3, "D": 4, "E": 5, "F": 6, "G": 7}
+CLV_LABELS = ["Low", "Medium", "High"]
+
+# Serving inputs the dashboard and CLI do not ask for (Lending Club raw values)
+SERVING_DEFAULTS = {
+    'total_acc': 15,
+    'home_ownership': 'RENT',
+    'purpose': 'debt_consolidation',
+    'emp_length': '5 years',
+}
+
+
+# --- Transforms: each takes a column (NumPy array) or a single value ---
+
+def _is_scalar(values):
+    return np.ndim(values) == 0
+
+
+def _nonzero(values):
+    """The notebooks' .replace(0, 0.01), so an income of 0 never divides."""
+    return values + (values == 0) * 0.01
+
+
+def _years_between(start, end, date_format=None):
+    """(end - start) in days / 365; 0 where a date is missing or unparseable."""
+    if _is_scalar(start):
+        if not isinstance(start, str) or not isinstance(end, str):
+            return 0.0
+        delta = (pd.to_datetime(end, format=date_format, errors='coerce')
+                 - pd.to_datetime(start, format=date_format, errors='coerce'))
+        return 0.0 if pd.isna(delta) else delta.days / 365
+    delta = (pd.to_datetime(pd.Series(end), format=date_format, errors='coerce')
+             - pd.to_datetime(pd.Series(start), format=date_format, errors='coerce'))
+    return (delta.dt.days / 365).fillna(0).to_numpy(dtype=float)
+
+
+def _term_months(values):
+    """' 36 months' (Lending Club) or a number of months -> months."""
+    if _is_scalar(values):
+        if isinstance(values, str):
+            match = re.search(r'\d+', values)
+            return float(match.group()) if match else np.nan
+        return float(values)
+    if values.dtype == object:
+        return pd.Series(values).str.extract(r'(\d+)')[0].astype(float).to_numpy()
+    return values.astype(float)
+
+
+def _where(condition, true_value, false_value):
+    if _is_scalar(condition):
+        return true_value if condition else false_value
+    return np.where(condition, true_value, false_value).astype(object)
+
+
+def _lookup(values, mapping):
+    if _is_scalar(values):
+        return float(mapping.get(values, np.nan))
+    return pd.Series(values).map(mapping).to_numpy(dtype=float)
+
+
+def _flag(values):
+    """Prosper's True/False columns (read as text) -> 0/1."""
+    if _is_scalar(values):
+        return int(values in (True, 'True'))
+    return pd.Series(values).isin([True, 'True']).to_numpy().astype(np.int64)
+
+
+def _qcut_labels(values, edges, labels):
+    """pd.qcut's bins for fitted edges: right-closed, lowest edge included, NaN outside."""
+    if _is_scalar(values):
+        if not edges[0] <= values <= edges[-1]:
+            return np.nan
+        return labels[max(bisect_left(edges, values) - 1, 0)]
+    ids = np.searchsorted(edges, values, side='left') - 1
+    inside = (values >= edges[0]) & (values <= edges[-1])
+    out = np.full(len(values), np.nan, dtype=object)
+    out[inside] = np.asarray(labels, dtype=object)[np.maximum(ids[inside], 0)]
+    return out
+
+
+def _engineer_lending_club(c):
+    """Notebook 04's derived columns, from the raw Lending Club fields."""
+    annual_inc = _nonzero(c['annual_inc'])
+    term_years = _term_months(c['term']) / 12
+    return {
+        'risk_score_norm': (c['fico_range_low'] - 300) / 550,
+        'annual_inc': annual_inc,
+        'loan_to_income': c['loan_amnt'] / annual_inc,
+        'relationship_depth_years': _years_between(c['earliest_cr_line'], c['issue_d'], '%b-%Y'),
+        'term_years': term_years,
+        'est_revenue': c['loan_amnt'] * (c['int_rate'] / 100) * term_years,
+        'price_sensitivity_proxy': _where(c['fico_range_low'] > 720, 'High_Sensitivity', 'Low_Sensitivity'),
+        'grade': _lookup(c['grade'], GRADE_MAP),
+    }
+
+
+def _engineer_prosper(c):
+    """Notebook 05's derived columns, from the synthetic Prosper fields."""
+    annual_inc = _nonzero(c['StatedMonthlyIncome'] * 12)
+    term_years = c['Term'] / 12
+    return {
+        'risk_score_norm': (c['CreditScoreRangeLower'] - 300) / 550,
+        'loan_to_income': c['LoanOriginalAmount'] / annual_inc,
+        'relationship_depth_years': _years_between(c['FirstRecordedCreditLine'], c['ListingCreationDate']),
+        'est_revenue': c['LoanOriginalAmount'] * c['OfferedRate'] * term_years,
+        'price_sensitivity_proxy': _where(c['ProsperScore'] >= 9, 'High_Sensitivity', 'Low_Sensitivity'),
+        'IsBorrowerHomeowner': _flag(c['IsBorrowerHomeowner']),
+    }
+
+
+# --- Dataset specs ---
+# dtypes: every raw column read, with its type (no per-chunk inference)
+# features: the notebook's feature list, in order; numeric: the ones filled with 0 when missing
+# categorical: one-hot encoded (drop_first) in this order, after the other features
+# renames: substring replacements on the one-hot column names
+
+LENDING_CLUB = {
+    'name': 'lending_club',
+    'dtypes': {
+        'loan_status': 'object', 'fico_range_low': 'float64', 'annual_inc': 'float64', 'loan_amnt': 'float64',
+        'earliest_cr_line': 'object', 'issue_d': 'object', 'term': 'object', 'int_rate': 'float64',
+        'installment': 'float64', 'dti': 'float64', 'revol_util': 'float64', 'revol_bal': 'float64',
+        'total_acc': 'float64', 'home_ownership': 'object', 'grade': 'object', 'sub_grade': 'object',
+        'verification_status': 'object', 'purpose': 'object', 'emp_length': 'object',
+    },
+    'engineer': _engineer_lending_club,
+    'target': 'target',
+    'target_source': 'loan_status',
+    'target_map': {'Fully Paid': 0, 'Charged Off': 1, 'Default': 1},  # other statuses are dropped
+    'features': [
+        'loan_amnt', 'term_years', 'int_rate', 'installment', 'annual_inc', 'dti', 'revol_util', 'revol_bal',
+        'total_acc', 'home_ownership', 'risk_score_norm', 'loan_to_income', 'relationship_depth_years',
+        'clv_segment', 'price_sensitivity_proxy', 'grade', 'sub_grade', 'verification_status', 'purpose',
+        'emp_length',
+    ],
+    'numeric': [
+        'loan_amnt', 'term_years', 'int_rate', 'installment', 'annual_inc', 'dti', 'revol_util', 'revol_bal',
+        'total_acc', 'risk_score_norm', 'loan_to_income', 'relationship_depth_years',
+    ],
+    'categorical': ['sub_grade', 'home_ownership', 'verification_status', 'purpose', 'emp_length',
+                    'clv_segment', 'price_sensitivity_proxy'],
+    'renames': {"emp_length_< 1": "emp_length_less_than_1"},
+}
+
+PROSPER = {
+    'name': 'prosper',
+    'dtypes': {
+        'OfferedRate': 'float64', 'LoanOriginalAmount': 'float64', 'Term': 'float64', 'ProsperScore': 'float64',
+        'CreditScoreRangeLower': 'float64', 'DebtToIncomeRatio': 'float64', 'StatedMonthlyIncome': 'float64',
+        'EmploymentStatus': 'object', 'IsBorrowerHomeowner': 'object', 'FirstRecordedCreditLine': 'object',
+        'ListingCreationDate': 'object', 'Accepted': 'int64',
+    },
+    'engineer': _engineer_prosper,
+    'target': 'Accepted',
+    'target_source': 'Accepted',
+    'target_map': None,
+    'features': [
+        'OfferedRate', 'LoanOriginalAmount', 'Term', 'ProsperScore', 'CreditScoreRangeLower', 'DebtToIncomeRatio',
+        'StatedMonthlyIncome', 'EmploymentStatus', 'IsBorrowerHomeowner', 'risk_score_norm', 'loan_to_income',
+        'relationship_depth_years', 'clv_segment', 'price_sensitivity_proxy',
+    ],
+    'numeric': [
+        'OfferedRate', 'LoanOriginalAmount', 'Term', 'ProsperScore', 'CreditScoreRangeLower', 'DebtToIncomeRatio',
+        'StatedMonthlyIncome', 'risk_score_norm', 'loan_to_income', 'relationship_depth_years',
+    ],
+    'categorical': ['EmploymentStatus', 'clv_segment', 'price_sensitivity_proxy'],
+    'renames': {},
+}
+
+SPECS = {spec['name']: spec for spec in (LENDING_CLUB, PROSPER)}
+
+
+class _Record(dict):
+    """An applicant dict where absent fields read as missing (NaN), as blank CSV cells do."""
+    def __missing__(self, key):
+        return np.nan
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _dummy_name(column, value, renames):
+    name = f"{column}_{value}"
+    for old, new in renames.items():
+        name = name.replace(old, new)
+    return name
+
+
+class FeaturePipeline:
+    """
+    One dataset's feature transform. `encodings` (from fit() or load()) holds the categories each
+    one-hot column was fitted on and the clv_segment tercile edges; without them the pipeline can
+    still serve single applicants (see transform_record) but not build training data.
+    """
+    def __init__(self, spec, encodings=None):
+        self.spec = SPECS[spec] if isinstance(spec, str) else spec
+        self.encodings = encodings
+        self._compile()
+
+    def _compile(self):
+        """Resolves the output columns and per-category dummy names once, for both transforms."""
+        spec = self.spec
+        renames = spec['renames']
+        self._other = [col for col in spec['features'] if col not in spec['categorical'] and col not in spec['numeric']]
+        self._clv_edges = None
+        self._dummies = None
+        self.columns = None
+        if self.encodings is None:
+            return
+        self._clv_edges = tuple(self.encodings['clv_edges'])
+        self._dummies = [
+            (col, [(value, _dummy_name(col, value, renames))
+                   for value in self.encodings['categories'][col][1:]])   # drop_first
+            for col in spec['categorical']
+        ]
+        plain = [col for col in spec['features'] if col not in spec['categorical']]
+        self.columns = plain + [name for _, names in self._dummies for _, name in names]
+
+    @property
+    def fitted(self):
+        return self.encodings is not None
+
+    # --- Training ---
+
+    def _read(self, csv_path, chunk_size):
+        spec = self.spec
+        return pd.read_csv(csv_path, usecols=list(spec['dtypes']), dtype=spec['dtypes'], chunksize=chunk_size)
+
+    def _engineer_chunk(self, raw):
+        """Raw chunk -> (dict of engineered columns, target array), after the notebook's row filter."""
+        spec = self.spec
+        if spec['target_map'] is not None:
+            raw = raw[raw[spec['target_source']].isin(list(spec['target_map']))]
+            target = raw[spec['target_source']].map(spec['target_map']).to_numpy(dtype=np.int64)
+        else:
+            target = raw[spec['target_source']].to_numpy(dtype=np.int64)
+        columns = _Record({col: raw[col].to_numpy() for col in raw.columns})
+        columns.update(spec['engineer'](columns))
+        return columns, target
+
+    def fit(self, csv_path, chunk_size=200000, progress=True):
+        """
+        First pass over the CSV: the categories get_dummies would see (sorted, per column) and the
+        est_revenue terciles behind clv_segment. Keeps one float64 per row (est_revenue) plus
+        the category sets. Returns self.
+        """
+        spec = self.spec
+        categories = {col: set() for col in spec['categorical'] if col != 'clv_segment'}
+        revenue = []
+        rows = 0
+        for raw in tqdm(self._read(csv_path, chunk_size), desc="Fitting Encodings", unit="chunk", disable=not progress):
+            columns, _ = self._engineer_chunk(raw)
+            rows += len(columns[spec['target_source']])
+            revenue.append(np.asarray(columns['est_revenue'], dtype=float))
+            for col, seen in categories.items():
+                seen.update(value for value in pd.unique(columns[col]) if isinstance(value, str))
+
+        revenue = np.concatenate(revenue) if revenue else np.empty(0)
+        revenue = revenue[~np.isnan(revenue)]
+        edges = np.quantile(revenue, np.linspace(0, 1, len(CLV_LABELS) + 1)) if len(revenue) else [0.0] * 4
+        encodings = {col: sorted(seen) for col, seen in categories.items()}
+        encodings['clv_segment'] = list(CLV_LABELS)
+        self.encodings = {
+            'format': ENCODINGS_VERSION,
+            'dataset': spec['name'],
+            'source': _source_stamp(csv_path),
+            'rows': rows,
+            'categories': encodings,
+            'clv_edges': [float(edge) for edge in edges],
+        }
+        self._compile()
+        return self
+
+    def transform_chunk(self, raw):
+        """A raw CSV chunk -> (X DataFrame with the training columns and dtypes, target array)."""
+        if not self.fitted:
+            raise ValueError("FeaturePipeline.transform_chunk() needs fitted encodings (fit() or load())")
+        spec = self.spec
+        columns, target = self._engineer_chunk(raw)
+        columns['clv_segment'] = _qcut_labels(np.asarray(columns['est_revenue'], dtype=float), self._clv_edges,
+                                              CLV_LABELS)
+        n = len(target)
+
+        data = {}
+        for col in spec['features']:
+            if col in spec['numeric']:
+                values = np.asarray(columns[col], dtype=np.float64)
+                data[col] = np.where(np.isnan(values), 0.0, values)
+            elif col not in spec['categorical']:
+                data[col] = np.asarray(columns[col])
+        for col, names in self._dummies:
+            values = columns[col]
+            for value, name in names:
+                data[name] = values == value
+        X = pd.DataFrame(data, index=pd.RangeIndex(n), columns=self.columns)
+        return X, target
+
+    def build(self, csv_path, out_dir, chunk_size=200000, seed=42, progress=True):
+        """
+        Second pass: writes each chunk's rows to <out_dir>/<split>/part-NNNNN.parquet (features plus
+        the target column), split 60/20/20 by a seeded uniform per row. Returns row counts per split.
+        """
+        if not self.fitted:
+            raise ValueError("FeaturePipeline.build() needs fitted encodings (fit() or load())")
+        for split, _ in SPLITS:
+            split_dir = os.path.join(out_dir, split)
+            os.makedirs(split_dir, exist_ok=True)
+            for name in os.listdir(split_dir):
+                if name.startswith('part-') and name.endswith('.parquet'):
+                    os.remove(os.path.join(split_dir, name))
+
+        bounds = np.cumsum([fraction for _, fraction in SPLITS])
+        rng = np.random.default_rng(seed)  # drawn in row order, so splits don't depend on chunk_size
+        counts = {split: 0 for split, _ in SPLITS}
+        reader = self._read(csv_path, chunk_size)
+        for part, raw in enumerate(tqdm(reader, desc="Building Features", unit="chunk", disable=not progress)):
+            X, target = self.transform_chunk(raw)
+            X[self.spec['target']] = target
+            assignment = np.searchsorted(bounds, rng.random(len(X)), side='right')
+            for k, (split, _) in enumerate(SPLITS):
+                rows = X[assignment == k]
+                if len(rows):
+                    rows.to_parquet(os.path.join(out_dir, split, f"part-{part:05d}.parquet"), index=False)
+                    counts[split] += len(rows)
+        return counts
+
+    # --- Serving ---
+
+    def transform_record(self, record):
+        """
+        One applicant's features with the training transform. Missing numeric fields are 0, as in
+        training. Fitted: every one-hot column, as in the training rows. Unfitted: only the indicator
+        of the applicant's own category (the engine scores absent columns as 0, so the risk model
+        sees the same row either way) and no clv_segment.
+        """
+        spec = self.spec
+        c = _Record(record)
+        c.update(spec['engineer'](c))
+        if self._clv_edges is not None:
+            c['clv_segment'] = _qcut_labels(c['est_revenue'], self._clv_edges, CLV_LABELS)
+
+        features = {}
+        for col in spec['numeric']:
+            value = c[col]
+            features[col] = 0.0 if value != value else float(value)
+        for col in self._other:
+            features[col] = c[col]
+        if self._dummies is not None:
+            for col, names in self._dummies:
+                value = c[col]
+                for category, name in names:
+                    features[name] = value == category
+        else:
+            for col in spec['categorical']:
+                value = c[col]
+                if isinstance(value, str):
+                    features[_dummy_name(col, value, spec['renames'])] = True
+        return features
+
+    # --- Encodings cache ---
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.encodings, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            encodings = json.load(f)
+        if encodings.get('format') != ENCODINGS_VERSION:
+            raise ValueError(f"Feature encodings v{encodings.get('format')} not supported "
+                             f"(expected v{ENCODINGS_VERSION}). Re-fit with src/features.py.")
+        return cls(encodings['dataset'], encodings)
+
+    @classmethod
+    def for_source(cls, spec, csv_path, encodings_path, chunk_size=200000, refit=False, progress=True):
+        """The cached encodings if they were fitted on this exact CSV (size and mtime), else a fresh fit."""
+        if not refit and os.path.exists(encodings_path):
+            pipeline = cls.load(encodings_path)
+            if pipeline.encodings['source'] == _source_stamp(csv_path) and pipeline.spec is SPECS[spec]:
+                return pipeline
+        pipeline = cls(spec).fit(csv_path, chunk_size, progress)
+        pipeline.save(encodings_path)
+        return pipeline
+
+
+def default_encodings_path(dataset):
+    return os.path.join(ROOT, 'models', f'features_{dataset}.json')
+
+
+_serving_pipeline = None
+
+
+def serving_pipeline():
+    """The Lending Club (risk model) pipeline, with its training encodings if they were saved."""
+    global _serving_pipeline
+    if _serving_pipeline is None:
+        path = default_encodings_path('lending_club')
+        _serving_pipeline = FeaturePipeline.load(path) if os.path.exists(path) else FeaturePipeline(LENDING_CLUB)
+    return _serving_pipeline
+
+
+def applicant_features(application, pipeline=None):
+    """
+    The engine's applicant dict for one application in Lending Club terms (fico_range_low,
+    annual_inc, loan_amnt, term, dti, revol_util, ...; SERVING_DEFAULTS fill the rest): the risk
+    model's features from the training transform, plus the elasticity model's loan amount.
+    """
+    application = dict(SERVING_DEFAULTS, **application)
+    features = (pipeline or serving_pipeline()).transform_record(application)
+    features['LoanOriginalAmount'] = application['loan_amnt']
+    return features
+
+
+def load_split(out_dir, split, columns=None):
+    """One split written by build(), as (X, y)."""
+    data = pd.read_parquet(os.path.join(out_dir, split), columns=columns)
+    targets = [spec['target'] for spec in SPECS.values() if spec['target'] in data.columns]
+    if not targets:
+        return data, None
+    return data.drop(columns=targets[0]), data[targets[0]]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Build model training features, chunk by chunk')
+    parser.add_argument('dataset', choices=sorted(SPECS), help='lending_club (risk model) or prosper (elasticity)')
+    parser.add_argument('input', help='Raw CSV (Lending Club accepted loans, or the synthetic Prosper set)')
+    parser.add_argument('--out', required=True, help='Output directory for the train/val/test Parquet shards')
+    parser.add_argument('--encodings', default=None,
+                        help='Fitted encodings JSON (default: models/features_<dataset>.json, read by serving)')
+    parser.add_argument('--chunk-size', type=int, default=200000, help='CSV rows per chunk')
+    parser.add_argument('--seed', type=int, default=42, help='Split seed')
+    parser.add_argument('--refit', action='store_true', help='Re-fit the encodings even if cached for this CSV')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    encodings_path = args.encodings or default_encodings_path(args.dataset)
+
+    print(f"⏳ Preparing {args.dataset} encodings (cached per CSV)...")
+    try:
+        pipeline = FeaturePipeline.for_source(args.dataset, args.input, encodings_path, args.chunk_size, args.refit)
+    except FileNotFoundError as e:
+        print(f"❌ CRITICAL ERROR: Input file not found. {e}")
+        sys.exit(1)
+    print(f"✅ {len(pipeline.columns)} features; encodings at {encodings_path}")
+
+    print("⏳ Writing Parquet shards...")
+    counts = pipeline.build(args.input, args.out, args.chunk_size, args.seed)
+    print(f"✅ Features written to {args.out}")
+    for split, n in counts.items():
+        print(f"   {split:<5}: {n:,} rows")
+
+
+if __name__ == "__main__":
+    main()
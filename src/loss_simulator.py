@@ -0,0 +1,270 @@
+"""
+Monte Carlo loss and profit distribution of a priced book.
+
+The engine reports expected profit only. The simulator re-uses its per-loan inputs (PD,
+P(Accept) at the offered rate, rate, amount, term, LGD) and draws correlated outcomes for
+every approved loan on n_paths economic paths, driven by one factor Z ~ N(0, 1) per path:
+
+    M         = pd_multiplier * exp(shock_vol * Z - shock_vol**2 / 2)   (mean: pd_multiplier)
+    PD        = min(unstressed PD * M, 1)
+    P(Accept) = odds scaled by exp(accept_loading * Z)                   (downturn: more offers taken)
+
+All loans on a path share Z, so defaults cluster; given Z they are independent. A booked
+loan earns (rate - CoF) * amount * term, or loses LGD * amount if it defaults (the engine's
+profit model). One uniform per loan and path settles both events:
+u < P(Accept) * PD -> booked and defaulted, u < P(Accept) -> booked and repaid.
+
+Paths are split into tasks across a process pool; each task walks the loans in blocks of
+about BLOCK_ELEMENTS (path, loan) values and keeps only per-path totals, so memory does not
+grow with the book (1M loans x 10k paths = 1e10 draws). Results depend on the seed only,
+not on the worker count.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from src.pricing_engine import LoanPricingEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BLOCK_ELEMENTS = 1 << 22   # (path, loan) values per block: 16MB per float32 array
+PATHS_PER_TASK = 250
+LEVELS = (0.95, 0.99, 0.999)
+PROFIT_QUANTILES = (0.01, 0.05, 0.5, 0.95, 0.99)
+
+# Per-loan simulation inputs, float32 (see LossSimulator.book)
+BOOK_ARRAYS = ('pd', 'accept_prob', 'gain', 'loss', 'amount')
+
+_book = None
+
+
+def _init_worker(book):
+    """Hands the book's arrays to a worker process once."""
+    global _book
+    _book = book
+
+
+def simulate_paths(multipliers, accept_shocks, seed, task, book=None):
+    """
+    Book totals on the given paths (one PD multiplier and acceptance odds factor per path).
+    Returns a dict of per-path arrays: loss, profit, booked_volume, defaults.
+    """
+    book = book if book is not None else _book
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1, task)))
+    n_paths, n_loans = len(multipliers), len(book['pd'])
+    m = np.asarray(multipliers, dtype=np.float32)[:, None]
+    k = np.asarray(accept_shocks, dtype=np.float32)[:, None]
+
+    totals = {name: np.zeros(n_paths) for name in ('loss', 'profit', 'booked_volume', 'defaults')}
+    loans_per_block = max(BLOCK_ELEMENTS // n_paths, 1)
+    for start in range(0, n_loans, loans_per_block):
+        sl = slice(start, start + loans_per_block)
+        a = book['accept_prob'][sl]
+        # Odds * k, written so P(Accept) = 1 stays 1: a*k / (1 - a + a*k)
+        accept = (a * k) / (1 + a * (k - 1))
+        default = np.minimum(book['pd'][sl] * m, 1)
+        default *= accept                                  # P(booked and defaulted)
+
+        u = rng.random(accept.shape, dtype=np.float32)
+        booked = (u < accept).astype(np.float32)
+        defaulted = (u < default).astype(np.float32)
+
+        gain, loss = book['gain'][sl], book['loss'][sl]
+        totals['loss'] += defaulted @ loss
+        totals['profit'] += booked @ gain - defaulted @ (gain + loss)
+        totals['booked_volume'] += booked @ book['amount'][sl]
+        totals['defaults'] += defaulted.sum(axis=1)
+    return totals
+
+
+def _level_key(level):
+    return f"{level * 100:g}%"
+
+
+def summarize_paths(paths, expected_profit=None, levels=LEVELS, profit_quantiles=PROFIT_QUANTILES):
+    """Loss distribution (EL, VaR, ES) and profit quantiles over the simulated paths."""
+    loss = paths['loss'].to_numpy()
+    profit = paths['profit'].to_numpy()
+    var = {_level_key(level): float(np.quantile(loss, level)) for level in levels}
+    summary = {
+        'paths': len(paths),
+        'loss': {
+            'expected': float(loss.mean()),
+            'std': float(loss.std()),
+            'var': var,
+            'expected_shortfall': {key: float(loss[loss >= value].mean()) for key, value in var.items()},
+            'unexpected': {key: value - float(loss.mean()) for key, value in var.items()},
+        },
+        'profit': {
+            'expected': float(profit.mean()),
+            'std': float(profit.std()),
+            'quantiles': {_level_key(q): float(np.quantile(profit, q)) for q in profit_quantiles},
+            'prob_loss': float((profit < 0).mean()),
+        },
+        'defaults': {
+            'expected': float(paths['defaults'].mean()),
+            'max': int(paths['defaults'].max()),
+        },
+    }
+    if expected_profit is not None:
+        summary['profit']['engine_expected'] = float(expected_profit)
+    return summary
+
+
+class LossSimulator:
+    """
+    Simulated loss / profit distribution of the loans the engine approves (see the module docstring).
+    shock_vol: volatility of the log PD multiplier across paths (0 = every path at pd_multiplier).
+    accept_loading: change in acceptance log-odds per standard deviation of the factor.
+    workers: processes for the paths (1 = simulate in this process).
+    """
+    def __init__(self, engine, n_paths=10000, shock_vol=0.5, accept_loading=0.25, seed=0, workers=None,
+                 paths_per_task=PATHS_PER_TASK):
+        self.engine = engine
+        self.n_paths = n_paths
+        self.shock_vol = shock_vol
+        self.accept_loading = accept_loading
+        self.seed = seed
+        self.workers = workers or os.cpu_count()
+        self.paths_per_task = paths_per_task
+
+    def book(self, applicants_df, pd_multiplier=1.0, cost_of_funds=None, chunk_size=50000):
+        """
+        Prices the applicants once and returns the approved loans' simulation inputs: a dict of
+        float32 arrays (BOOK_ARRAYS, with the unstressed PD) plus their index and the book's
+        expected profit at pd_multiplier.
+        """
+        engine = self.engine
+        cost_of_funds = engine.cost_of_funds if cost_of_funds is None else cost_of_funds
+        base_pd = engine._predict_pd_batch(applicants_df)
+        quotes = engine.quote_batch(applicants_df, pd_multiplier, cost_of_funds, chunk_size, base_pd=base_pd)
+        approved = quotes.decision_codes == 0
+
+        risk_scores, loan_amts, term_years = (a[approved] for a in engine._applicant_arrays(applicants_df))
+        rates = quotes.optimal_rate[approved]
+        accept_probs = np.empty(len(rates))
+        for start in range(0, len(rates), chunk_size):
+            sl = slice(start, start + chunk_size)
+            accept_probs[sl] = engine._expected_profit(
+                rates[sl, None], quotes.prob_default[approved][sl], risk_scores[sl], loan_amts[sl], term_years[sl],
+                cost_of_funds
+            )[0][:, 0]
+
+        arrays = {
+            'pd': base_pd[approved],
+            'accept_prob': accept_probs,
+            'gain': (rates - cost_of_funds) * loan_amts * term_years,
+            'loss': engine.lgd * loan_amts,
+            'amount': loan_amts,
+        }
+        book = {name: np.ascontiguousarray(arrays[name], dtype=np.float32) for name in BOOK_ARRAYS}
+        book['index'] = applicants_df.index[approved]
+        book['expected_profit'] = float(quotes.max_profit[approved].sum())
+        return book
+
+    def path_factors(self, pd_multiplier=1.0):
+        """The economic factor Z per path, with its PD multiplier and acceptance odds factor."""
+        rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(0,)))
+        z = rng.standard_normal(self.n_paths)
+        multipliers = pd_multiplier * np.exp(self.shock_vol * z - self.shock_vol ** 2 / 2)
+        return z, multipliers, np.exp(self.accept_loading * z)
+
+    def run(self, book, pd_multiplier=1.0, progress=True):
+        """Simulates the paths for a book from book(). Returns a DataFrame with one row per path."""
+        z, multipliers, accept_shocks = self.path_factors(pd_multiplier)
+        loans = {name: book[name] for name in BOOK_ARRAYS}
+        tasks = [(multipliers[start:start + self.paths_per_task], accept_shocks[start:start + self.paths_per_task],
+                  self.seed, task)
+                 for task, start in enumerate(range(0, self.n_paths, self.paths_per_task))]
+
+        bar = tqdm(total=self.n_paths, desc="Simulating Paths", unit="path", disable=not progress)
+        results = []
+        if self.workers == 1:
+            for args in tasks:
+                results.append(simulate_paths(*args, book=loans))
+                bar.update(len(args[0]))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(loans,)) as pool:
+                for args, totals in zip(tasks, pool.map(simulate_paths, *zip(*tasks))):
+                    results.append(totals)
+                    bar.update(len(args[0]))
+        bar.close()
+
+        paths = pd.DataFrame({'factor': z, 'pd_multiplier': multipliers})
+        for name in results[0]:
+            paths[name] = np.concatenate([totals[name] for totals in results])
+        return paths
+
+    def simulate(self, applicants_df, pd_multiplier=1.0, cost_of_funds=None, progress=True):
+        """Prices the book and simulates it. Returns (paths DataFrame, summary dict)."""
+        book = self.book(applicants_df, pd_multiplier, cost_of_funds)
+        paths = self.run(book, pd_multiplier, progress)
+        summary = summarize_paths(paths, book['expected_profit'])
+        summary.update({
+            'applicants': len(applicants_df),
+            'loans': len(book['pd']),
+            'exposure': float(book['amount'].sum(dtype=float)),
+            'pd_multiplier': pd_multiplier,
+            'shock_vol': self.shock_vol,
+            'accept_loading': self.accept_loading,
+            'seed': self.seed,
+        })
+        return paths, summary
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Adaptive Loan Pricing Engine - Monte Carlo Loss Simulator')
+    parser.add_argument('--applicants', required=True, help='CSV of applicants (engine feature columns)')
+    parser.add_argument('--paths', type=int, default=10000, help='Number of simulated economic paths')
+    parser.add_argument('--shock-vol', type=float, default=0.5, help='Volatility of the log PD multiplier')
+    parser.add_argument('--accept-loading', type=float, default=0.25,
+                        help='Acceptance log-odds shift per std. dev. of the economic factor')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--output', default=None, help='Optional per-path results CSV')
+    parser.add_argument('--summary', default=None, help='Optional path for the summary JSON')
+    parser.add_argument('--risk-model', default=os.path.join(ROOT, 'models/risk_model_xgb.pkl'))
+    parser.add_argument('--elasticity-model', default=os.path.join(ROOT, 'models/elasticity_model_logit.pkl'))
+    parser.add_argument('--cof', type=float, default=0.04, help='Cost of Funds')
+    parser.add_argument('--pd-multiplier', type=float, default=1.0, help='PD stress multiplier (path mean)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    print("⏳ Initializing Adaptive Pricing Engine...")
+    engine = LoanPricingEngine(args.risk_model, args.elasticity_model, cost_of_funds=args.cof)
+    applicants = pd.read_csv(args.applicants)
+
+    simulator = LossSimulator(engine, n_paths=args.paths, shock_vol=args.shock_vol,
+                              accept_loading=args.accept_loading, seed=args.seed, workers=args.workers)
+    print(f"⏳ Simulating {args.paths} paths for {len(applicants)} applicants...")
+    paths, summary = simulator.simulate(applicants, pd_multiplier=args.pd_multiplier)
+
+    loss, profit = summary['loss'], summary['profit']
+    print(f"\n✅ Simulated {summary['loans']} approved loans (exposure ${summary['exposure']:,.0f})")
+    print(f"Expected Loss:   ${loss['expected']:,.0f}")
+    for key in loss['var']:
+        print(f"   VaR {key:>6}: ${loss['var'][key]:,.0f}   ES: ${loss['expected_shortfall'][key]:,.0f}")
+    print(f"Expected Profit: ${profit['expected']:,.0f} (engine: ${profit['engine_expected']:,.0f})")
+    print("   " + "   ".join(f"{key}: ${value:,.0f}" for key, value in profit['quantiles'].items()))
+    print(f"   P(book loses money): {profit['prob_loss']:.2%}")
+
+    if args.output:
+        paths.to_csv(args.output, index=False)
+        print(f"   Per-path results saved to: {args.output}")
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Compact, versioned model artifacts for fast engine start-up.
+
+An artifact directory holds:
+    risk_model.json   native XGBoost booster (canonical copy, loadable by xgboost itself)
+    engine.npz        elasticity coefficients, feature schema and the booster's trees
+                      flattened into NumPy arrays
+
+Loading only needs NumPy: no pickle, no statsmodels, no xgboost/sklearn import.
+Export once from the training pickles:
+    python src/model_artifacts.py --out models/artifacts
+"""
+import os
+import sys
+import argparse
+import json
+
+import numpy as np
+
+ARTIFACT_VERSION = 1
+BOOSTER_FILE = 'risk_model.json'
+ARRAYS_FILE = 'engine.npz'
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TreeEnsembleClassifier:
+    """
+    NumPy scorer for a binary:logistic XGBoost booster, exposing what the engine uses from
+    XGBClassifier / Booster: predict_proba(), get_booster().feature_names and inplace_predict().
+    All trees are walked together, one depth level per step.
+    """
+    def __init__(self, feature_names, roots, left, right, feature, threshold, default_left, value,
+                 max_depth, base_margin):
+        self.feature_names = list(feature_names)
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.value = value
+        self.max_depth = int(max_depth)
+        self.base_margin = np.float32(base_margin)
+
+    def get_booster(self):
+        # The engine reads .feature_names and calls inplace_predict() on the booster
+        return self
+
+    def predict_margin(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.default_left[node], x < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])  # leaves point at themselves
+        return self.base_margin + self.value[node].sum(axis=1, dtype=np.float32)
+
+    def inplace_predict(self, X, iteration_range=None):
+        """P(class 1) for a float32 matrix in feature_names order (mirrors Booster.inplace_predict)."""
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+
+    def predict_proba(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.feature_names].to_numpy(dtype=np.float32)
+        p = self.inplace_predict(X)
+        return np.column_stack([1.0 - p, p])
+
+
+def _flatten_trees(booster_json):
+    """Concatenates every tree of a booster JSON dump into global node arrays."""
+    learner = booster_json['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError(f"Unsupported objective: {learner['objective']['name']}")
+
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    trees = learner['gradient_booster']['model']['trees']
+
+    roots, left, right, feature, threshold, default_left, value = [], [], [], [], [], [], []
+    max_depth, offset = 0, 0
+    for tree in trees:
+        lc = np.asarray(tree['left_children'])
+        rc = np.asarray(tree['right_children'])
+        is_leaf = lc == -1
+        own = np.arange(len(lc)) + offset
+
+        roots.append(offset)
+        left.append(np.where(is_leaf, own, lc + offset))
+        right.append(np.where(is_leaf, own, rc + offset))
+        feature.append(np.where(is_leaf, 0, tree['split_indices']))
+        threshold.append(np.asarray(tree['split_conditions'], dtype=np.float32))
+        default_left.append(np.asarray(tree['default_left'], dtype=bool))
+        value.append(np.where(is_leaf, np.asarray(tree['split_conditions'], dtype=np.float32), 0))
+
+        # Depth of the deepest leaf, from the parent links
+        parents = np.asarray(tree['parents'])
+        depth = np.zeros(len(lc), dtype=int)
+        for node in range(1, len(lc)):
+            depth[node] = depth[parents[node]] + 1
+        max_depth = max(max_depth, depth.max())
+        offset += len(lc)
+
+    return {
+        'roots': np.asarray(roots, dtype=np.int32),
+        'left': np.concatenate(left).astype(np.int32),
+        'right': np.concatenate(right).astype(np.int32),
+        'feature': np.concatenate(feature).astype(np.int32),
+        'threshold': np.concatenate(threshold).astype(np.float32),
+        'default_left': np.concatenate(default_left),
+        'value': np.concatenate(value).astype(np.float32),
+        'max_depth': max_depth,
+        'base_margin': np.log(base_score / (1 - base_score)),
+    }
+
+
+ELASTICITY_COLUMNS = ['const', 'risk_score_norm', 'Rate_Subprime', 'Rate_NearPrime', 'Rate_Prime',
+                      'LoanOriginalAmount']
+
+
+def _export_booster(risk_model):
+    booster = risk_model.get_booster()
+    try:
+        # Early-stopped models predict with the best iteration only
+        booster = booster[:risk_model.best_iteration + 1]
+    except AttributeError:
+        pass
+    return booster
+
+
+def artifact_arrays(risk_model, elasticity_model):
+    """
+    The engine.npz contents (minus format_version) for a fitted XGBClassifier and
+    statsmodels Logit results, built in memory.
+    """
+    booster = _export_booster(risk_model)
+    params = elasticity_model.params
+    return {
+        'feature_names': np.asarray(booster.feature_names),
+        'elasticity_columns': np.asarray(ELASTICITY_COLUMNS),
+        'elasticity_params': np.asarray([params[col] for col in ELASTICITY_COLUMNS], dtype=float),
+        **_flatten_trees(json.loads(bytes(booster.save_raw('json'))))
+    }
+
+
+def export_artifacts(risk_model_path, elasticity_model_path, out_dir):
+    """
+    Converts the training pickles (XGBClassifier + statsmodels Logit results) into an artifact directory.
+    """
+    import joblib
+
+    risk_model = joblib.load(risk_model_path)
+    elasticity_model = joblib.load(elasticity_model_path)
+
+    os.makedirs(out_dir, exist_ok=True)
+    _export_booster(risk_model).save_model(os.path.join(out_dir, BOOSTER_FILE))
+    np.savez(
+        os.path.join(out_dir, ARRAYS_FILE),
+        format_version=ARTIFACT_VERSION,
+        **artifact_arrays(risk_model, elasticity_model)
+    )
+    return out_dir
+
+
+def read_artifact_arrays(artifact_dir):
+    """The engine.npz arrays of an artifact directory, as a dict (format version checked)."""
+    with np.load(os.path.join(artifact_dir, ARRAYS_FILE)) as data:
+        version = int(data['format_version'])
+        if version != ARTIFACT_VERSION:
+            raise ValueError(f"Artifact format v{version} not supported (expected v{ARTIFACT_VERSION}). "
+                             f"Re-export with src/model_artifacts.py.")
+        return {key: data[key] for key in data.files if key != 'format_version'}
+
+
+def models_from_arrays(arrays):
+    """(risk_model, elasticity_params) from artifact arrays; the arrays are used as-is, not copied."""
+    risk_model = TreeEnsembleClassifier(
+        [str(name) for name in arrays['feature_names']], arrays['roots'], arrays['left'], arrays['right'],
+        arrays['feature'], arrays['threshold'], arrays['default_left'], arrays['value'], arrays['max_depth'],
+        arrays['base_margin']
+    )
+    return risk_model, arrays['elasticity_params']
+
+
+def load_artifacts(artifact_dir):
+    """
+    Returns (risk_model, elasticity_params) from an artifact directory, using NumPy only.
+    """
+    return models_from_arrays(read_artifact_arrays(artifact_dir))
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Export fast-start model artifacts from the training pickles')
+    parser.add_argument('--risk-model', default=os.path.join(ROOT, 'models/risk_model_xgb.pkl'))
+    parser.add_argument('--elasticity-model', default=os.path.join(ROOT, 'models/elasticity_model_logit.pkl'))
+    parser.add_argument('--out', default=os.path.join(ROOT, 'models/artifacts'))
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    try:
+        export_artifacts(args.risk_model, args.elasticity_model, args.out)
+    except FileNotFoundError as e:
+        print(f"❌ CRITICAL ERROR: Model files not found. {e}")
+        sys.exit(1)
+    print(f"✅ Artifacts (format v{ARTIFACT_VERSION}) written to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
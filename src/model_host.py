@@ -0,0 +1,246 @@
+"""
+Loads the models once and shares them with worker processes, with versioned hot swap.
+
+The host converts the models to the fast-start artifact arrays (see model_artifacts.py) and
+publishes each version as one read-only shared-memory segment. Workers attach by name:
+the trees are mapped, not copied or unpickled, so a worker costs only its Python objects.
+
+    host = ModelHost(risk_model_path, elasticity_model_path)        # or artifact_dir=...
+    host.engine                                                      # engine for this process
+    pool = ProcessPoolExecutor(initializer=attach_worker, initargs=(host.name,))
+    ...                        # in a worker: engine = hosted_engine()
+    host.swap(artifact_dir='models/artifacts_v2')                    # roll out, no restart
+
+A swap loads and publishes the new version in full before flipping one version number, so
+a caller sees either the old engine or the new one. An engine obtained before the flip keeps
+the old models until the caller drops it. Workers must be started by the host's process
+(fork or spawn); on Python < 3.13 they share its resource tracker, which owns the segments.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import json
+import secrets
+import struct
+import threading
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from src.model_artifacts import artifact_arrays, models_from_arrays, read_artifact_arrays
+from src.pricing_engine import LoanPricingEngine
+
+SEGMENT_VERSION = 1
+CONTROL_BYTES = 8    # the current model version, little-endian uint64
+ALIGNMENT = 64
+
+# Artifact arrays that go in the segment; everything else is small and travels in the JSON header
+TREE_ARRAYS = ('roots', 'left', 'right', 'feature', 'threshold', 'default_left', 'value')
+
+ENGINE_SETTINGS = ('cost_of_funds', 'lgd', 'optimizer', 'policy_config')
+
+
+class _Segment(SharedMemory):
+    def __del__(self):
+        try:
+            self.close()
+        except (OSError, BufferError):
+            pass  # arrays still mapped at interpreter exit; the OS unmaps them
+
+
+def _attach(name):
+    try:
+        return _Segment(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return _Segment(name=name)
+
+
+def _publish(name, arrays, header):
+    """Creates the segment for one model version: header length, JSON header, aligned tree arrays."""
+    layout, offset = {}, 0
+    for key in TREE_ARRAYS:
+        layout[key] = {'dtype': arrays[key].dtype.str, 'shape': list(arrays[key].shape), 'offset': offset}
+        offset += -(-arrays[key].nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps(dict(header, arrays=layout)).encode()
+    data_start = -(-(8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    shm = _Segment(name=name, create=True, size=data_start + max(offset, 1))
+    struct.pack_into('<Q', shm.buf, 0, len(header))
+    shm.buf[8:8 + len(header)] = header
+    for key, spec in layout.items():
+        start = data_start + spec['offset']
+        shm.buf[start:start + arrays[key].nbytes] = np.ascontiguousarray(arrays[key]).tobytes()
+    return shm
+
+
+def _engine_from_segment(shm):
+    """A LoanPricingEngine scoring straight from the segment's (read-only) arrays."""
+    (header_len,) = struct.unpack_from('<Q', shm.buf, 0)
+    header = json.loads(bytes(shm.buf[8:8 + header_len]))
+    if header['format'] != SEGMENT_VERSION:
+        raise ValueError(f"Shared model format v{header['format']} not supported (expected v{SEGMENT_VERSION}). "
+                         f"Restart the workers with the host's src/model_host.py.")
+    data_start = -(-(8 + header_len) // ALIGNMENT) * ALIGNMENT
+
+    arrays = dict(header['values'], elasticity_params=np.asarray(header['values']['elasticity_params']))
+    for key, spec in header['arrays'].items():
+        count = int(np.prod(spec['shape']))
+        array = np.frombuffer(shm.buf, dtype=spec['dtype'], count=count,
+                              offset=data_start + spec['offset']).reshape(spec['shape'])
+        array.flags.writeable = False
+        arrays[key] = array
+    risk_model, elasticity_params = models_from_arrays(arrays)
+    # Set last, so the segment is closed only after the arrays above are released
+    risk_model._segment = shm
+
+    settings = header['engine']
+    engine = LoanPricingEngine(cost_of_funds=settings['cost_of_funds'], lgd=settings['lgd'],
+                               optimizer=settings['optimizer'], models=(risk_model, elasticity_params))
+    if settings['policy_config'] is not None:
+        engine.policy_config.update(settings['policy_config'])
+    return header['version'], engine
+
+
+class ModelClient:
+    """
+    A process's view of a ModelHost's models. `engine` re-reads the version number on every
+    access and attaches the new segment when it changed (one attach per worker per version).
+    """
+    def __init__(self, host_name, control=None):
+        self.host_name = host_name
+        self._control = control if control is not None else _attach(f"{host_name}_ctl")
+        self._lock = threading.Lock()
+        self._current = None  # (version, engine), replaced as one reference
+
+    def published_version(self):
+        return struct.unpack_from('<Q', self._control.buf, 0)[0]
+
+    @property
+    def version(self):
+        return self._current[0] if self._current is not None else None
+
+    @property
+    def engine(self):
+        version = self.published_version()
+        current = self._current
+        if current is None or current[0] != version:
+            with self._lock:
+                current = self._current
+                if current is None or current[0] != version:
+                    current = self._current = self._load(version)
+        return current[1]
+
+    def _load(self, version):
+        while True:
+            try:
+                loaded = _engine_from_segment(_attach(f"{self.host_name}_v{version}"))
+            except FileNotFoundError:
+                loaded = None  # superseded (and unlinked) before we attached
+            if loaded is not None and loaded[0] == version:
+                return loaded
+            newer = self.published_version()
+            if newer == version:
+                raise RuntimeError(f"Model version {version} of host '{self.host_name}' is not published")
+            version = newer
+
+
+class ModelHost(ModelClient):
+    """
+    Owns the shared models: loads each version once, publishes it and flips the version number.
+    Call close() (or use as a context manager) to unlink the segments.
+    """
+    def __init__(self, risk_model_path=None, elasticity_model_path=None, artifact_dir=None, cost_of_funds=0.04,
+                 lgd=0.6, optimizer='grid', policy_config=None, name=None):
+        name = name or f"lpe_{os.getpid()}_{secrets.token_hex(4)}"
+        control = _Segment(name=f"{name}_ctl", create=True, size=CONTROL_BYTES)
+        struct.pack_into('<Q', control.buf, 0, 0)
+        super().__init__(name, control)
+        self.name = name
+        self.settings = {'cost_of_funds': cost_of_funds, 'lgd': lgd, 'optimizer': optimizer,
+                         'policy_config': policy_config}
+        self._swap_lock = threading.Lock()
+        try:
+            self.swap(risk_model_path, elasticity_model_path, artifact_dir)
+        except Exception:
+            control.close()
+            control.unlink()
+            raise
+
+    @property
+    def engine(self):
+        return self._current[1]
+
+    def swap(self, risk_model_path=None, elasticity_model_path=None, artifact_dir=None, **settings):
+        """
+        Loads a new model version (from the pickles or an artifact directory) and makes it current
+        here and in every attached worker. Keyword settings (cost_of_funds, lgd, optimizer,
+        policy_config) override the previous version's. Returns the new version number.
+        """
+        unknown = set(settings) - set(ENGINE_SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown engine settings: {sorted(unknown)}")
+
+        if artifact_dir is not None:
+            arrays = read_artifact_arrays(artifact_dir)
+        else:
+            import joblib
+            arrays = artifact_arrays(joblib.load(risk_model_path), joblib.load(elasticity_model_path))
+
+        with self._swap_lock:
+            new_settings = dict(self.settings, **settings)
+            version = (self.version or 0) + 1
+            header = {
+                'format': SEGMENT_VERSION,
+                'version': version,
+                'engine': new_settings,
+                'values': {
+                    'feature_names': [str(name) for name in arrays['feature_names']],
+                    'elasticity_params': np.asarray(arrays['elasticity_params'], dtype=float).tolist(),
+                    'max_depth': int(arrays['max_depth']),
+                    'base_margin': float(arrays['base_margin']),
+                },
+            }
+            shm = _publish(f"{self.name}_v{version}", arrays, header)
+            try:
+                current = _engine_from_segment(shm)
+            except Exception:
+                shm.unlink()
+                raise
+
+            previous = self._current
+            self._current = current                                  # this process flips here
+            struct.pack_into('<Q', self._control.buf, 0, version)   # workers flip on their next call
+            self.settings = new_settings
+            if previous is not None:
+                # In-flight callers keep their mapping; the name goes so no one new attaches
+                previous[1].risk_model._segment.unlink()
+        return version
+
+    def close(self):
+        """Unlinks the current segment and the control block; attached workers keep their mapping."""
+        if self._current is not None:
+            self._current[1].risk_model._segment.unlink()
+        self._control.close()
+        self._control.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_client = None
+
+
+def attach_worker(host_name):
+    """ProcessPoolExecutor initializer: attaches this worker to a ModelHost (see hosted_engine)."""
+    global _client
+    _client = ModelClient(host_name)
+
+
+def hosted_engine():
+    """The current version's engine in a worker set up by attach_worker()."""
+    if _client is None:
+        raise RuntimeError("This process is not attached to a ModelHost (use attach_worker as initializer)")
+    return _client.engine
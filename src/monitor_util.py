@@ -25,7 +25,7 @@ def calculate_psi(expected, actual, buckettype='bins', buckets=10, axis=0):
     breakpoints = np.arange(0, buckets + 1) / (buckets) * 100
 
     if buckettype == 'bins':
-        breakpoints = np.stack([np.percentile(expected, b) for b in breakpoints])
+        breakpoints = np.percentile(expected, breakpoints)
 
 
     expected_percents = np.histogram(expected, breakpoints)[0] / len(expected)
@@ -40,22 +40,119 @@ def calculate_psi(expected, actual, buckettype='bins', buckets=10, axis=0):
 
     return psi_value
 
-def check_drift(train_df, prod_df, features):
+
+def _psi_status(psi):
+    status = "🟢 Safe"
+    if psi > 0.1: status = "Warning"
+    if psi > 0.25: status = "CRITICAL"
+    return status
+
+
+def _bin_counts(values, edges):
+    """
+    np.histogram counts for one feature (right edge inclusive, out-of-range values dropped),
+    via one searchsorted instead of a pass per bin.
+    """
+    n_bins = len(edges) - 1
+    idx = np.searchsorted(edges, values, side='right') - 1
+    idx[values == edges[-1]] = n_bins - 1
+    valid = (idx >= 0) & (idx < n_bins)
+    return np.bincount(idx[valid], minlength=n_bins)
+
+
+class DriftBaseline:
+    """
+    Per-feature PSI breakpoints and training proportions, computed once from the training
+    data and persisted, so drift checks never need the training set again.
+    """
+    def __init__(self, features, edges, expected_percents):
+        self.features = list(features)
+        self.edges = np.asarray(edges, dtype=float)                         # features x (buckets + 1)
+        self.expected_percents = np.asarray(expected_percents, dtype=float)  # features x buckets
+
+    @classmethod
+    def fit(cls, train_df, features, buckettype='bins', buckets=10):
+        """
+        Same breakpoints and proportions calculate_psi derives from `expected`.
+        train_df: a DataFrame or a ColumnarTable (only the `features` columns are read).
+        """
+        features = [feat for feat in features if feat in train_df.columns]
+        breakpoints = np.arange(0, buckets + 1) / (buckets) * 100
+        edges = np.empty((len(features), buckets + 1))
+        expected_percents = np.empty((len(features), buckets))
+
+        for i, feat in enumerate(features):
+            values = np.asarray(train_df[feat], dtype=float)
+            edges[i] = np.percentile(values, breakpoints) if buckettype == 'bins' else breakpoints
+            expected_percents[i] = _bin_counts(values, edges[i]) / len(values)
+
+        return cls(features, edges, expected_percents)
+
+    def save(self, path):
+        np.savez(path, features=np.asarray(self.features), edges=self.edges,
+                 expected_percents=self.expected_percents)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['features'].tolist(), data['edges'], data['expected_percents'])
+
+
+class DriftMonitor:
+    """
+    Streaming PSI: production data arrives in chunks and only the per-feature bin counts are
+    kept, so memory is bounded by buckets x features, not by rows.
+    """
+    def __init__(self, baseline):
+        self.baseline = baseline
+        self.reset()
+
+    def reset(self):
+        self.counts = np.zeros_like(self.baseline.expected_percents)
+        self.rows = np.zeros(len(self.baseline.features))
+
+    def update(self, chunk):
+        """Adds one chunk (DataFrame or dict of arrays) of production rows to the histograms."""
+        columns = chunk.columns if hasattr(chunk, 'columns') else chunk.keys()
+        for i, feat in enumerate(self.baseline.features):
+            if feat in columns:
+                values = np.asarray(chunk[feat], dtype=float)
+                self.counts[i] += _bin_counts(values, self.baseline.edges[i])
+                self.rows[i] += len(values)
+        return self
+
+    def psi(self):
+        """PSI for every baseline feature in one vectorized pass (NaN where no rows were seen)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            actual_percents = self.counts / self.rows[:, None]
+        expected_percents = np.where(self.baseline.expected_percents == 0, 0.0001, self.baseline.expected_percents)
+        actual_percents = np.where(actual_percents == 0, 0.0001, actual_percents)
+        psi_values = np.sum((actual_percents - expected_percents) * np.log(actual_percents / expected_percents), axis=1)
+        return np.where(self.rows > 0, psi_values, np.nan)
+
+    def report(self):
+        """Same table as check_drift, for the features seen so far."""
+        alerts = []
+        for feat, psi, rows in zip(self.baseline.features, self.psi(), self.rows):
+            if rows > 0:
+                alerts.append({
+                    'Feature': feat,
+                    'PSI': round(psi, 4),
+                    'Status': _psi_status(psi)
+                })
+        return pd.DataFrame(alerts)
+
+
+def check_drift(train_df, prod_df, features, chunk_size=1000000):
     """
     Runs PSI check on specific features.
+    Either input can be a ColumnarTable (see columnar_store.py): only `features` are read, and
+    production rows are streamed in chunks of `chunk_size`.
+    For repeated checks, fit a DriftBaseline once and stream production data through a DriftMonitor.
     """
-    alerts = []
-    for feat in features:
-        if feat in train_df.columns and feat in prod_df.columns:
-            psi = calculate_psi(train_df[feat], prod_df[feat])
-            status = "🟢 Safe"
-            if psi > 0.1: status = "Warning"
-            if psi > 0.25: status = "CRITICAL"
-            
-            alerts.append({
-                'Feature': feat,
-                'PSI': round(psi, 4),
-                'Status': status
-            })
-    
-    return pd.DataFrame(alerts)
\ No newline at end of file
+    features = [feat for feat in features if feat in train_df.columns and feat in prod_df.columns]
+    monitor = DriftMonitor(DriftBaseline.fit(train_df, features))
+    chunks = prod_df.iter_chunks(features, chunk_size) if hasattr(prod_df, 'iter_chunks') else [prod_df]
+    for chunk in chunks:
+        monitor.update(chunk)
+    return monitor.report()
@@ -0,0 +1,354 @@
+"""
+Policy what-if: re-apply a changed policy_config to a stored pricing run without re-scoring the book.
+
+    python src/policy_replay.py capture --applicants book.csv --out runs/book_snapshot.npz
+    python src/policy_replay.py replay --snapshot runs/book_snapshot.npz --set PRIME_MAX_RATE=0.18 \
+        --set MIN_PROFIT_MARGIN=75 --changes changes.csv --report report.json
+
+Governance only depends on PD, segment and the profit curve. A snapshot keeps, per applicant,
+the stressed PD, the optimizer's raw (pre-governance) optimum and the curve's exact
+parameters: risk_score_norm (which fixes the segment), amount and term, plus the run's cost
+of funds. Those define the acceptance and profit curves exactly at any rate (see curves()),
+in a few numbers per applicant instead of two 61-point arrays.
+
+A replay is one vectorized governance pass. Only a change to GLOBAL_MIN_RATE /
+GLOBAL_MAX_RATE (the optimizer's search range) re-runs the optimizer, and that still works
+from the stored arrays with the elasticity model alone: Brain 1 is never re-run.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import argparse
+import copy
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+from src.pricing_engine import LoanPricingEngine
+
+SNAPSHOT_VERSION = 1
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEGMENTS = ('Subprime', 'NearPrime', 'Prime')
+SEARCH_RANGE_KEYS = ('GLOBAL_MIN_RATE', 'GLOBAL_MAX_RATE')  # changing these moves the optimizer's rate range
+
+
+def model_fingerprint(engine):
+    """Hash of what the stored optima depend on besides policy: elasticity coefficients and LGD."""
+    payload = {'elasticity': [float(p) for p in engine.elasticity.params], 'lgd': float(engine.lgd)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _engine_with_policy(engine, policy_config, optimizer):
+    """Shallow copy sharing the models, with its own policy_config (the caller's engine is never modified)."""
+    replay_engine = copy.copy(engine)
+    replay_engine.policy_config = dict(policy_config)
+    replay_engine.optimizer = optimizer
+    replay_engine.metrics = None
+    return replay_engine
+
+
+class PricingSnapshot:
+    """Per-applicant inputs and raw optima of one pricing run, column-wise (one array per field)."""
+    def __init__(self, index, pd_probs, risk_scores, loan_amts, term_years, raw_rates, raw_profits,
+                 cost_of_funds, pd_multiplier, optimizer, policy_config, fingerprint):
+        self.index = index
+        self.pd_probs = pd_probs
+        self.risk_scores = risk_scores
+        self.loan_amts = loan_amts
+        self.term_years = term_years
+        self.raw_rates = raw_rates
+        self.raw_profits = raw_profits
+        self.cost_of_funds = cost_of_funds
+        self.pd_multiplier = pd_multiplier
+        self.optimizer = optimizer
+        self.policy_config = dict(policy_config)
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.pd_probs)
+
+    @classmethod
+    def capture(cls, engine, applicants_df, pd_multiplier=1.0, cost_of_funds=None, chunk_size=50000):
+        """
+        One full pricing pass (same PDs and optima as get_optimal_rates). Unlike get_optimal_rates,
+        applicants failing the PD pre-check are optimized too, so raising MAX_PD_THRESHOLD can be replayed.
+        """
+        if cost_of_funds is None:
+            cost_of_funds = engine.cost_of_funds
+        pd_probs = np.minimum(engine._predict_pd_batch(applicants_df) * pd_multiplier, 1.0)
+        risk_scores, loan_amts, term_years = engine._applicant_arrays(applicants_df)
+
+        raw_rates, raw_profits = np.zeros(len(pd_probs)), np.zeros(len(pd_probs))
+        for start in range(0, len(pd_probs), chunk_size):
+            sl = slice(start, start + chunk_size)
+            raw_rates[sl], raw_profits[sl] = engine._raw_optimum(
+                pd_probs[sl], risk_scores[sl], loan_amts[sl], term_years[sl], cost_of_funds
+            )
+
+        index = applicants_df.index.to_numpy()
+        if index.dtype == object:
+            index = index.astype(str)  # npz stores plain arrays only
+        return cls(index, pd_probs, risk_scores, loan_amts, term_years, raw_rates, raw_profits,
+                   float(cost_of_funds), float(pd_multiplier), engine.optimizer, engine.policy_config,
+                   model_fingerprint(engine))
+
+    # -----------------------------------------------------------------
+    # Persistence
+    # -----------------------------------------------------------------
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(
+            path,
+            format_version=SNAPSHOT_VERSION,
+            index=self.index,
+            pd_probs=self.pd_probs,
+            risk_scores=self.risk_scores,
+            loan_amts=self.loan_amts,
+            term_years=self.term_years,
+            raw_rates=self.raw_rates,
+            raw_profits=self.raw_profits,
+            meta=json.dumps({
+                'cost_of_funds': self.cost_of_funds,
+                'pd_multiplier': self.pd_multiplier,
+                'optimizer': self.optimizer,
+                'policy_config': self.policy_config,
+                'fingerprint': self.fingerprint,
+            }),
+        )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            version = int(data['format_version'])
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Snapshot format v{version} not supported (expected v{SNAPSHOT_VERSION}). "
+                                 f"Re-capture with src/policy_replay.py.")
+            meta = json.loads(str(data['meta']))
+            return cls(data['index'], data['pd_probs'], data['risk_scores'], data['loan_amts'], data['term_years'],
+                       data['raw_rates'], data['raw_profits'], meta['cost_of_funds'], meta['pd_multiplier'],
+                       meta['optimizer'], meta['policy_config'], meta['fingerprint'])
+
+    # -----------------------------------------------------------------
+    # Replay
+    # -----------------------------------------------------------------
+    def _check_engine(self, engine):
+        if model_fingerprint(engine) != self.fingerprint:
+            raise ValueError("Snapshot was captured with a different elasticity model or LGD; re-capture it.")
+
+    def curves(self, positions, engine):
+        """(rate_grid, accept_probs, expected_profits) for the applicants at `positions`, as the run saw them."""
+        self._check_engine(engine)
+        replay_engine = _engine_with_policy(engine, self.policy_config, self.optimizer)
+        positions = np.atleast_1d(positions)
+        return replay_engine._profit_surface(self.pd_probs[positions], self.risk_scores[positions],
+                                             self.loan_amts[positions], self.term_years[positions],
+                                             self.cost_of_funds)
+
+    def _govern(self, engine, policy_config, with_notes=True, chunk_size=50000):
+        """Column arrays of evaluate(), without building the DataFrame."""
+        unknown = set(policy_config) - set(self.policy_config)
+        if unknown:
+            raise ValueError(f"Unknown policy keys: {sorted(unknown)}")
+        self._check_engine(engine)
+        replay_engine = _engine_with_policy(engine, policy_config, self.optimizer)
+
+        high_risk = self.pd_probs > policy_config['MAX_PD_THRESHOLD']
+        raw_rates, raw_profits = self.raw_rates, self.raw_profits
+        if any(policy_config[key] != self.policy_config[key] for key in SEARCH_RANGE_KEYS):
+            # New search range: re-optimize the applicants that pass the PD pre-check
+            raw_rates, raw_profits = np.zeros(len(self)), np.zeros(len(self))
+            survivors = np.flatnonzero(~high_risk)
+            for start in range(0, len(survivors), chunk_size):
+                idx = survivors[start:start + chunk_size]
+                raw_rates[idx], raw_profits[idx] = replay_engine._raw_optimum(
+                    self.pd_probs[idx], self.risk_scores[idx], self.loan_amts[idx], self.term_years[idx],
+                    self.cost_of_funds
+                )
+
+        segments = np.array(SEGMENTS, dtype=object)[replay_engine._segment_index(self.risk_scores)]
+        decisions, final_rates, notes = replay_engine._apply_governance_batch(
+            raw_rates, self.pd_probs, segments, raw_profits, with_notes=with_notes
+        )
+
+        # Pre-optimization PD check, exactly as in get_optimal_rates
+        segments[high_risk] = 'High Risk'
+        results = {
+            'optimal_rate': final_rates,
+            'max_profit': np.where(high_risk, 0.0, raw_profits),
+            'decision': decisions,
+            'prob_default': self.pd_probs,
+            'risk_segment': segments,
+        }
+        if with_notes:
+            for i in np.flatnonzero(high_risk):
+                notes[i] = ["Pre-optimization PD Check"]
+            results['policy_notes'] = notes
+        return results
+
+    def evaluate(self, engine, policy_config=None, with_notes=True):
+        """
+        Results of the stored run under `policy_config` (default: the captured one), in the
+        get_optimal_rates() format. Raises ValueError for unknown policy keys.
+        """
+        policy_config = dict(self.policy_config if policy_config is None else policy_config)
+        return pd.DataFrame(self._govern(engine, policy_config, with_notes), index=pd.Index(self.index))
+
+    def _book_summary(self, engine, results):
+        """Approvals plus expected funded volume and profit at the final (post-governance) rates."""
+        approved = np.flatnonzero(results['decision'] == 'APPROVE')
+        rates = results['optimal_rate'][approved]
+        accept, profit = engine._expected_profit(rates[:, None], self.pd_probs[approved], self.risk_scores[approved],
+                                                 self.loan_amts[approved], self.term_years[approved],
+                                                 self.cost_of_funds)
+        return {
+            'approved': int(len(approved)),
+            'approval_rate': len(approved) / len(self) if len(self) else 0.0,
+            'avg_approved_rate': float(rates.mean()) if len(approved) else None,
+            'expected_volume': float((accept[:, 0] * self.loan_amts[approved]).sum()),
+            'expected_profit': float(profit[:, 0].sum()),
+        }
+
+    def replay(self, engine, policy_changes):
+        """
+        Re-applies the captured policy with `policy_changes` (a dict of policy_config overrides).
+        Returns (changes, report): a DataFrame of the applicants whose decision or rate changed
+        (before / after columns, with policy notes) and a JSON-serializable report.
+        """
+        new_policy = {**self.policy_config, **policy_changes}
+        baseline = self._govern(engine, self.policy_config, with_notes=False)
+        replayed = self._govern(engine, new_policy, with_notes=False)
+
+        old_decisions, new_decisions = baseline['decision'], replayed['decision']
+        old_rates, new_rates = baseline['optimal_rate'], replayed['optimal_rate']
+        decision_changed = old_decisions != new_decisions
+        rate_changed = ~decision_changed & ~np.isclose(old_rates, new_rates, rtol=0.0, atol=1e-12)
+        changed = np.flatnonzero(decision_changed | rate_changed)
+
+        # Notes only for the changed rows: re-run the (cheap) governance on that subset
+        subset = self._subset(changed)
+        old_notes = subset._govern(engine, self.policy_config)['policy_notes']
+        new_notes = subset._govern(engine, new_policy)['policy_notes']
+
+        changes = pd.DataFrame({
+            'old_decision': old_decisions[changed],
+            'new_decision': new_decisions[changed],
+            'old_rate': old_rates[changed],
+            'new_rate': new_rates[changed],
+            'rate_change': new_rates[changed] - old_rates[changed],
+            'old_segment': baseline['risk_segment'][changed],
+            'new_segment': replayed['risk_segment'][changed],
+            'prob_default': self.pd_probs[changed],
+            'old_notes': old_notes,
+            'new_notes': new_notes,
+        }, index=pd.Index(self.index[changed]))
+
+        transitions = {}
+        for old, new in zip(old_decisions[decision_changed], new_decisions[decision_changed]):
+            transitions[f"{old}->{new}"] = transitions.get(f"{old}->{new}", 0) + 1
+        summary_engine = _engine_with_policy(engine, new_policy, self.optimizer)
+        report = {
+            'applicants': len(self),
+            'policy_changes': {key: {'old': self.policy_config[key], 'new': value}
+                               for key, value in policy_changes.items() if self.policy_config.get(key) != value},
+            'reoptimized': any(new_policy[key] != self.policy_config[key] for key in SEARCH_RANGE_KEYS),
+            'decision_changes': int(decision_changed.sum()),
+            'rate_changes': int(rate_changed.sum()),
+            'transitions': dict(sorted(transitions.items())),
+            'baseline': self._book_summary(summary_engine, baseline),
+            'replay': self._book_summary(summary_engine, replayed),
+        }
+        return changes, report
+
+    def _subset(self, positions):
+        return PricingSnapshot(self.index[positions], self.pd_probs[positions], self.risk_scores[positions],
+                               self.loan_amts[positions], self.term_years[positions], self.raw_rates[positions],
+                               self.raw_profits[positions], self.cost_of_funds, self.pd_multiplier, self.optimizer,
+                               self.policy_config, self.fingerprint)
+
+
+def parse_policy_overrides(items):
+    """['PRIME_MAX_RATE=0.18', ...] -> {'PRIME_MAX_RATE': 0.18, ...}"""
+    overrides = {}
+    for item in items or []:
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Expected KEY=VALUE, got {item!r}")
+        overrides[key.strip()] = float(value)
+    return overrides
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Adaptive Loan Pricing Engine - Policy What-If Replay')
+    parser.add_argument('--risk-model', default=os.path.join(ROOT, 'models/risk_model_xgb.pkl'))
+    parser.add_argument('--elasticity-model', default=os.path.join(ROOT, 'models/elasticity_model_logit.pkl'))
+    parser.add_argument('--artifact-dir', default=None, help='Load fast-start artifacts instead of the pickles')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    capture = commands.add_parser('capture', help='Price a book once and store the snapshot')
+    capture.add_argument('--applicants', required=True, help='CSV of applicants (engine feature columns)')
+    capture.add_argument('--out', required=True, help='Snapshot path (.npz)')
+    capture.add_argument('--cof', type=float, default=0.04, help='Cost of Funds')
+    capture.add_argument('--pd-multiplier', type=float, default=1.0, help='PD stress multiplier')
+    capture.add_argument('--optimizer', choices=['grid', 'continuous'], default='grid')
+
+    replay = commands.add_parser('replay', help='Re-apply a changed policy to a stored snapshot')
+    replay.add_argument('--snapshot', required=True)
+    replay.add_argument('--set', dest='overrides', action='append', metavar='KEY=VALUE',
+                        help='policy_config override, e.g. PRIME_MAX_RATE=0.18 (repeatable)')
+    replay.add_argument('--changes', default=None, help='CSV of the applicants whose decision or rate changed')
+    replay.add_argument('--report', default=None, help='Optional path for the report JSON')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    print("⏳ Initializing Adaptive Pricing Engine...")
+    try:
+        if args.artifact_dir:
+            engine = LoanPricingEngine(artifact_dir=args.artifact_dir)
+        else:
+            engine = LoanPricingEngine(args.risk_model, args.elasticity_model)
+    except FileNotFoundError as e:
+        print(f"❌ CRITICAL ERROR: Model files not found. {e}")
+        sys.exit(1)
+
+    if args.command == 'capture':
+        engine.optimizer = args.optimizer
+        applicants = pd.read_csv(args.applicants)
+        print(f"⏳ Pricing {len(applicants)} applicants...")
+        snapshot = PricingSnapshot.capture(engine, applicants, pd_multiplier=args.pd_multiplier,
+                                           cost_of_funds=args.cof)
+        snapshot.save(args.out)
+        print(f"✅ Snapshot saved to: {args.out}")
+        return
+
+    snapshot = PricingSnapshot.load(args.snapshot)
+    changes, report = snapshot.replay(engine, parse_policy_overrides(args.overrides))
+
+    print(f"\n=== Policy What-If ({report['applicants']} applicants) ===")
+    for key, change in report['policy_changes'].items():
+        print(f"   {key}: {change['old']} -> {change['new']}")
+    print(f"Decisions changed: {report['decision_changes']}  |  Rates changed: {report['rate_changes']}")
+    for transition, count in report['transitions'].items():
+        print(f"   {transition}: {count}")
+    for label in ('baseline', 'replay'):
+        book = report[label]
+        print(f"{label.title():<9} approved {book['approved']} ({book['approval_rate']:.1%}), "
+              f"expected profit ${book['expected_profit']:,.0f}, volume ${book['expected_volume']:,.0f}")
+
+    if args.changes:
+        changes.to_csv(args.changes)
+        print(f"   Changed applicants saved to: {args.changes}")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
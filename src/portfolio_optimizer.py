@@ -0,0 +1,349 @@
+"""
+Book-level rate optimization under treasury limits.
+
+get_optimal_rate() maximizes each applicant's expected profit on its own. The portfolio
+optimizer picks every applicant's rate (on the engine's rate grid) to maximize the book's
+expected profit subject to aggregate limits, all in expectation over P(Accept):
+
+    funded volume     sum(P(Accept) * amount)                 <= max_volume
+    expected loss     sum(P(Accept) * PD * LGD * amount)      <= max_expected_loss
+    average PD        sum(P(Accept) * PD) / sum(P(Accept))    <= max_avg_pd
+
+Lagrangian relaxation: with multipliers lam >= 0 each applicant independently maximizes
+    P(Accept) * (margin(rate) - c),   c = lam . (amount, PD * LGD * amount, PD - max_avg_pd)
+so the multipliers only enter through one shadow cost `c` per applicant. Because the profit
+curve is unimodal in the rate, the best grid rate is a step function of c: the switch points
+between neighbouring grid rates are computed once from the engine's curves, and each dual
+evaluation is a vectorized count of switch points below c. The multipliers are found by
+minimizing the (convex) dual: bounded quasi-Newton when several limits are set, then
+coordinate bisection on the (monotone) constraint slacks to land on the feasible side.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+from src.pricing_engine import LoanPricingEngine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONSTRAINTS = ('max_volume', 'max_expected_loss', 'max_avg_pd')
+
+
+class PortfolioOptimizer:
+    """
+    Constrained rate allocation over a whole book, reusing the engine's PD, P(Accept) and
+    expected-profit curves and its policy_config (PD cutoff, global and Prime rate caps,
+    minimum profit margin).
+
+    Memory: one float32 switch-point matrix, applicants x (grid points - 1)
+    (about 240MB for 1M applicants on the 61-point grid).
+    """
+    def __init__(self, engine, chunk_size=100000):
+        self.engine = engine
+        self.chunk_size = chunk_size
+
+    def _prepare(self, applicants_df, pd_multiplier, cost_of_funds):
+        engine = self.engine
+        cfg = engine.policy_config
+        pd_probs = np.minimum(engine._predict_pd_batch(applicants_df) * pd_multiplier, 1.0).astype(float)
+        risk_scores, loan_amts, term_years = engine._applicant_arrays(applicants_df)
+        seg_idx = engine._segment_index(risk_scores)
+        rate_grid = engine._rate_grid()
+
+        eligible = pd_probs <= cfg['MAX_PD_THRESHOLD']
+        # Highest grid rate each applicant may be offered (Prime cap, per loan)
+        top_idx = np.where(seg_idx == 2, np.searchsorted(rate_grid, cfg['PRIME_MAX_RATE'], side='right') - 1,
+                           len(rate_grid) - 1)
+
+        n = len(applicants_df)
+        switch = np.full((n, len(rate_grid) - 1), np.inf, dtype=np.float32)
+        top_margin = np.full(n, -np.inf)
+        for start in range(0, n, self.chunk_size):
+            sl = slice(start, start + self.chunk_size)
+            accept_probs, expected_profits = engine._expected_profit(
+                rate_grid, pd_probs[sl], risk_scores[sl], loan_amts[sl], term_years[sl], cost_of_funds
+            )
+            if np.any(accept_probs[:, :-1] < accept_probs[:, 1:]):
+                raise ValueError("Portfolio optimization needs P(Accept) non-increasing in the rate")
+            # Moving from grid rate j to j+1 pays off once c exceeds this (P(Accept) falls with the rate;
+            # where it is flat, the higher rate always wins: -inf)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                chunk_switch = ((expected_profits[:, :-1] - expected_profits[:, 1:])
+                                / (accept_probs[:, :-1] - accept_probs[:, 1:]))
+            chunk_switch = np.maximum.accumulate(np.nan_to_num(chunk_switch, nan=-np.inf), axis=1)
+            chunk_switch[np.arange(chunk_switch.shape[1]) >= top_idx[sl, None]] = np.inf  # never past the cap
+            switch[sl] = chunk_switch
+
+            rows = np.arange(len(accept_probs))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                top_margin[sl] = expected_profits[rows, top_idx[sl]] / accept_probs[rows, top_idx[sl]]
+
+        self._switch = switch
+        self._top_margin = np.nan_to_num(top_margin, nan=-np.inf)
+        self._rate_grid = rate_grid
+        self._args = (pd_probs, risk_scores, loan_amts, term_years, cost_of_funds)
+        self._eligible = eligible
+        self._seg_idx = seg_idx
+
+    def _weights(self, limits):
+        """Per-applicant resource use per accepted loan, one row per active constraint."""
+        pd_probs, _, loan_amts, _, _ = self._args
+        weights = {
+            'max_volume': loan_amts,
+            'max_expected_loss': pd_probs * self.engine.lgd * loan_amts,
+            'max_avg_pd': pd_probs - (limits['max_avg_pd'] if limits['max_avg_pd'] is not None else 0.0),
+        }
+        budgets = {'max_volume': limits['max_volume'], 'max_expected_loss': limits['max_expected_loss'],
+                   'max_avg_pd': 0.0}
+        return weights, budgets
+
+    def _allocate(self, shadow_costs):
+        """Best grid rate per applicant for the given shadow costs c, and whether it is still worth lending."""
+        idx = np.empty(len(shadow_costs), dtype=np.int64)
+        for start in range(0, len(idx), self.chunk_size):
+            sl = slice(start, start + self.chunk_size)
+            idx[sl] = (self._switch[sl] < shadow_costs[sl, None].astype(np.float32)).sum(axis=1)
+
+        rates = self._rate_grid[idx]
+        accept_probs, expected_profits = self.engine._expected_profit(rates[:, None], *self._args)
+        accept_probs, expected_profits = accept_probs[:, 0], expected_profits[:, 0]
+
+        lend = (self._eligible
+                & (expected_profits - accept_probs * shadow_costs > 0)
+                & (expected_profits >= self.engine.policy_config['MIN_PROFIT_MARGIN']))
+        return rates, accept_probs, expected_profits, lend
+
+    def optimize(self, applicants_df, max_volume=None, max_expected_loss=None, max_avg_pd=None,
+                 pd_multiplier=1.0, cost_of_funds=None, rtol=1e-3, max_sweeps=10):
+        """
+        Returns (allocation, summary).
+        allocation: one row per applicant (same index) with optimal_rate, max_profit (expected),
+                    prob_accept, expected_volume, expected_loss, decision, prob_default, risk_segment.
+                    'REJECT_PORTFOLIO' marks loans that would be approved on their own but do not
+                    earn their shadow cost under the limits.
+        summary: multipliers, limit usage, expected profit vs the unconstrained book, convergence.
+        Limits left as None are not enforced.
+        """
+        self._prepare(applicants_df, pd_multiplier, cost_of_funds)
+        limits = {'max_volume': max_volume, 'max_expected_loss': max_expected_loss, 'max_avg_pd': max_avg_pd}
+        active = [name for name in CONSTRAINTS if limits[name] is not None]
+        weights, budgets = self._weights(limits)
+        lambdas = {name: 0.0 for name in active}
+        evaluations = 0
+
+        def shadow_costs(lams):
+            c = np.zeros(len(applicants_df))
+            for name, lam in lams.items():
+                if lam:
+                    c += lam * weights[name]
+            return c
+
+        def slacks(lams):
+            """Budget minus expected usage for every active limit, from one allocation."""
+            nonlocal evaluations
+            evaluations += 1
+            _, accept_probs, _, lend = self._allocate(shadow_costs(lams))
+            booked = np.where(lend, accept_probs, 0.0)
+            return np.array([budgets[name] - booked @ weights[name] for name in active])
+
+        def solve(name, tol):
+            """Smallest multiplier >= 0 (to tol) that satisfies `name`, with the others held fixed."""
+            k = active.index(name)
+            trial = dict(lambdas)
+            lo, hi = 0.0, None
+            guess = lambdas[name]
+            if guess > 0:
+                # Warm start: bracket the previous value with steps that start small and grow
+                factor = 1 + 50 * tol
+                trial[name] = guess
+                if slacks(trial)[k] >= 0:
+                    hi = guess
+                    while True:
+                        trial[name] = hi / factor if hi / factor > guess * 1e-6 else 0.0
+                        if slacks(trial)[k] < 0:
+                            lo = trial[name]
+                            break
+                        if trial[name] == 0.0:
+                            return 0.0
+                        hi, factor = trial[name], factor ** 2
+                else:
+                    lo = guess
+            else:
+                trial[name] = 0.0
+                if slacks(trial)[k] >= 0:
+                    return 0.0
+
+            if hi is None:
+                trial[name] = 0.0
+                others = shadow_costs(trial)
+                w = weights[name]
+                positive = (w > 0) & self._eligible
+                # Past this multiplier every applicant with w > 0 is declined, so the slack is >= 0
+                hi = np.max(np.maximum(self._top_margin[positive] - others[positive], 0) / w[positive],
+                            initial=0.0) * 1.01 + 1e-12
+                factor = 1 + 50 * tol
+                while lo > 0 and lo * factor < hi:
+                    trial[name] = lo * factor
+                    if slacks(trial)[k] >= 0:
+                        hi = lo * factor
+                        break
+                    lo, factor = lo * factor, factor ** 2
+
+            for _ in range(200):
+                if hi - lo <= tol * hi:
+                    break
+                mid = np.sqrt(lo * hi) if lo > 0 else hi / 8
+                trial[name] = mid
+                if slacks(trial)[k] >= 0:
+                    hi = mid
+                else:
+                    lo = mid
+            return hi  # feasible side
+
+        def dual(u):
+            """
+            Lagrangian dual (convex) and its gradient, the slacks, in scaled multipliers u = lam * unit,
+            normalized by the unconstrained book's profit.
+            """
+            nonlocal evaluations
+            evaluations += 1
+            lam = u / unit
+            c = shadow_costs(dict(zip(active, lam)))
+            _, accept_probs, expected_profits, lend = self._allocate(c)
+            booked = np.where(lend, accept_probs, 0.0)
+            slack = np.array([budgets[name] - booked @ weights[name] for name in active])
+            value = np.sum(np.where(lend, expected_profits - accept_probs * c, 0.0)) + lam @ budget_vector
+            return value / free_profit, slack / unit / free_profit
+
+        # Scales from the unconstrained book: u ~ 1 is a shadow cost of the order of a typical margin
+        _, free_accept, free_profits, free_lend = self._allocate(np.zeros(len(applicants_df)))
+        free_booked = np.where(free_lend, free_accept, 0.0)
+        free_profit = max(np.sum(np.where(free_lend, free_profits, 0.0)), 1e-12)
+        typical_margin = free_profit / max(free_booked.sum(), 1e-12)
+        scale = np.array([free_booked @ np.abs(weights[name]) for name in active]) + 1e-12
+        unit = scale / max(free_booked.sum(), 1e-12) / typical_margin
+        budget_vector = np.array([budgets[name] for name in active], dtype=float)
+
+        if len(active) > 1:
+            # Several limits: minimize the dual over all multipliers together (bounded quasi-Newton);
+            # coupled limits such as expected loss and average PD make coordinate sweeps zigzag
+            from scipy.optimize import minimize
+            result = minimize(dual, np.zeros(len(active)), jac=True, method='L-BFGS-B',
+                              bounds=[(0, None)] * len(active), options={'maxiter': 40})
+            lambdas.update(zip(active, result.x / unit))
+
+        # Coordinate root-finding from there: each solve lands on the feasible side of its limit
+        converged = not active
+        sweeps = 0
+        for sweeps in range(1, max_sweeps + 1):
+            for name in active:
+                lambdas[name] = solve(name, rtol)
+            # KKT to tolerance: every limit holds, and the binding ones are exhausted
+            lam = np.array([lambdas[name] for name in active])
+            s = slacks(lambdas) / scale
+            if np.all(s >= 0) and np.all(s[lam > 0] <= rtol):
+                converged = True
+                break
+
+        # Final allocation (and the unconstrained book, for the cost of the limits)
+        rates, accept_probs, expected_profits, lend = self._allocate(shadow_costs(lambdas))
+        _, free_accept, free_profits, free_lend = self._allocate(np.zeros(len(applicants_df)))
+        pd_probs, _, loan_amts, _, _ = self._args
+
+        decisions = np.where(lend, 'APPROVE', np.where(free_lend, 'REJECT_PORTFOLIO', 'REJECT_ECONOMICS')).astype(object)
+        decisions[~self._eligible] = 'REJECT_RISK'
+        segments = np.array(['Subprime', 'NearPrime', 'Prime'], dtype=object)[self._seg_idx]
+        segments[~self._eligible] = 'High Risk'
+
+        booked = np.where(lend, accept_probs, 0.0)
+        allocation = pd.DataFrame({
+            'optimal_rate': np.where(lend, rates, 0.0),
+            'max_profit': np.where(lend, expected_profits, 0.0),
+            'prob_accept': booked,
+            'expected_volume': booked * loan_amts,
+            'expected_loss': booked * pd_probs * self.engine.lgd * loan_amts,
+            'decision': decisions,
+            'prob_default': pd_probs,
+            'risk_segment': segments,
+        }, index=applicants_df.index)
+
+        free_booked = np.where(free_lend, free_accept, 0.0)
+        usage = {
+            'max_volume': float(allocation['expected_volume'].sum()),
+            'max_expected_loss': float(allocation['expected_loss'].sum()),
+            'max_avg_pd': float(np.sum(booked * pd_probs) / booked.sum()) if booked.sum() > 0 else 0.0,
+        }
+        summary = {
+            'applicants': len(applicants_df),
+            'approved': int(lend.sum()),
+            'expected_profit': float(allocation['max_profit'].sum()),
+            'unconstrained_expected_profit': float(np.sum(np.where(free_lend, free_profits, 0.0))),
+            'unconstrained_usage': {
+                'max_volume': float(np.sum(free_booked * loan_amts)),
+                'max_expected_loss': float(np.sum(free_booked * pd_probs * self.engine.lgd * loan_amts)),
+                'max_avg_pd': float(np.sum(free_booked * pd_probs) / free_booked.sum()) if free_booked.sum() > 0 else 0.0,
+            },
+            'limits': limits,
+            'usage': usage,
+            'multipliers': {name: float(lam) for name, lam in lambdas.items()},
+            'converged': converged,
+            'sweeps': sweeps,
+            'evaluations': evaluations,
+        }
+        return allocation, summary
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Adaptive Loan Pricing Engine - Portfolio Optimizer')
+    parser.add_argument('--applicants', required=True, help='CSV of applicants (engine feature columns)')
+    parser.add_argument('--output', default=None, help='Per-applicant allocation CSV')
+    parser.add_argument('--summary', default=None, help='Optional path for the summary JSON')
+    parser.add_argument('--max-volume', type=float, default=None, help='Expected funded volume limit ($)')
+    parser.add_argument('--max-expected-loss', type=float, default=None, help='Expected loss budget ($)')
+    parser.add_argument('--max-avg-pd', type=float, default=None, help='Average PD limit of the booked loans')
+    parser.add_argument('--risk-model', default=os.path.join(ROOT, 'models/risk_model_xgb.pkl'))
+    parser.add_argument('--elasticity-model', default=os.path.join(ROOT, 'models/elasticity_model_logit.pkl'))
+    parser.add_argument('--cof', type=float, default=0.04, help='Cost of Funds')
+    parser.add_argument('--pd-multiplier', type=float, default=1.0, help='PD stress multiplier')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    print("⏳ Initializing Adaptive Pricing Engine...")
+    engine = LoanPricingEngine(args.risk_model, args.elasticity_model, cost_of_funds=args.cof)
+    applicants = pd.read_csv(args.applicants)
+
+    print(f"⏳ Optimizing {len(applicants)} applicants under portfolio limits...")
+    allocation, summary = PortfolioOptimizer(engine).optimize(
+        applicants, max_volume=args.max_volume, max_expected_loss=args.max_expected_loss,
+        max_avg_pd=args.max_avg_pd, pd_multiplier=args.pd_multiplier
+    )
+
+    print(f"\n{'✅' if summary['converged'] else '⚠️'} Optimization "
+          f"{'converged' if summary['converged'] else 'did NOT converge'} "
+          f"({summary['sweeps']} sweeps, {summary['evaluations']} evaluations)")
+    print(f"Approved: {summary['approved']} / {summary['applicants']}")
+    print(f"Expected Profit: ${summary['expected_profit']:,.0f} "
+          f"(unconstrained ${summary['unconstrained_expected_profit']:,.0f})")
+    for name in CONSTRAINTS:
+        if summary['limits'][name] is not None:
+            print(f"   {name}: {summary['usage'][name]:,.4f} / {summary['limits'][name]:,.4f} "
+                  f"(multiplier {summary['multipliers'][name]:.6g})")
+
+    if args.output:
+        allocation.to_csv(args.output)
+        print(f"   Allocation saved to: {args.output}")
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
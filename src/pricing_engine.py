@@ -1,16 +1,109 @@
-import pandas as pd
+import importlib
 import numpy as np
-import joblib
+
+try:
+    from src.engine_metrics import NULL_TIMER
+    from src.pricing_results import (HIGH_RISK_CODE, NOTE_GLOBAL_CAP, NOTE_HIGH_PD, NOTE_LOW_PROFIT,
+                                     NOTE_PRECHECK, NOTE_PRIME_CAP, Quote, QuoteBatch, decision_labels,
+                                     policy_notes, prime_cap_note)
+except ImportError:
+    from engine_metrics import NULL_TIMER
+    from pricing_results import (HIGH_RISK_CODE, NOTE_GLOBAL_CAP, NOTE_HIGH_PD, NOTE_LOW_PROFIT,
+                                 NOTE_PRECHECK, NOTE_PRIME_CAP, Quote, QuoteBatch, decision_labels,
+                                 policy_notes, prime_cap_note)
+
+
+class _LazyModule:
+    """Imports a heavy module on first attribute access, keeping engine start-up light."""
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+pd = _LazyModule('pandas')
+joblib = _LazyModule('joblib')
+
+# Applicant fields that scale with the loan amount (rescaled together in counter-offers)
+AMOUNT_FEATURES = ('LoanOriginalAmount', 'loan_amnt', 'loan_to_income')
+
+
+def _load_artifacts(artifact_dir):
+    try:
+        from src.model_artifacts import load_artifacts
+    except ImportError:
+        from model_artifacts import load_artifacts
+    return load_artifacts(artifact_dir)
+
+
+class SegmentedLogit:
+    """
+    Plain-NumPy copy of the segmented elasticity logit ("Brain 2").
+    P(Accept) = 1 / (1 + exp(-(const + b_score*score + b_segment*rate + b_amount*amount)))
+    """
+    COLUMNS = ['const', 'risk_score_norm', 'Rate_Subprime', 'Rate_NearPrime', 'Rate_Prime', 'LoanOriginalAmount']
+
+    def __init__(self, params):
+        if hasattr(params, 'index'):
+            params = [params[col] for col in self.COLUMNS]
+        params = np.asarray(params, dtype=float)
+        self.params = params
+        self.intercept = params[0]
+        self.beta_score = params[1]
+        self.beta_rate = params[2:5]  # indexed by segment: Subprime, NearPrime, Prime
+        self.beta_amount = params[5]
+
+    @classmethod
+    def from_statsmodels(cls, results):
+        """Extracts the coefficients from a fitted statsmodels Logit results object."""
+        return cls(results.params)
+
+    def predict(self, rates, risk_scores, loan_amts, seg_idx):
+        """
+        P(Accept) for N applicants at `rates` (a shared grid of k rates, or an N x k array).
+        Returns an N x k array.
+        """
+        base = self.intercept + self.beta_score * risk_scores + self.beta_amount * loan_amts
+        z = base[:, None] + self.beta_rate[seg_idx][:, None] * rates
+        return 1.0 / (1.0 + np.exp(-z))
+
 
 class LoanPricingEngine:
-    def __init__(self, risk_model_path, elasticity_model_path, cost_of_funds=0.04, lgd=0.6):
+    def __init__(self, risk_model_path=None, elasticity_model_path=None, cost_of_funds=0.04, lgd=0.6,
+                 optimizer='grid', artifact_dir=None, metrics=None, models=None, audit=None):
         """
         The Optimization Engine ("Brain 3").
+
+        optimizer: 'grid' scores the fixed 61-point rate grid (reference mode),
+                   'continuous' refines the grid optimum to basis-point precision.
+        artifact_dir: load the fast-start artifacts (see model_artifacts.py) instead of the pickles.
+                      Needs NumPy only: statsmodels and xgboost are never imported.
+        metrics: an EngineMetrics (see engine_metrics.py) to record per-stage latency and decision
+                 counts into; None (default) disables instrumentation.
+        models: (risk_model, elasticity_params) already in memory, as returned by load_artifacts()
+                (e.g. shared by a ModelHost, see model_host.py); nothing is loaded from disk.
+        audit: an AuditSink (see audit_log.py) that every quote() / quote_batch() decision is queued
+               to, for the fair-lending audit log; None (default) disables it.
         """
-        self.risk_model = joblib.load(risk_model_path)
-        self.elasticity_model = joblib.load(elasticity_model_path)
+        if artifact_dir is not None:
+            models = _load_artifacts(artifact_dir)
+        if models is not None:
+            self.risk_model, elasticity_params = models
+            self.elasticity_model = None
+            self.elasticity = SegmentedLogit(elasticity_params)
+        else:
+            self.risk_model = joblib.load(risk_model_path)
+            self.elasticity_model = joblib.load(elasticity_model_path)
+            self.elasticity = SegmentedLogit.from_statsmodels(self.elasticity_model)
         self.cost_of_funds = cost_of_funds
         self.lgd = lgd
+        self.optimizer = optimizer
+        self.metrics = metrics
+        self.audit = audit
         
         # ---------------------------------------------------------
         # Governance Policy Config 
@@ -23,11 +116,70 @@ class LoanPricingEngine:
             'MIN_PROFIT_MARGIN': 50   # 50$ minimum profit margin
         }
 
+        # ---------------------------------------------------------
+        # Risk Feature Schema (resolved once, reused by every quote)
+        # ---------------------------------------------------------
+        self._compile_risk_schema()
+
+    def _compile_risk_schema(self):
+        """
+        Resolves the risk model's feature order into a column-index map plus a float32 default
+        row (missing features score as 0), and pins the booster used for in-place prediction.
+        """
+        self._booster = self.risk_model.get_booster()
+        self.risk_features = list(self._booster.feature_names)
+        self._feature_index = {name: i for i, name in enumerate(self.risk_features)}
+        self._feature_defaults = np.zeros(len(self.risk_features), dtype=np.float32)
+        try:
+            # Early-stopped XGBClassifiers predict with their best iteration only
+            self._iteration_range = (0, self.risk_model.best_iteration + 1)
+        except AttributeError:
+            self._iteration_range = (0, 0)
+
+    def _risk_matrix(self, applicants):
+        """
+        Assembles an applicant dict, a list of dicts or a DataFrame directly into the
+        float32 risk-feature matrix (n x features), in the booster's column order.
+        """
+        if isinstance(applicants, dict):
+            applicants = [applicants]
+        X = np.tile(self._feature_defaults, (len(applicants), 1))
+
+        if hasattr(applicants, 'columns'):
+            for col in applicants.columns:
+                idx = self._feature_index.get(col)
+                if idx is not None:
+                    X[:, idx] = applicants[col].to_numpy(dtype=np.float32)
+            return X
+
+        for row, record in enumerate(applicants):
+            for key, value in record.items():
+                idx = self._feature_index.get(key)
+                if idx is not None:
+                    X[row, idx] = value
+        return X
+
+    def _timer(self, path):
+        """Stage timer for one pricing call; a no-op unless metrics are enabled."""
+        return self.metrics.timer(path) if self.metrics is not None else NULL_TIMER
+
+    def _cost_of_funds(self, cost_of_funds):
+        """The cost of funds a call priced with (its override, else the engine's)."""
+        return self.cost_of_funds if cost_of_funds is None else cost_of_funds
+
+    def _predict_pd_matrix(self, X):
+        """Brain 1 on a prepared risk-feature matrix: unstressed P(Default) per row."""
+        return self._booster.inplace_predict(X, iteration_range=self._iteration_range)
+
     def _determine_segment(self, score):
         """Maps Risk Score to the segments used in training."""
         if score <= 0.4: return 'Subprime'
         if score <= 0.75: return 'NearPrime'
         return 'Prime'
+
+    def _segment_index(self, scores):
+        """Vectorized '_determine_segment': 0 = Subprime, 1 = NearPrime, 2 = Prime."""
+        return np.where(scores <= 0.4, 0, np.where(scores <= 0.75, 1, 2))
     
     def _apply_governance(self, proposed_rate, pd, segment, expected_profit):
         """
@@ -58,34 +210,171 @@ class LoanPricingEngine:
         
         return final_decision, final_rate, notes
 
-    def get_optimal_rate(self, applicant_data, pd_multiplier=1.0):
+    def _governance_flags(self, proposed_rates, pds, is_prime, expected_profits):
+        """
+        Vectorized '_apply_governance' over N applicants, recording which rules fired as
+        NOTE_* bits (see pricing_results.py). Returns (flags, final_rates).
+        """
+        cfg = self.policy_config
+        flags = np.zeros(len(proposed_rates), dtype=np.uint8)
+        final_rates = np.asarray(proposed_rates, dtype=float).copy()
+
+        # Rule 2: Global Rate Cap
+        global_cap = final_rates > cfg['GLOBAL_MAX_RATE']
+        final_rates[global_cap] = cfg['GLOBAL_MAX_RATE']
+        flags[global_cap] |= NOTE_GLOBAL_CAP
+
+        # Rule 3: Segment-Specific Caps
+        prime_cap = is_prime & (final_rates > cfg['PRIME_MAX_RATE'])
+        final_rates[prime_cap] = cfg['PRIME_MAX_RATE']
+        flags[prime_cap] |= NOTE_PRIME_CAP
+
+        # Rule 4: Minimum Profit Margin
+        low_profit = expected_profits < cfg['MIN_PROFIT_MARGIN']
+        final_rates[low_profit] = 0.0
+        flags[low_profit] |= NOTE_LOW_PROFIT
+
+        # Rule 1: Hard PD Cutoff (checked last so it overrides everything above)
+        high_pd = pds > cfg['MAX_PD_THRESHOLD']
+        final_rates[high_pd] = 0.0
+        flags[high_pd] |= NOTE_HIGH_PD
+
+        return flags, final_rates
+
+    def _apply_governance_batch(self, proposed_rates, pds, segments, expected_profits, with_notes=True):
+        """
+        Vectorized '_apply_governance': same rules, applied as masks over N applicants.
+        Returns (decisions, final_rates, notes); notes is None when with_notes=False.
+        """
+        flags, final_rates = self._governance_flags(proposed_rates, pds, segments == 'Prime', expected_profits)
+        notes = policy_notes(flags, prime_cap_note(self.policy_config['PRIME_MAX_RATE'])) if with_notes else None
+        return decision_labels(flags), final_rates, notes
+
+    def _rate_grid(self):
+        return np.linspace(self.policy_config['GLOBAL_MIN_RATE'], self.policy_config['GLOBAL_MAX_RATE'], 61)
+
+    def _expected_profit(self, rates, pd_probs, risk_scores, loan_amts, term_years, cost_of_funds=None,
+                         timer=NULL_TIMER):
+        """
+        P(Accept) and Expected Profit for N applicants at `rates` (a shared grid or an N x k array).
+        Returns (accept_probs, expected_profits), both N x k.
+        """
+        if cost_of_funds is None:
+            cost_of_funds = self.cost_of_funds
+        pd_probs = np.asarray(pd_probs, dtype=float)[:, None]
+        accept_probs = self.elasticity.predict(rates, risk_scores, loan_amts, self._segment_index(risk_scores))
+        timer.lap('elasticity_model')
+
+        # Profit Calculation
+        # Profit = P(Accept) * [ (1-PD)*Income - PD*Loss ]
+        annual_profit = (rates - cost_of_funds) * loan_amts[:, None]
+        profit_good = annual_profit * term_years[:, None]
+        loss_bad = self.lgd * loan_amts[:, None]
+        expected_margin = ((1 - pd_probs) * profit_good) - (pd_probs * loss_bad)
+        expected_profits = accept_probs * expected_margin
+        timer.lap('profit')
+
+        return accept_probs, expected_profits
+
+    def _profit_surface(self, pd_probs, risk_scores, loan_amts, term_years, cost_of_funds=None, timer=NULL_TIMER):
+        """
+        Evaluates P(Accept) and Expected Profit on the rate grid for N applicants at once.
+        Returns (rate_grid, accept_probs, expected_profits); the last two are N x len(rate_grid).
+        """
+        rate_grid = self._rate_grid()
+        accept_probs, expected_profits = self._expected_profit(
+            rate_grid, pd_probs, risk_scores, loan_amts, term_years, cost_of_funds, timer
+        )
+        return rate_grid, accept_probs, expected_profits
+
+    def _refine_rates(self, pd_probs, risk_scores, loan_amts, term_years, cost_of_funds=None,
+                      coarse_points=13, tol=1e-5, timer=NULL_TIMER):
+        """
+        Continuous optimizer: coarse grid, then golden-section search inside the bracket
+        around the best coarse rate. Returns (rates, expected_profits), one per applicant.
+        """
+        lo_bound = self.policy_config['GLOBAL_MIN_RATE']
+        hi_bound = self.policy_config['GLOBAL_MAX_RATE']
+        args = (pd_probs, risk_scores, loan_amts, term_years, cost_of_funds, timer)
+
+        def profit_at(rates):
+            timer.lap('optimizer')  # the search arithmetic since the last evaluation
+            return self._expected_profit(rates[:, None], *args)[1][:, 0]
+
+        coarse_grid = np.linspace(lo_bound, hi_bound, coarse_points)
+        coarse_profits = self._expected_profit(coarse_grid, *args)[1]
+        best = coarse_profits.argmax(axis=1)
+        best_rates = coarse_grid[best]
+        best_profits = coarse_profits[np.arange(len(best)), best]
+
+        step = coarse_grid[1] - coarse_grid[0]
+        lo = np.maximum(best_rates - step, lo_bound)
+        hi = np.minimum(best_rates + step, hi_bound)
+
+        inv_phi = (np.sqrt(5) - 1) / 2
+        x1 = hi - inv_phi * (hi - lo)
+        x2 = lo + inv_phi * (hi - lo)
+        f1, f2 = profit_at(x1), profit_at(x2)
+        for _ in range(int(np.ceil(np.log(tol / (2 * step)) / np.log(inv_phi)))):
+            left = f1 >= f2  # the maximum lies in [lo, x2]
+            hi = np.where(left, x2, hi)
+            lo = np.where(left, lo, x1)
+            new_x = np.where(left, hi - inv_phi * (hi - lo), lo + inv_phi * (hi - lo))
+            new_f = profit_at(new_x)
+            x1, f1, x2, f2 = (np.where(left, new_x, x2), np.where(left, new_f, f2),
+                              np.where(left, x1, new_x), np.where(left, f1, new_f))
+
+        refined_rates = np.where(f1 >= f2, x1, x2)
+        refined_profits = np.maximum(f1, f2)
+
+        # Never return anything worse than the coarse grid optimum
+        improved = refined_profits > best_profits
+        refined = np.where(improved, refined_rates, best_rates), np.where(improved, refined_profits, best_profits)
+        timer.lap('optimizer')
+        return refined
+
+    def _raw_optimum(self, pd_probs, risk_scores, loan_amts, term_years, cost_of_funds=None, timer=NULL_TIMER,
+                     surface=None):
+        """
+        The configured optimizer for N applicants, before governance.
+        surface: this call's _profit_surface() output, if already computed (grid mode reuses it).
+        Returns (raw_rates, best_profits), one per applicant.
+        """
+        if self.optimizer == 'continuous':
+            return self._refine_rates(pd_probs, risk_scores, loan_amts, term_years, cost_of_funds, timer=timer)
+        if surface is None:
+            surface = self._profit_surface(pd_probs, risk_scores, loan_amts, term_years, cost_of_funds, timer=timer)
+        rate_grid, _, expected_profits = surface
+        best_idx = expected_profits.argmax(axis=1)
+        raw_rates = rate_grid[best_idx]
+        best_profits = expected_profits[np.arange(len(best_idx)), best_idx]
+        timer.lap('optimizer')
+        return raw_rates, best_profits
+
+    def quote(self, applicant_data, pd_multiplier=1.0, cost_of_funds=None, curves=False):
         """
-        Finds the profit-maximizing interest rate for a single applicant.
+        Finds the profit-maximizing interest rate for a single applicant. Returns a Quote
+        (see pricing_results.py); curves=True keeps the rate-grid curves for quote.curve_data.
+        cost_of_funds overrides the engine's value for this call only (engine state is not touched).
         """
         
+        timer = self._timer('single')
+
         # STEP 1: PREDICT RISK (PD) - Brain 1
         
-        risk_cols = self.risk_model.get_booster().feature_names
-        risk_input = pd.DataFrame([applicant_data])
-        for col in risk_cols:
-            if col not in risk_input.columns:
-                risk_input[col] = 0
-        risk_input = risk_input[risk_cols]
-        
-        pd_prob = self.risk_model.predict_proba(risk_input)[0][1]
+        X = self._risk_matrix(applicant_data)
+        timer.lap('feature_alignment')
+        pd_prob = self._predict_pd_matrix(X)[0]
         pd_prob = min(pd_prob * pd_multiplier, 1.0)  
+        timer.lap('risk_model')
         if pd_prob > self.policy_config['MAX_PD_THRESHOLD']:
-            return {
-                'decision': 'REJECT_RISK',
-                'optimal_rate': 0.0,
-                'max_profit': 0.0,
-                'prob_default': pd_prob,
-                'risk_segment': 'High Risk',
-                'curve_data': None,
-                'policy_notes': ["Pre-optimization PD Check"]
-            }
-
-        rate_grid = np.linspace(self.policy_config['GLOBAL_MIN_RATE'], self.policy_config['GLOBAL_MAX_RATE'], 61)
+            quote = Quote(0.0, 0.0, 'REJECT_RISK', pd_prob, 'High Risk', ["Pre-optimization PD Check"])
+            timer.count_decision('REJECT_RISK', 'High Risk')
+            timer.finish()
+            if self.audit is not None:
+                self.audit.record_quote(quote, pd_multiplier, self._cost_of_funds(cost_of_funds))
+            return quote
+
         loan_amt = applicant_data.get('LoanOriginalAmount', 15000)
         risk_score = applicant_data.get('risk_score_norm', 0.5)
         
@@ -93,54 +382,397 @@ class LoanPricingEngine:
         term_years = applicant_data.get('term_years', 3)
         segment = self._determine_segment(risk_score)
 
-        elast_input = pd.DataFrame({
-            'const': 1.0,
-            'risk_score_norm': risk_score,
-            'LoanOriginalAmount': loan_amt,
-            'Rate_Subprime': 0.0,
-            'Rate_NearPrime': 0.0,
-            'Rate_Prime': 0.0
-        }, index=range(len(rate_grid)))
-
-        if segment == 'Subprime':
-            elast_input['Rate_Subprime'] = rate_grid
-        elif segment == 'NearPrime':
-            elast_input['Rate_NearPrime'] = rate_grid
-        else:
-            elast_input['Rate_Prime'] = rate_grid
-            
+        surface_args = (np.array([pd_prob]), np.array([risk_score], dtype=float),
+                        np.array([loan_amt], dtype=float), np.array([term_years], dtype=float), cost_of_funds)
+        # The continuous optimizer never needs the grid, so it is only scored when curves are wanted
+        surface = None
+        if curves or self.optimizer != 'continuous':
+            surface = self._profit_surface(*surface_args, timer=timer)
 
-        model_cols = ['const', 'risk_score_norm', 'Rate_Subprime', 'Rate_NearPrime', 'Rate_Prime', 'LoanOriginalAmount']
-        accept_probs = self.elasticity_model.predict(elast_input[model_cols])
+        raw_rates, best_profits = self._raw_optimum(*surface_args, timer=timer, surface=surface)
+        raw_optimal_rate, max_profit = raw_rates[0], best_profits[0]
 
-        # Profit Calculation
-        # Profit = P(Accept) * [ (1-PD)*Income - PD*Loss ]
-        annual_profit = (rate_grid - self.cost_of_funds) * loan_amt
-        profit_good = annual_profit * term_years
-        loss_bad = self.lgd * loan_amt
-        expected_margin = ((1 - pd_prob) * profit_good) - (pd_prob * loss_bad)
-        expected_profits = accept_probs * expected_margin
+        decision, final_rate, notes = self._apply_governance(raw_optimal_rate, pd_prob, segment, max_profit)
+        timer.lap('governance')
 
-        results_df = pd.DataFrame({
-            'Rate': rate_grid,
-            'Prob_Accept': accept_probs,
-            'Exp_Profit': expected_profits
-        })
+        quote = Quote(final_rate, max_profit, decision, pd_prob, segment, notes)
+        if curves:
+            rate_grid, accept_probs, expected_profits = surface
+            quote.rate_grid, quote.accept_probs, quote.expected_profits = rate_grid, accept_probs[0], expected_profits[0]
+        timer.lap('output')
+        timer.count_decision(decision, segment)
+        timer.finish()
+        if self.audit is not None:
+            self.audit.record_quote(quote, pd_multiplier, self._cost_of_funds(cost_of_funds))
+        return quote
 
-        best_idx = results_df['Exp_Profit'].idxmax()
-        raw_optimal_rate = results_df.loc[best_idx, 'Rate']
-        max_profit = results_df.loc[best_idx, 'Exp_Profit']
+    def get_optimal_rate(self, applicant_data, pd_multiplier=1.0, cost_of_funds=None):
+        """
+        quote() as the original dict, with the 61-row 'curve_data' DataFrame included.
+        Callers that do not plot the curve should use quote() instead.
+        """
+        return self.quote(applicant_data, pd_multiplier, cost_of_funds, curves=True).to_dict()
 
+    def counter_offers(self, applicant_data, top_k=3, terms=(3, 5), amount_ladder=(1.0, 0.8, 0.6, 0.4),
+                       pd_multiplier=1.0, cost_of_funds=None):
+        """
+        Searches rate x term x amount for the best governance-compliant offers to one applicant,
+        e.g. a counter-offer after REJECT_RISK / REJECT_ECONOMICS or for a marginal approval.
 
-        decision, final_rate, notes = self._apply_governance(raw_optimal_rate, pd_prob, segment, max_profit)
+        terms: loan terms in years (3 = 36 months, 5 = 60 months).
+        amount_ladder: fractions of the requested amount; the AMOUNT_FEATURES are scaled with it.
+        All (term, amount) variants are scored in one risk-model call, and the survivors in one
+        elasticity pass over the rate grid. Variants over the PD threshold are dropped before that
+        pass, and rates above the applicant's cap (Global, or Prime) are clipped to the cap.
+        Returns up to top_k offers, best expected profit first, one per (term, amount), as dicts.
+        Unlike quote(), a capped offer's profit is the profit at the capped rate.
+        """
+        cfg = self.policy_config
+        timer = self._timer('counter_offer')
+
+        loan_amt = applicant_data.get('LoanOriginalAmount', 15000)
+        risk_score = applicant_data.get('risk_score_norm', 0.5)
+        term_grid = np.repeat(np.asarray(terms, dtype=float), len(amount_ladder))
+        scale_grid = np.tile(np.asarray(amount_ladder, dtype=float), len(terms))
 
-      
-        return {
-            'optimal_rate': final_rate,
-            'max_profit': max_profit,
-            'decision': decision,
-            'prob_default': pd_prob,
+        # STEP 1: PREDICT RISK (PD) for every (term, amount) variant at once
+        X = np.repeat(self._risk_matrix(applicant_data), len(term_grid), axis=0)
+        if 'term_years' in self._feature_index:
+            X[:, self._feature_index['term_years']] = term_grid
+        for name in AMOUNT_FEATURES:
+            if name in self._feature_index:
+                X[:, self._feature_index[name]] *= scale_grid
+        timer.lap('feature_alignment')
+        pd_probs = np.minimum(self._predict_pd_matrix(X) * pd_multiplier, 1.0)
+        timer.lap('risk_model')
+
+        # Rule 1 prunes whole variants before the elasticity model
+        keep = np.flatnonzero(pd_probs <= cfg['MAX_PD_THRESHOLD'])
+        if len(keep) == 0:
+            timer.finish()
+            return []
+
+        # Rules 2-3: rates above the applicable cap are never offered (the cap itself is)
+        segment = self._determine_segment(risk_score)
+        cap = min(cfg['GLOBAL_MAX_RATE'], cfg['PRIME_MAX_RATE']) if segment == 'Prime' else cfg['GLOBAL_MAX_RATE']
+        rates = np.unique(np.minimum(self._rate_grid(), cap))
+
+        # STEP 2: OPTIMIZE each surviving variant over the capped rates
+        n = len(keep)
+        loan_amts = loan_amt * scale_grid[keep]
+        accept_probs, expected_profits = self._expected_profit(
+            rates, pd_probs[keep], np.full(n, risk_score, dtype=float), loan_amts, term_grid[keep],
+            cost_of_funds, timer
+        )
+        best = expected_profits.argmax(axis=1)
+        best_profits = expected_profits[np.arange(n), best]
+
+        # Rule 4: Minimum Profit Margin, then the top_k variants by expected profit
+        compliant = np.flatnonzero(best_profits >= cfg['MIN_PROFIT_MARGIN'])
+        ranked = compliant[np.argsort(-best_profits[compliant], kind='stable')][:top_k]
+        timer.lap('optimizer')
+
+        offers = [{
+            'term_years': float(term_grid[keep[i]]),
+            'loan_amount': float(loan_amts[i]),
+            'optimal_rate': float(rates[best[i]]),
+            'max_profit': float(best_profits[i]),
+            'prob_accept': float(accept_probs[i, best[i]]),
+            'prob_default': float(pd_probs[keep[i]]),
             'risk_segment': segment,
-            'curve_data': results_df,
-            'policy_notes': notes
-        }
\ No newline at end of file
+        } for i in ranked]
+        timer.lap('output')
+        timer.finish()
+        return offers
+
+    def _predict_pd_batch(self, applicants_df, timer=NULL_TIMER):
+        """Brain 1 for a whole DataFrame: one in-place prediction, unstressed PDs."""
+        X = self._risk_matrix(applicants_df)
+        timer.lap('feature_alignment')
+        pd_probs = self._predict_pd_matrix(X)
+        timer.lap('risk_model')
+        return pd_probs
+
+    def _applicant_arrays(self, applicants_df):
+        """risk_score_norm, LoanOriginalAmount and term_years as float arrays, with the single-applicant defaults."""
+        n = len(applicants_df)
+
+        def column(name, default):
+            if name in applicants_df.columns:
+                return applicants_df[name].to_numpy(dtype=float)
+            return np.full(n, default, dtype=float)
+
+        return column('risk_score_norm', 0.5), column('LoanOriginalAmount', 15000), column('term_years', 3)
+
+    def quote_batch(self, applicants_df, pd_multiplier=1.0, cost_of_funds=None, chunk_size=50000, curves=False,
+                    base_pd=None):
+        """
+        Batch version of quote(): prices every row of a DataFrame in one pass and returns a
+        QuoteBatch (columnar arrays, see pricing_results.py). curves=True also keeps the
+        rate-grid curves, as N x 61 float32 arrays.
+        base_pd: the rows' unstressed PDs from an earlier _predict_pd_batch(), to re-price the same
+                 applicants under other stress settings without running Brain 1 again.
+        """
+        n = len(applicants_df)
+        timer = self._timer('batch')
+
+        # STEP 1: PREDICT RISK (PD) - one booster call for the whole batch
+        if base_pd is None:
+            base_pd = self._predict_pd_batch(applicants_df, timer)
+        pd_probs = np.minimum(base_pd * pd_multiplier, 1.0)
+
+        risk_scores, loan_amts, term_years = self._applicant_arrays(applicants_df)
+        seg_idx = self._segment_index(risk_scores)
+        timer.lap('feature_alignment')
+
+        final_rates = np.zeros(n)
+        max_profits = np.zeros(n)
+        flags = np.full(n, NOTE_PRECHECK, dtype=np.uint8)
+
+        # STEP 2: OPTIMIZE only the applicants that pass the pre-optimization PD check
+        high_risk = pd_probs > self.policy_config['MAX_PD_THRESHOLD']
+        survivors = np.flatnonzero(~high_risk)
+
+        rate_grid = accept_curves = profit_curves = None
+        if curves:
+            rate_grid = self._rate_grid()
+            accept_curves = np.full((n, len(rate_grid)), np.nan, dtype=np.float32)
+            profit_curves = np.full((n, len(rate_grid)), np.nan, dtype=np.float32)
+
+        # Survivors are scored in chunks so the N x 61 profit surface stays bounded for large books
+        for start in range(0, len(survivors), chunk_size):
+            idx = survivors[start:start + chunk_size]
+            args = (pd_probs[idx], risk_scores[idx], loan_amts[idx], term_years[idx], cost_of_funds)
+            surface = self._profit_surface(*args, timer=timer) if curves else None
+            raw_rates, best_profits = self._raw_optimum(*args, timer=timer, surface=surface)
+            if curves:
+                accept_curves[idx], profit_curves[idx] = surface[1], surface[2]
+
+            # STEP 3: GOVERNANCE
+            flags[idx], final_rates[idx] = self._governance_flags(raw_rates, pd_probs[idx], seg_idx[idx] == 2,
+                                                                  best_profits)
+            max_profits[idx] = best_profits
+            timer.lap('governance')
+
+        segment_codes = np.where(high_risk, HIGH_RISK_CODE, seg_idx).astype(np.int8)
+        results = QuoteBatch(applicants_df.index, final_rates, max_profits, pd_probs, segment_codes, flags,
+                             prime_cap_note(self.policy_config['PRIME_MAX_RATE']),
+                             rate_grid, accept_curves, profit_curves)
+        timer.lap('output')
+        timer.count_decisions(results.decision, segment_codes)
+        timer.finish(items=n)
+        if self.audit is not None:
+            self.audit.record_batch(results, pd_multiplier, self._cost_of_funds(cost_of_funds))
+        return results
+
+    def get_optimal_rates(self, applicants_df, pd_multiplier=1.0, cost_of_funds=None, chunk_size=50000):
+        """
+        quote_batch() as a DataFrame (same index) with the single-applicant keys, minus 'curve_data'.
+        """
+        return self.quote_batch(applicants_df, pd_multiplier, cost_of_funds, chunk_size).to_frame()
+
+    def run_stress_scenarios(self, applicants_df, pd_multipliers=(1.0,), costs_of_funds=None,
+                             include_notes=False, chunk_size=2000):
+        """
+        Economic stress grid: prices every applicant under every (pd_multiplier, cost_of_funds) pair.
+        PD and P(Accept) are computed once; only the profit arithmetic and governance run per scenario,
+        as one applicants x scenarios x rates array. Engine state (e.g. cost_of_funds) is never modified.
+        Returns one row per (applicant, pd_multiplier, cost_of_funds); 'policy_notes' only if include_notes.
+        """
+        if costs_of_funds is None:
+            costs_of_funds = [self.cost_of_funds]
+        pd_multipliers = [float(m) for m in pd_multipliers]
+        costs = np.asarray(costs_of_funds, dtype=float)
+        n, n_pd, n_cof = len(applicants_df), len(pd_multipliers), len(costs)
+        timer = self._timer('stress')
+
+        # Model inference happens once, independent of the shocks
+        base_pd = self._predict_pd_batch(applicants_df, timer)
+        pd_probs = np.stack([np.minimum(base_pd * m, 1.0) for m in pd_multipliers], axis=1)  # N x P
+        risk_scores, loan_amts, term_years = self._applicant_arrays(applicants_df)
+        seg_idx = self._segment_index(risk_scores)
+        base_segments = np.array(['Subprime', 'NearPrime', 'Prime'], dtype=object)[seg_idx]
+        rate_grid = self._rate_grid()
+        timer.lap('feature_alignment')
+
+        raw_rates = np.zeros((n, n_pd, n_cof))
+        best_profits = np.zeros((n, n_pd, n_cof))
+
+        for start in range(0, n, chunk_size):
+            sl = slice(start, start + chunk_size)
+            if self.optimizer == 'continuous':
+                # Refined rates differ per scenario, so only PD is shared across the grid here
+                for j in range(n_pd):
+                    for k, cof in enumerate(costs):
+                        raw_rates[sl, j, k], best_profits[sl, j, k] = self._refine_rates(
+                            pd_probs[sl, j], risk_scores[sl], loan_amts[sl], term_years[sl], cof, timer=timer
+                        )
+                continue
+
+            accept_probs = self.elasticity.predict(rate_grid, risk_scores[sl], loan_amts[sl], seg_idx[sl])  # N x R
+            timer.lap('elasticity_model')
+
+            # Same arithmetic as _expected_profit, broadcast to N x P x C x R
+            loan = loan_amts[sl, None, None]
+            annual_profit = (rate_grid - costs[:, None]) * loan
+            profit_good = annual_profit * term_years[sl, None, None]
+            loss_bad = self.lgd * loan[..., None]
+            pds = pd_probs[sl].astype(float)[:, :, None, None]
+            expected_margin = ((1 - pds) * profit_good[:, None]) - (pds * loss_bad)
+            expected_profits = accept_probs[:, None, None, :] * expected_margin
+            timer.lap('profit')
+
+            best_idx = expected_profits.argmax(axis=-1)
+            raw_rates[sl] = rate_grid[best_idx]
+            best_profits[sl] = np.take_along_axis(expected_profits, best_idx[..., None], axis=-1)[..., 0]
+            timer.lap('optimizer')
+
+        # GOVERNANCE over every (applicant, scenario) cell at once
+        shape = (n, n_pd, n_cof)
+        flat_pds = np.broadcast_to(pd_probs[:, :, None], shape).ravel()
+        segments = np.broadcast_to(base_segments[:, None, None], shape).ravel().copy()
+        max_profits = best_profits.ravel()
+        decisions, final_rates, notes = self._apply_governance_batch(
+            raw_rates.ravel(), flat_pds, segments, max_profits, with_notes=include_notes
+        )
+
+        # Pre-optimization PD check, exactly as in get_optimal_rate
+        high_risk = flat_pds > self.policy_config['MAX_PD_THRESHOLD']
+        decisions[high_risk] = 'REJECT_RISK'
+        final_rates[high_risk] = 0.0
+        max_profits[high_risk] = 0.0
+        segments[high_risk] = 'High Risk'
+        timer.lap('governance')
+
+        results = {
+            'optimal_rate': final_rates,
+            'max_profit': max_profits,
+            'decision': decisions,
+            'prob_default': flat_pds,
+            'risk_segment': segments
+        }
+        if include_notes:
+            for i in np.flatnonzero(high_risk):
+                notes[i] = ["Pre-optimization PD Check"]
+            results['policy_notes'] = notes
+
+        index = pd.MultiIndex.from_product(
+            [applicants_df.index, pd_multipliers, costs], names=['applicant', 'pd_multiplier', 'cost_of_funds']
+        )
+        stress_results = pd.DataFrame(results, index=index).reset_index()
+        timer.lap('output')
+        timer.count_decisions(decisions, np.where(high_risk, 3, np.broadcast_to(seg_idx[:, None, None], shape).ravel()))
+        timer.finish(items=n)
+        return stress_results
+
+    def sensitivities(self, applicants_df, pd_multiplier=1.0, cost_of_funds=None, chunk_size=50000):
+        """
+        Analytic sensitivities ("Greeks") of every applicant's quote, from one pricing pass.
+
+        Expected profit is A(r) * m(r): P(Accept) A = sigmoid(... + beta * r) and margin
+        m = L * [(1-PD) * (r-CoF) * T - PD * LGD]. At the optimum the first-order condition
+        G = beta * (1-A) * m + L * (1-PD) * T = 0 holds, so for theta in (CoF, PD, LGD):
+            d(profit)/d(theta) = the partial derivative at the quoted rate (envelope theorem)
+            d(rate)/d(theta)   = -G_theta / G_r (implicit function theorem)
+        A rate held at a policy cap or at the edge of the rate range does not move locally: its
+        rate derivatives are 0 and `binding_cap` names the limit. Derivatives describe the
+        continuous optimum (in grid mode the quoted rate is its nearest grid point).
+
+        Headroom columns give the distance to each policy limit, both directly and in stress units:
+        the CoF rise (first order) that triggers REJECT_ECONOMICS, and the pd_multiplier that
+        triggers the PD cutoff. Applicants rejected by the PD pre-check get NaN sensitivities.
+        Returns a DataFrame (same index) with the get_optimal_rates() columns, minus the notes.
+        """
+        if cost_of_funds is None:
+            cost_of_funds = self.cost_of_funds
+        cfg = self.policy_config
+        n = len(applicants_df)
+        timer = self._timer('sensitivity')
+
+        base_pd = self._predict_pd_batch(applicants_df, timer)
+        pd_probs = np.minimum(base_pd * pd_multiplier, 1.0).astype(float)
+        risk_scores, loan_amts, term_years = self._applicant_arrays(applicants_df)
+        seg_idx = self._segment_index(risk_scores)
+        timer.lap('feature_alignment')
+
+        raw_rates = np.full(n, np.nan)
+        final_rates = np.zeros(n)
+        max_profits = np.zeros(n)
+        flags = np.full(n, NOTE_PRECHECK, dtype=np.uint8)
+        high_risk = pd_probs > cfg['MAX_PD_THRESHOLD']
+        survivors = np.flatnonzero(~high_risk)
+        for start in range(0, len(survivors), chunk_size):
+            idx = survivors[start:start + chunk_size]
+            raw_rates[idx], max_profits[idx] = self._raw_optimum(
+                pd_probs[idx], risk_scores[idx], loan_amts[idx], term_years[idx], cost_of_funds, timer=timer
+            )
+            flags[idx], final_rates[idx] = self._governance_flags(raw_rates[idx], pd_probs[idx], seg_idx[idx] == 2,
+                                                                  max_profits[idx])
+            timer.lap('governance')
+
+        # Evaluate at the offered rate (the cap, if one fired), else at the optimizer's rate
+        capped = (flags & (NOTE_GLOBAL_CAP | NOTE_PRIME_CAP)) != 0
+        rates = np.where(capped, final_rates, raw_rates)
+        accept = self.elasticity.predict(np.nan_to_num(rates)[:, None], risk_scores, loan_amts, seg_idx)[:, 0]
+        beta = self.elasticity.beta_rate[seg_idx]
+        spread_income = (rates - cost_of_funds) * term_years             # per $ lent, if repaid
+        margin = loan_amts * ((1 - pd_probs) * spread_income - pd_probs * self.lgd)
+        margin_d_rate = loan_amts * (1 - pd_probs) * term_years
+        margin_d_pd = -loan_amts * (spread_income + self.lgd)
+        margin_d_lgd = -loan_amts * pd_probs
+        timer.lap('elasticity_model')
+
+        # Envelope theorem: the rate's own response drops out at the optimum
+        profit_d_cof = -accept * margin_d_rate
+        profit_d_pd = accept * margin_d_pd
+        profit_d_lgd = accept * margin_d_lgd
+
+        # Implicit function theorem on G(r, theta) = beta * (1-A) * m + dm/dr = 0
+        # (dm/dr depends on PD but not on CoF or LGD)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            g_rate = (1 - accept) * beta * (margin_d_rate - beta * accept * margin)
+            rate_d_cof = -(beta * (1 - accept) * -margin_d_rate) / g_rate
+            rate_d_pd = -(beta * (1 - accept) * margin_d_pd - loan_amts * term_years) / g_rate
+            rate_d_lgd = -(beta * (1 - accept) * margin_d_lgd) / g_rate
+
+        binding = np.full(n, '', dtype=object)
+        binding[raw_rates <= cfg['GLOBAL_MIN_RATE'] + 1e-9] = 'GLOBAL_MIN_RATE'
+        binding[raw_rates >= cfg['GLOBAL_MAX_RATE'] - 1e-9] = 'GLOBAL_MAX_RATE'
+        binding[(flags & NOTE_GLOBAL_CAP) != 0] = 'GLOBAL_MAX_RATE'
+        binding[(flags & NOTE_PRIME_CAP) != 0] = 'PRIME_MAX_RATE'
+        for rate_d in (rate_d_cof, rate_d_pd, rate_d_lgd):
+            rate_d[binding != ''] = 0.0
+
+        profit_headroom = max_profits - cfg['MIN_PROFIT_MARGIN']
+        rate_cap = np.where(seg_idx == 2, cfg['PRIME_MAX_RATE'], cfg['GLOBAL_MAX_RATE'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cof_to_min_profit = np.where(profit_d_cof < 0, profit_headroom / -profit_d_cof, np.inf)
+            pd_multiplier_to_reject = np.where(base_pd > 0, cfg['MAX_PD_THRESHOLD'] / base_pd, np.inf)
+
+        # The PD pre-check rejects before any rate exists
+        for values in (rate_d_cof, rate_d_pd, rate_d_lgd, profit_d_cof, profit_d_pd, profit_d_lgd,
+                       profit_headroom, cof_to_min_profit):
+            values[high_risk] = np.nan
+
+        segment_codes = np.where(high_risk, HIGH_RISK_CODE, seg_idx).astype(np.int8)
+        quotes = QuoteBatch(applicants_df.index, final_rates, max_profits, pd_probs, segment_codes, flags,
+                            prime_cap_note(cfg['PRIME_MAX_RATE']))
+        results = quotes.to_frame(include_notes=False)
+        results = results.assign(**{
+            'binding_cap': binding,
+            'rate_d_cof': rate_d_cof,
+            'rate_d_pd': rate_d_pd,
+            'rate_d_lgd': rate_d_lgd,
+            'profit_d_cof': profit_d_cof,
+            'profit_d_pd': profit_d_pd,
+            'profit_d_lgd': profit_d_lgd,
+            'pd_headroom': cfg['MAX_PD_THRESHOLD'] - pd_probs,
+            'profit_headroom': profit_headroom,
+            'rate_cap_headroom': rate_cap - raw_rates,
+            'cof_to_min_profit': cof_to_min_profit,
+            'pd_multiplier_to_reject': pd_multiplier_to_reject,
+        })
+        timer.lap('output')
+        timer.count_decisions(results['decision'].to_numpy(), segment_codes)
+        timer.finish(items=n)
+        return results
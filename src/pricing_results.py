@@ -0,0 +1,221 @@
+"""
+Compact pricing results: what LoanPricingEngine.quote() and quote_batch() return.
+
+    quote = engine.quote(applicant)                 # Quote: __slots__ record, no curve
+    quote = engine.quote(applicant, curves=True)
+    quote.curve_data                                # 61-row DataFrame, built on access
+    quote.to_dict()                                 # the get_optimal_rate() dict
+
+    batch = engine.quote_batch(applicants_df)       # QuoteBatch: one array per field
+    batch.optimal_rate, batch.decision, batch[i]    # columns, or one row as a Quote
+    batch.to_frame()                                # the get_optimal_rates() DataFrame
+    batch.to_dicts()                                # one plain dict per applicant
+
+Decisions and notes are stored as one uint8 of governance flags per applicant (see NOTE_*),
+segments as int8 codes (see engine_metrics.SEGMENTS). Labels and note lists are only built
+by the conversions. Batch curves are opt-in: one shared rate grid plus N x k float32 arrays.
+"""
+import numpy as np
+
+try:
+    from src.engine_metrics import DECISIONS, SEGMENTS
+except ImportError:
+    from engine_metrics import DECISIONS, SEGMENTS
+
+# Governance flags, one bit per rule that fired
+NOTE_GLOBAL_CAP = 1
+NOTE_PRIME_CAP = 2
+NOTE_LOW_PROFIT = 4
+NOTE_HIGH_PD = 8
+NOTE_PRECHECK = 16  # rejected by the pre-optimization PD check (never optimized)
+
+HIGH_RISK_CODE = SEGMENTS.index('High Risk')
+
+_DECISION_LABELS = np.array(DECISIONS, dtype=object)
+_SEGMENT_LABELS = np.array(SEGMENTS, dtype=object)
+
+
+def prime_cap_note(prime_max_rate):
+    return f"Capped at Prime Max ({prime_max_rate:.0%})"
+
+
+def notes_from_flags(flags, prime_note):
+    """The policy_notes list for one applicant's governance flags."""
+    if flags & NOTE_PRECHECK:
+        return ["Pre-optimization PD Check"]
+    if flags & NOTE_HIGH_PD:
+        return ['PD exceeds maximum threshold']
+    if flags & NOTE_LOW_PROFIT:
+        return ['Expected profit below minimum margin']
+    notes = []
+    if flags & NOTE_GLOBAL_CAP:
+        notes.append('Capped to Global Max (36%)')
+    if flags & NOTE_PRIME_CAP:
+        notes.append(prime_note)
+    return notes
+
+
+def decision_codes(flags):
+    """0 = APPROVE, 1 = REJECT_RISK, 2 = REJECT_ECONOMICS (see engine_metrics.DECISIONS)."""
+    flags = np.asarray(flags)
+    return np.where(flags & (NOTE_HIGH_PD | NOTE_PRECHECK), 1, np.where(flags & NOTE_LOW_PROFIT, 2, 0))
+
+
+def decision_labels(flags):
+    """Decision label per applicant, as an object array."""
+    return _DECISION_LABELS[decision_codes(flags)]
+
+
+def policy_notes(flags, prime_note):
+    """One fresh policy_notes list per applicant; each distinct flag value is decoded once."""
+    by_flags = {}
+    notes = []
+    for value in np.asarray(flags).tolist():
+        template = by_flags.get(value)
+        if template is None:
+            template = by_flags[value] = notes_from_flags(value, prime_note)
+        notes.append(list(template))
+    return notes
+
+
+def _curve_frame(rate_grid, accept_probs, expected_profits):
+    import pandas as pd
+    return pd.DataFrame({'Rate': rate_grid, 'Prob_Accept': accept_probs, 'Exp_Profit': expected_profits})
+
+
+class Quote:
+    """One priced applicant. Supports quote['key'] for code written against the old dict."""
+    __slots__ = ('optimal_rate', 'max_profit', 'decision', 'prob_default', 'risk_segment', 'policy_notes',
+                 'rate_grid', 'accept_probs', 'expected_profits')
+
+    KEYS = ('optimal_rate', 'max_profit', 'decision', 'prob_default', 'risk_segment', 'curve_data', 'policy_notes')
+
+    def __init__(self, optimal_rate, max_profit, decision, prob_default, risk_segment, policy_notes,
+                 rate_grid=None, accept_probs=None, expected_profits=None):
+        self.optimal_rate = optimal_rate
+        self.max_profit = max_profit
+        self.decision = decision
+        self.prob_default = prob_default
+        self.risk_segment = risk_segment
+        self.policy_notes = policy_notes
+        self.rate_grid = rate_grid
+        self.accept_probs = accept_probs
+        self.expected_profits = expected_profits
+
+    @property
+    def curve_data(self):
+        """Rate / Prob_Accept / Exp_Profit DataFrame, or None when priced without curves."""
+        if self.rate_grid is None:
+            return None
+        return _curve_frame(self.rate_grid, self.accept_probs, self.expected_profits)
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self):
+        """The get_optimal_rate() dict."""
+        return {key: getattr(self, key) for key in self.KEYS}
+
+    def __repr__(self):
+        return (f"Quote(decision={self.decision!r}, optimal_rate={float(self.optimal_rate):.4f}, "
+                f"prob_default={float(self.prob_default):.4f}, risk_segment={self.risk_segment!r})")
+
+
+class QuoteBatch:
+    """
+    Columnar results for N applicants, in input order.
+    accept_curves / expected_profit_curves are N x len(rate_grid) float32 (NaN rows for
+    applicants rejected before optimization), or None when priced without curves.
+    """
+    FIELDS = ('optimal_rate', 'max_profit', 'decision', 'prob_default', 'risk_segment', 'policy_notes')
+
+    def __init__(self, index, optimal_rate, max_profit, prob_default, segment_codes, flags, prime_note,
+                 rate_grid=None, accept_curves=None, expected_profit_curves=None):
+        self.index = index
+        self.optimal_rate = optimal_rate
+        self.max_profit = max_profit
+        self.prob_default = prob_default
+        self.segment_codes = segment_codes
+        self.flags = flags
+        self.prime_note = prime_note
+        self.rate_grid = rate_grid
+        self.accept_curves = accept_curves
+        self.expected_profit_curves = expected_profit_curves
+
+    @classmethod
+    def concat(cls, batches):
+        """One QuoteBatch from consecutive batches priced with the same settings (e.g. a book in chunks)."""
+        first = batches[0]
+
+        def column(name):
+            arrays = [getattr(batch, name) for batch in batches]
+            return None if arrays[0] is None else np.concatenate(arrays)
+
+        index = first.index.append([batch.index for batch in batches[1:]]) if len(batches) > 1 else first.index
+        return cls(index, column('optimal_rate'), column('max_profit'), column('prob_default'),
+                   column('segment_codes'), column('flags'), first.prime_note, first.rate_grid,
+                   column('accept_curves'), column('expected_profit_curves'))
+
+    def __len__(self):
+        return len(self.flags)
+
+    @property
+    def decision_codes(self):
+        return decision_codes(self.flags)
+
+    @property
+    def decision(self):
+        return decision_labels(self.flags)
+
+    @property
+    def risk_segment(self):
+        return _SEGMENT_LABELS[self.segment_codes]
+
+    @property
+    def policy_notes(self):
+        """One list per applicant, decoded from the flags on every access."""
+        return policy_notes(self.flags, self.prime_note)
+
+    def curve(self, i):
+        """Curve DataFrame for the applicant at position i (None without curves or if not optimized)."""
+        if self.rate_grid is None or self.flags[i] & NOTE_PRECHECK:
+            return None
+        return _curve_frame(self.rate_grid, self.accept_curves[i], self.expected_profit_curves[i])
+
+    def __getitem__(self, i):
+        """The applicant at position i, as a Quote (curve arrays are views into the batch)."""
+        flags = int(self.flags[i])
+        curves = ()
+        if self.rate_grid is not None and not flags & NOTE_PRECHECK:
+            curves = (self.rate_grid, self.accept_curves[i], self.expected_profit_curves[i])
+        return Quote(self.optimal_rate[i], self.max_profit[i], DECISIONS[int(decision_codes(flags))],
+                     self.prob_default[i], SEGMENTS[self.segment_codes[i]],
+                     notes_from_flags(flags, self.prime_note), *curves)
+
+    def to_frame(self, include_notes=True):
+        """The get_optimal_rates() DataFrame (same index); skip the notes column with include_notes=False."""
+        import pandas as pd
+        columns = {
+            'optimal_rate': self.optimal_rate,
+            'max_profit': self.max_profit,
+            'decision': self.decision,
+            'prob_default': self.prob_default,
+            'risk_segment': self.risk_segment,
+        }
+        if include_notes:
+            columns['policy_notes'] = self.policy_notes
+        return pd.DataFrame(columns, index=self.index)
+
+    def to_dicts(self):
+        """One get_optimal_rates() record per applicant, with plain Python values."""
+        columns = [self.optimal_rate.tolist(), self.max_profit.tolist(), self.decision.tolist(),
+                   self.prob_default.tolist(), self.risk_segment.tolist(), self.policy_notes]
+        return [dict(zip(self.FIELDS, row)) for row in zip(*columns)]
+
+    @property
+    def nbytes(self):
+        arrays = (self.optimal_rate, self.max_profit, self.prob_default, self.segment_codes, self.flags,
+                  self.rate_grid, self.accept_curves, self.expected_profit_curves)
+        return sum(a.nbytes for a in arrays if a is not None)
@@ -0,0 +1,286 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from src.audit_log import AuditSink
+from src.pricing_engine import LoanPricingEngine
+from src.engine_metrics import EngineMetrics
+from src.pricing_service import build_applicant_data, format_response
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+
+
+class LatencyTracker:
+    """
+    Rolling window of request latencies, for p50/p99 and throughput sizing.
+    """
+    def __init__(self, window=10000):
+        self.latencies = deque(maxlen=window)
+        self.finished_at = deque(maxlen=window)
+        self.started_at = time.monotonic()
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+        self.finished_at.append(time.monotonic())
+        self.completed += 1
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched_requests += size
+
+    def snapshot(self):
+        latencies_ms = np.array(self.latencies) * 1000
+        uptime = time.monotonic() - self.started_at
+        window_span = self.finished_at[-1] - self.finished_at[0] if len(self.finished_at) > 1 else 0.0
+        return {
+            'uptime_s': round(uptime, 1),
+            'completed': self.completed,
+            'rejected_backpressure': self.rejected,
+            'failed': self.failed,
+            'latency_p50_ms': round(float(np.percentile(latencies_ms, 50)), 3) if len(latencies_ms) else None,
+            'latency_p99_ms': round(float(np.percentile(latencies_ms, 99)), 3) if len(latencies_ms) else None,
+            'throughput_rps': round(len(self.finished_at) / window_span, 1) if window_span > 0 else None,
+            'lifetime_rps': round(self.completed / uptime, 1) if uptime > 0 else None,
+            'batches': self.batches,
+            'avg_batch_size': round(self.batched_requests / self.batches, 2) if self.batches else None,
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent quote requests that arrive within `batch_window_ms` into one
+    quote_batch call. The queue is bounded: when it is full, submit() raises
+    asyncio.QueueFull and the caller answers 503 (backpressure).
+    """
+    def __init__(self, engine, batch_window_ms=5.0, max_batch=256, queue_size=1024):
+        self.engine = engine
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.metrics = LatencyTracker()
+        self.request_ids = itertools.count(1)
+
+    def next_application_id(self):
+        return f"req-{next(self.request_ids)}"
+
+    async def submit(self, applicant_data, application_id):
+        """Queues one applicant and waits for its decision; application_id labels its row (and audit record)."""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((applicant_data, application_id, future))
+        return await future
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.batch_window
+        while len(batch) < self.max_batch:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # Whatever queued up while we waited rides along for free
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            try:
+                applicants = pd.DataFrame([applicant for applicant, _, _ in batch],
+                                          index=[application_id for _, application_id, _ in batch])
+                # The engine runs off the event loop so new requests keep queueing meanwhile
+                results = await loop.run_in_executor(None, self.engine.quote_batch, applicants)
+                rows = results.to_dicts()
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.metrics.record_batch(len(batch))
+            for (_, _, future), row in zip(batch, rows):
+                if not future.done():
+                    future.set_result(row)
+
+
+class PricingServer:
+    """
+    Long-running HTTP front-end for the engine.
+        POST /quote    {"income", "fico", "amount", "term", ["dti", "util", "inquiries", "application_id"]}
+        GET  /metrics             p50/p99 latency, throughput, batching stats (+ engine stages if instrumented,
+                                  audit log counters if auditing)
+        GET  /metrics/prometheus  engine stage histograms and decision counters, Prometheus text format
+        GET  /health
+    """
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    async def quote(self, body):
+        started = time.perf_counter()
+        try:
+            payload = json.loads(body or b'{}')
+            if int(payload['term']) not in (36, 60):
+                raise ValueError("term must be 36 or 60")
+            applicant_data = build_applicant_data(
+                float(payload['income']), float(payload['fico']), float(payload['amount']), int(payload['term']),
+                dti=float(payload.get('dti', 0.25)), util=float(payload.get('util', 30.0)),
+                inquiries=int(payload.get('inquiries', 0))
+            )
+            application_id = str(payload.get('application_id') or self.batcher.next_application_id())
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': f"Invalid request: {e}"}
+
+        try:
+            result = await self.batcher.submit(applicant_data, application_id)
+        except asyncio.QueueFull:
+            self.batcher.metrics.rejected += 1
+            return 503, {'error': 'Pricing queue full, retry later'}
+        except Exception as e:
+            # The whole micro-batch failed in the engine; every request in it gets this answer
+            self.batcher.metrics.failed += 1
+            return 500, {'error': f"Pricing failed: {e}"}
+
+        self.batcher.metrics.record(time.perf_counter() - started)
+        response = format_response(result)
+        response['application_id'] = application_id
+        return 200, response
+
+    async def route(self, method, path, body):
+        if method == 'POST' and path == '/quote':
+            return await self.quote(body)
+        if method == 'GET' and path == '/metrics':
+            snapshot = self.batcher.metrics.snapshot()
+            snapshot['queue_depth'] = self.batcher.queue.qsize()
+            if self.batcher.engine.metrics is not None:
+                snapshot['engine'] = self.batcher.engine.metrics.snapshot()
+            if self.batcher.engine.audit is not None:
+                snapshot['audit'] = self.batcher.engine.audit.stats()
+            return 200, snapshot
+        if method == 'GET' and path == '/metrics/prometheus':
+            if self.batcher.engine.metrics is None:
+                return 404, {'error': 'Engine instrumentation is off (start with --instrument)'}
+            return 200, self.batcher.engine.metrics.to_prometheus()
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        return 404, {'error': f"No route for {method} {path}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self.route(method, path, body)
+
+                if isinstance(payload, str):
+                    data, content_type = payload.encode(), 'text/plain; version=0.0.4'
+                else:
+                    data, content_type = json.dumps(payload).encode(), 'application/json'
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(engine, host='0.0.0.0', port=8080, batch_window_ms=5.0, max_batch=256, queue_size=1024):
+    batcher = MicroBatcher(engine, batch_window_ms=batch_window_ms, max_batch=max_batch, queue_size=queue_size)
+    server = PricingServer(batcher)
+    batch_task = asyncio.create_task(batcher.run())
+    http = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"✅ Pricing server listening on http://{host}:{port} "
+          f"(batch window {batch_window_ms}ms, max batch {max_batch}, queue {queue_size})")
+    try:
+        async with http:
+            await http.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Adaptive Loan Pricing Engine - Async Pricing Server')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--batch-window-ms', type=float, default=5.0,
+                        help='How long to wait for more requests before pricing a batch')
+    parser.add_argument('--max-batch', type=int, default=256, help='Max applicants per model evaluation')
+    parser.add_argument('--queue-size', type=int, default=1024, help='Pending requests before answering 503')
+    parser.add_argument('--risk-model', default=os.path.join(ROOT, 'models/risk_model_xgb.pkl'))
+    parser.add_argument('--elasticity-model', default=os.path.join(ROOT, 'models/elasticity_model_logit.pkl'))
+    parser.add_argument('--cof', type=float, default=0.04, help='Cost of Funds')
+    parser.add_argument('--optimizer', choices=['grid', 'continuous'], default='grid')
+    parser.add_argument('--instrument', action='store_true',
+                        help='Record per-stage engine latency and decision counts (exposed on /metrics)')
+    parser.add_argument('--audit-dir', default=None, help='Log every decision to this audit log directory')
+    parser.add_argument('--audit-policy', choices=['block', 'drop'], default='block',
+                        help='When the audit buffer is full: make pricing wait, or drop the records')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    print("⏳ Initializing Adaptive Pricing Engine...")
+    engine = LoanPricingEngine(
+        risk_model_path=args.risk_model,
+        elasticity_model_path=args.elasticity_model,
+        cost_of_funds=args.cof,
+        optimizer=args.optimizer,
+        metrics=EngineMetrics() if args.instrument else None,
+        audit=AuditSink(args.audit_dir, policy=args.audit_policy) if args.audit_dir else None
+    )
+    print("✅ Engine Loaded Successfully.")
+
+    try:
+        asyncio.run(serve(engine, args.host, args.port, args.batch_window_ms, args.max_batch, args.queue_size))
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        if engine.audit is not None:
+            engine.audit.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import argparse
 import json
 import sys
 import pandas as pd
+from src.features import applicant_features
 from src.pricing_engine import LoanPricingEngine
 
 
@@ -42,45 +43,79 @@ def parse_arguments():
     parser.add_argument('--dti', type=float, default=0.25, help='Debt-to-Income Ratio (0.0-1.0)')
     parser.add_argument('--util', type=float, default=30.0, help='Credit Utilization (%)')
     parser.add_argument('--inquiries', type=int, default=0, help='Recent Inquiries (Last 6m)')
+    parser.add_argument('--counter-offers', type=int, default=0, metavar='K',
+                        help='Also search term x amount for the K best compliant counter-offers')
     
     return parser.parse_args()
 
 
+def build_applicant_data(income, fico, amount, term, dti=0.25, util=30.0, inquiries=0):
+    """
+    Maps the CLI inputs to the engine's applicant dict through the training feature transform
+    (src/features.py), with the same defaults the CLI uses.
+    """
+    return applicant_features({
+        'fico_range_low': fico,
+        'annual_inc': income,
+        'loan_amnt': amount,
+        'term': term,
+        'dti': dti,
+        'revol_util': util,
+        'inq_last_6mths': inquiries,
+    })
+
+
+def format_response(result):
+    """
+    The JSON-ready decision payload returned to callers.
+    """
+    return {
+        "decision": result['decision'],
+        "offered_rate": round(float(result['optimal_rate']), 4),
+        "offered_rate_display": f"{result['optimal_rate']:.2%}",
+        "risk_segment": result['risk_segment'],
+        "probability_of_default": f"{result['prob_default']:.2%}",
+        "expected_profit": round(float(result['max_profit']), 2),
+        "policy_notes": list(result['policy_notes'])
+    }
+
+
+def format_counter_offer(offer):
+    """
+    One counter_offers() entry as a JSON-ready payload.
+    """
+    return {
+        "term_months": int(round(offer['term_years'] * 12)),
+        "loan_amount": round(offer['loan_amount'], 2),
+        "offered_rate": round(offer['optimal_rate'], 4),
+        "offered_rate_display": f"{offer['optimal_rate']:.2%}",
+        "probability_of_default": f"{offer['prob_default']:.2%}",
+        "probability_of_acceptance": f"{offer['prob_accept']:.2%}",
+        "expected_profit": round(offer['max_profit'], 2)
+    }
+
+
 def main():
     engine = initialize_engine()
     
     args = parse_arguments()
 
-    applicant_data = {
-        'risk_score_norm': (args.fico - 300) / 550.0,
-        'annual_inc': args.income,
-        'LoanOriginalAmount': args.amount,
-        'dti': args.dti,
-        'revol_util': args.util,
-        'inq_last_6mths': args.inquiries,
-        'total_acc': 15,
-        'term_years': args.term / 12,
-        'emp_length': 5,
-        'home_ownership_RENT': 1,
-        'purpose_debt_consolidation': 1
-    }
+    applicant_data = build_applicant_data(
+        args.income, args.fico, args.amount, args.term,
+        dti=args.dti, util=args.util, inquiries=args.inquiries
+    )
     
     print("\n--- Processing Application ---")
     print(f"Applicant: FICO {args.fico} | Income ${args.income:,.0f} | Loan ${args.amount:,.0f}")
     
  
-    result = engine.get_optimal_rate(applicant_data)
+    result = engine.quote(applicant_data)
     
 
-    response = {
-        "decision": result['decision'],
-        "offered_rate": round(result['optimal_rate'], 4),
-        "offered_rate_display": f"{result['optimal_rate']:.2%}",
-        "risk_segment": result['risk_segment'],
-        "probability_of_default": f"{result['prob_default']:.2%}",
-        "expected_profit": round(result['max_profit'], 2),
-        "policy_notes": result['policy_notes']
-    }
+    response = format_response(result)
+    if args.counter_offers:
+        response["counter_offers"] = [format_counter_offer(offer)
+                                      for offer in engine.counter_offers(applicant_data, top_k=args.counter_offers)]
     
     print("\n--- 📤 Engine Decision ---")
     print(json.dumps(response, indent=4))
@@ -0,0 +1,553 @@
+"""
+Precomputed pricing surface: optimal rate and expected profit as a table over
+(PD, risk_score_norm, LoanOriginalAmount, term_years, cost_of_funds), answered by
+multilinear interpolation instead of a per-quote rate search.
+
+    python src/pricing_surface.py --out models/pricing_surface.npz
+
+    surface = PricingSurface.load_or_build('models/pricing_surface.npz', engine)
+    surface.lookup(pd, risk_score, loan_amt, term_years, cost_of_funds)   # a few microseconds
+    surface.quote(applicant_data)                                         # Brain 1 + lookup
+
+The table holds the continuous optimizer's raw optimum (before governance), one sub-table
+per risk segment and loan term, so no interpolation crosses a segment boundary. Governance runs
+exactly on the interpolated values. A quote falls back to the exact optimizer when it is
+outside the grid, within `boundary_margin` of a segment boundary, in a cell whose measured
+error (at the cell centre) exceeds the tolerances, or when the interpolated rate / profit
+lands close enough to a rate bound, the Prime cap or MIN_PROFIT_MARGIN that the error
+could flip the outcome. The surface depends on the elasticity model, LGD and
+policy_config (not on the risk model: PD is an input); a fingerprint of those is stored
+with the table, and a surface whose engine no longer matches answers every quote exactly
+until it is rebuilt.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Ensure src/ is importable
+
+import argparse
+import hashlib
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from src.pricing_engine import LoanPricingEngine
+
+SURFACE_VERSION = 1
+MAX_COF_SLICES = 8
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEGMENTS = ('Subprime', 'NearPrime', 'Prime')
+SEGMENT_SCORES = ((0.0, 0.4), (0.4, 0.75), (0.75, 1.0))  # risk_score_norm span of each segment
+
+# Grid spec: (low, high, points) per continuous axis; the PD axis always spans [0, MAX_PD_THRESHOLD].
+# Terms are discrete (36 / 60 month loans): one sub-table per term, other terms price exactly.
+DEFAULT_GRID = {
+    'pd_points': 41,
+    'score_points': 17,  # per segment
+    'amount': (1000.0, 40000.0, 21),
+    'cost_of_funds': (0.0, 0.10, 11),
+    'terms': (3, 5),
+}
+
+
+def fingerprint(engine):
+    """Hash of everything the surface depends on: elasticity coefficients, LGD and policy_config."""
+    payload = {
+        'version': SURFACE_VERSION,
+        'elasticity': [float(p) for p in engine.elasticity.params],
+        'lgd': float(engine.lgd),
+        'policy': {key: float(value) for key, value in sorted(engine.policy_config.items())},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class PricingSurface:
+    """
+    Interpolated optimal-rate / expected-profit table bound to a LoanPricingEngine.
+    Results match get_optimal_rate() with optimizer='continuous' to within `error_bound`.
+
+    Tables are (segment, term, pd, score, amount, cof); the continuous axes are described by
+    lows / highs / points in the order (pd, score, amount, cof), except that each segment
+    has its own score span (SEGMENT_SCORES). Profit is stored per dollar lent, which
+    takes the (near-linear) loan amount scaling out of the interpolation error.
+    """
+    def __init__(self, engine, lows, highs, points, terms, rate, profit_per_dollar, cell_ok, error_bound,
+                 built_fingerprint, rate_tolerance=1e-4, profit_tolerance=1e-3, boundary_margin=1e-3):
+        self.engine = engine
+        self.lows = np.asarray(lows, dtype=float)
+        self.highs = np.asarray(highs, dtype=float)
+        self.points = np.asarray(points, dtype=np.int64)
+        self.terms = tuple(float(t) for t in terms)
+        self.rate = np.ascontiguousarray(rate, dtype=np.float32)
+        self.profit_per_dollar = np.ascontiguousarray(profit_per_dollar, dtype=np.float32)
+        self.cell_ok = np.ascontiguousarray(cell_ok, dtype=bool)  # (segment, term, pd-1, score-1, amount-1, cof-1)
+        self.error_bound = error_bound
+        self.fingerprint = built_fingerprint
+        self.rate_tolerance = rate_tolerance
+        self.profit_tolerance = profit_tolerance
+        self.boundary_margin = boundary_margin
+        self._compile()
+
+    def _compile(self):
+        """Precomputes the scalar lookup's strides; its tables are built per cost of funds (_cof_slice)."""
+        n_pd, n_score, n_amount, n_cof = (int(p) for p in self.points)
+        self._points = [n_pd, n_score, n_amount, n_cof]
+        self._lows = self.lows.tolist()
+        self._scale = [(p - 1) / (hi - lo) for p, lo, hi in zip(self._points, self._lows, self.highs.tolist())]
+        self._score_lows = [lo for lo, _ in SEGMENT_SCORES]
+        self._score_scale = [(n_score - 1) / (hi - lo) for lo, hi in SEGMENT_SCORES]
+        self._term_index = {term: k for k, term in enumerate(self.terms)}
+
+        # Flat (segment, term, pd, score, amount) layout of a cost-of-funds slice
+        self._strides = (n_score * n_amount, n_amount)
+        self._block = n_pd * n_score * n_amount
+        self._cell_strides = ((n_score - 1) * (n_amount - 1), n_amount - 1)
+        self._cell_block = (n_pd - 1) * self._cell_strides[0]
+        self._slices = {}
+        self._bind(self.engine)
+
+    def _cof_slice(self, cost_of_funds):
+        """
+        The tables interpolated to one cost of funds, as flat Python lists (list indexing is the
+        fastest scalar read in CPython). Cached for the last MAX_COF_SLICES values: quotes
+        overwhelmingly reuse the engine's or a desk's cost of funds.
+        """
+        cached = self._slices.get(cost_of_funds)
+        if cached is None:
+            u = (cost_of_funds - self._lows[3]) * self._scale[3]
+            i = min(int(u), self._points[3] - 2)
+            t = u - i
+            rate = self.rate[..., i].astype(float) * (1.0 - t) + self.rate[..., i + 1].astype(float) * t
+            ppd = (self.profit_per_dollar[..., i].astype(float) * (1.0 - t)
+                   + self.profit_per_dollar[..., i + 1].astype(float) * t)
+            if len(self._slices) >= MAX_COF_SLICES:
+                self._slices.pop(next(iter(self._slices)))
+            cached = self._slices[cost_of_funds] = (rate.ravel().tolist(), ppd.ravel().tolist(),
+                                                    self.cell_ok[..., i].ravel().tobytes())
+        return cached
+
+    def _bind(self, engine):
+        self._elasticity = engine.elasticity
+        self._lgd = engine.lgd
+        self._policy = dict(engine.policy_config)
+        self._stale = fingerprint(engine) != self.fingerprint
+
+    def _fresh(self):
+        engine = self.engine
+        if (engine.elasticity is not self._elasticity or engine.lgd != self._lgd
+                or engine.policy_config != self._policy):
+            self._bind(engine)  # models reloaded or policy edited: re-check the fingerprint once
+        return not self._stale
+
+    @property
+    def stale(self):
+        """True when the engine's models, LGD or policy_config no longer match the built surface."""
+        return not self._fresh()
+
+    # -----------------------------------------------------------------
+    # Build
+    # -----------------------------------------------------------------
+    @classmethod
+    def build(cls, engine, pd_points=None, score_points=None, amount=None, cost_of_funds=None, terms=None,
+              rate_tolerance=1e-4, profit_tolerance=1e-3, boundary_margin=1e-3, validation_points=20000,
+              seed=0, chunk_size=50000):
+        """
+        Evaluates the exact optimizer on every grid node, then at every cell centre (the
+        per-cell error estimate) and on `validation_points` random quotes (the measured
+        error bound over the quotes the surface would serve).
+        Grid arguments default to DEFAULT_GRID; amount / cost_of_funds are (low, high, points).
+        """
+        pd_points = pd_points or DEFAULT_GRID['pd_points']
+        score_points = score_points or DEFAULT_GRID['score_points']
+        amount = amount or DEFAULT_GRID['amount']
+        cost_of_funds = cost_of_funds or DEFAULT_GRID['cost_of_funds']
+        terms = terms or DEFAULT_GRID['terms']
+
+        lows = [0.0, 0.0, amount[0], cost_of_funds[0]]
+        highs = [engine.policy_config['MAX_PD_THRESHOLD'], 1.0, amount[1], cost_of_funds[1]]
+        points = [pd_points, score_points, amount[2], cost_of_funds[2]]
+        if min(points) < 2 or any(hi <= lo for lo, hi in zip(lows, highs)):
+            raise ValueError("Every surface axis needs at least 2 points and high > low.")
+
+        def axes(seg, offset):
+            """Grid nodes (offset=0) or cell centres (offset=0.5) of one segment's sub-tables."""
+            spans = [(lows[0], highs[0]), SEGMENT_SCORES[seg], (lows[2], highs[2]), (lows[3], highs[3])]
+            grids = []
+            for (lo, hi), p in zip(spans, points):
+                nodes = np.linspace(lo, hi, p)
+                grids.append(nodes if offset == 0 else nodes[:-1] + offset * (nodes[1] - nodes[0]))
+            return grids
+
+        def exact_on(offset):
+            """Exact (rate, profit per dollar, mesh) per segment and term."""
+            results = []
+            for seg in range(len(SEGMENTS)):
+                mesh = [m.ravel() for m in np.meshgrid(*axes(seg, offset), indexing='ij')]
+                for term in terms:
+                    pds, scores, amts, cofs = mesh
+                    r, p = _exact_rates(engine, pds, scores, amts, np.full(len(pds), float(term)), cofs, chunk_size)
+                    results.append((r, p / amts, mesh, term))
+            return results
+
+        table_shape = (len(SEGMENTS), len(terms)) + tuple(points)
+        nodes = exact_on(0)
+        rate = np.stack([r for r, _, _, _ in nodes]).reshape(table_shape)
+        ppd = np.stack([p for _, p, _, _ in nodes]).reshape(table_shape)
+        cell_shape = (len(SEGMENTS), len(terms)) + tuple(p - 1 for p in points)
+        surface = cls(engine, lows, highs, points, terms, rate, ppd, np.ones(cell_shape, dtype=bool), None,
+                      fingerprint(engine), rate_tolerance, profit_tolerance, boundary_margin)
+
+        # Per-cell error estimate: interpolation error at each cell centre
+        cell_ok = []
+        for exact_rate, exact_ppd, (pds, scores, amts, cofs), term in exact_on(0.5):
+            r, p, _ = surface._interpolate(pds, scores, amts, np.full(len(pds), float(term)), cofs)
+            cell_ok.append(surface._within_tolerance(r, p, exact_rate, exact_ppd * amts))
+        surface.cell_ok = np.stack(cell_ok).reshape(cell_shape)
+        surface._compile()
+
+        surface.error_bound = surface._measure_error(validation_points, seed, chunk_size)
+        return surface
+
+    def _within_tolerance(self, rates, profits, exact_rates, exact_profits):
+        profit_scale = np.maximum(np.abs(exact_profits), self.engine.policy_config['MIN_PROFIT_MARGIN'])
+        return ((np.abs(rates - exact_rates) <= self.rate_tolerance)
+                & (np.abs(profits - exact_profits) <= self.profit_tolerance * profit_scale))
+
+    def _measure_error(self, n, seed, chunk_size):
+        """Error of served quotes vs the exact optimizer, on uniform random points of the domain."""
+        rng = np.random.default_rng(seed)
+        pds, scores, amts, cofs = (rng.uniform(lo, hi, n) for lo, hi in zip(self.lows, self.highs))
+        terms = rng.choice(self.terms, n)
+        rates, profits, served = self._interpolate(pds, scores, amts, terms, cofs)
+        served &= self._outside_guard_bands(rates, profits, scores)
+        exact_rates, exact_profits = _exact_rates(self.engine, pds, scores, amts, terms, cofs, chunk_size)
+        rate_err = np.abs(rates - exact_rates)[served]
+        profit_err = (np.abs(profits - exact_profits)
+                      / np.maximum(np.abs(exact_profits), self.engine.policy_config['MIN_PROFIT_MARGIN']))[served]
+        if not served.any():
+            rate_err = profit_err = np.zeros(1)
+        return {
+            'validation_points': int(n),
+            'served_fraction': float(served.mean()),
+            'max_rate_error': float(rate_err.max()),
+            'p99_rate_error': float(np.percentile(rate_err, 99)),
+            'max_profit_error': float(profit_err.max()),   # relative to max(|profit|, MIN_PROFIT_MARGIN)
+            'p99_profit_error': float(np.percentile(profit_err, 99)),
+        }
+
+    # -----------------------------------------------------------------
+    # Persistence
+    # -----------------------------------------------------------------
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(
+            path,
+            format_version=SURFACE_VERSION,
+            fingerprint=self.fingerprint,
+            lows=self.lows, highs=self.highs, points=self.points, terms=np.asarray(self.terms),
+            rate=self.rate, profit_per_dollar=self.profit_per_dollar, cell_ok=self.cell_ok,
+            tolerances=np.array([self.rate_tolerance, self.profit_tolerance, self.boundary_margin]),
+            error_bound=json.dumps(self.error_bound),
+        )
+        return path
+
+    @classmethod
+    def load(cls, path, engine):
+        """Loads a saved surface; raises ValueError if it was built for other models or policy."""
+        with np.load(path) as data:
+            version = int(data['format_version'])
+            if version != SURFACE_VERSION:
+                raise ValueError(f"Surface format v{version} not supported (expected v{SURFACE_VERSION}). "
+                                 f"Rebuild with src/pricing_surface.py.")
+            built_fingerprint = str(data['fingerprint'])
+            if built_fingerprint != fingerprint(engine):
+                raise ValueError("Pricing surface was built for different models or policy_config. "
+                                 "Rebuild with src/pricing_surface.py.")
+            rate_tolerance, profit_tolerance, boundary_margin = data['tolerances'].tolist()
+            return cls(engine, data['lows'], data['highs'], data['points'], data['terms'].tolist(), data['rate'],
+                       data['profit_per_dollar'], data['cell_ok'], json.loads(str(data['error_bound'])),
+                       built_fingerprint, rate_tolerance, profit_tolerance, boundary_margin)
+
+    @classmethod
+    def load_or_build(cls, path, engine, **build_kwargs):
+        """Loads `path`, or builds and saves a fresh surface when it is missing or out of date."""
+        if os.path.exists(path):
+            try:
+                return cls.load(path, engine)
+            except ValueError:
+                pass
+        surface = cls.build(engine, **build_kwargs)
+        surface.save(path)
+        return surface
+
+    # -----------------------------------------------------------------
+    # Lookup
+    # -----------------------------------------------------------------
+    def _interpolate(self, pds, scores, amts, terms, cofs):
+        """
+        Vectorized multilinear interpolation. Returns (raw_rates, profits, usable): `usable` is
+        False outside the grid, for other terms, near a segment boundary or in a cell over the
+        error tolerance.
+        """
+        n = len(pds)
+        seg = self.engine._segment_index(scores)
+        term_idx = np.full(n, -1)
+        for k, term in enumerate(self.terms):
+            term_idx[terms == term] = k
+        usable = term_idx >= 0
+        coords = [(pds - self.lows[0]) * self._scale[0],
+                  (scores - np.asarray(self._score_lows)[seg]) * np.asarray(self._score_scale)[seg],
+                  (amts - self.lows[2]) * self._scale[2],
+                  (cofs - self.lows[3]) * self._scale[3]]
+        # Element strides of the (segment, term, pd, score, amount, cof) tables and of cell_ok
+        strides = [st // self.rate.itemsize for st in self.rate.strides]
+        cell_strides = [st // self.cell_ok.itemsize for st in self.cell_ok.strides]
+        block = seg * len(self.terms) + np.maximum(term_idx, 0)
+        base = block * strides[1]
+        cell = block * cell_strides[1]
+        frac = []
+        for d, u in enumerate(coords):
+            usable &= (u >= 0) & (u <= self.points[d] - 1)
+            i = np.clip(np.floor(u), 0, self.points[d] - 2).astype(np.int64)
+            frac.append(np.clip(u - i, 0.0, 1.0))
+            base = base + i * strides[d + 2]
+            cell = cell + i * cell_strides[d + 2]
+        usable &= np.abs(scores - 0.4) >= self.boundary_margin
+        usable &= np.abs(scores - 0.75) >= self.boundary_margin
+        usable &= self.cell_ok.ravel()[np.where(usable, cell, 0)]
+
+        rate_flat, ppd_flat = self.rate.ravel(), self.profit_per_dollar.ravel()
+        rates, ppd = np.zeros(n), np.zeros(n)
+        for corner in range(1 << len(coords)):
+            weight, offset = np.ones(n), base
+            for d in range(len(coords)):
+                if corner >> d & 1:
+                    weight = weight * frac[d]
+                    offset = offset + strides[d + 2]
+                else:
+                    weight = weight * (1.0 - frac[d])
+            rates += weight * rate_flat[offset]
+            ppd += weight * ppd_flat[offset]
+        return rates, ppd * amts, usable
+
+    def _outside_guard_bands(self, rates, profits, scores):
+        """False where the interpolation error could move a quote across a rate bound, cap or margin."""
+        cfg = self.engine.policy_config
+        band = 2 * self.rate_tolerance
+        profit_band = 2 * self.profit_tolerance * np.maximum(np.abs(profits), cfg['MIN_PROFIT_MARGIN'])
+        prime = np.asarray(scores) > 0.75
+        return ((np.abs(rates - cfg['GLOBAL_MIN_RATE']) > band) & (np.abs(rates - cfg['GLOBAL_MAX_RATE']) > band)
+                & ~(prime & (np.abs(rates - cfg['PRIME_MAX_RATE']) <= band))
+                & (np.abs(profits - cfg['MIN_PROFIT_MARGIN']) > profit_band))
+
+    def _scalar_interpolate(self, pd, risk_score, loan_amt, term_years, cost_of_funds, seg):
+        """Pure-Python _interpolate for one quote (no NumPy call overhead); None when it must fall back."""
+        k = self._term_index.get(term_years)
+        margin = self.boundary_margin
+        if k is None or -margin < risk_score - 0.4 < margin or -margin < risk_score - 0.75 < margin:
+            return None
+        lows, scale, points = self._lows, self._scale, self._points
+        u_pd = (pd - lows[0]) * scale[0]
+        u_score = (risk_score - self._score_lows[seg]) * self._score_scale[seg]
+        u_amount = (loan_amt - lows[2]) * scale[2]
+        u_cof = (cost_of_funds - lows[3]) * scale[3]
+        if not (0.0 <= u_pd <= points[0] - 1 and 0.0 <= u_score <= points[1] - 1
+                and 0.0 <= u_amount <= points[2] - 1 and 0.0 <= u_cof <= points[3] - 1):
+            return None
+        i_pd = min(int(u_pd), points[0] - 2)
+        i_score = min(int(u_score), points[1] - 2)
+        i_amount = min(int(u_amount), points[2] - 2)
+
+        rates, ppds, cells = self._cof_slice(cost_of_funds)
+        block = seg * len(self.terms) + k
+        cs = self._cell_strides
+        if not cells[block * self._cell_block + i_pd * cs[0] + i_score * cs[1] + i_amount]:
+            return None
+
+        t_pd, t_score, t_amount = u_pd - i_pd, u_score - i_score, u_amount - i_amount
+        w00, w01 = (1.0 - t_pd) * (1.0 - t_score), (1.0 - t_pd) * t_score
+        w10, w11 = t_pd * (1.0 - t_score), t_pd * t_score
+        a0 = 1.0 - t_amount
+
+        # Unrolled trilinear interpolation over the 8 (pd, score, amount) corners
+        s_pd, s_score = self._strides
+        j00 = block * self._block + i_pd * s_pd + i_score * s_score + i_amount
+        j01, j10 = j00 + s_score, j00 + s_pd
+        j11 = j10 + s_score
+        rate = (w00 * (a0 * rates[j00] + t_amount * rates[j00 + 1])
+                + w01 * (a0 * rates[j01] + t_amount * rates[j01 + 1])
+                + w10 * (a0 * rates[j10] + t_amount * rates[j10 + 1])
+                + w11 * (a0 * rates[j11] + t_amount * rates[j11 + 1]))
+        ppd = (w00 * (a0 * ppds[j00] + t_amount * ppds[j00 + 1])
+               + w01 * (a0 * ppds[j01] + t_amount * ppds[j01 + 1])
+               + w10 * (a0 * ppds[j10] + t_amount * ppds[j10 + 1])
+               + w11 * (a0 * ppds[j11] + t_amount * ppds[j11 + 1]))
+        return rate, ppd * loan_amt
+
+    def lookup(self, pd, risk_score, loan_amt, term_years=3, cost_of_funds=None):
+        """
+        Prices one quote from its (stressed) PD. Returns the get_optimal_rate() keys, minus
+        'curve_data', plus 'source': 'surface' or 'exact' (fallback).
+        """
+        engine = self.engine
+        cfg = engine.policy_config
+        if cost_of_funds is None:
+            cost_of_funds = engine.cost_of_funds
+        # Plain floats: NumPy scalar arithmetic is several times slower than Python's
+        pd, risk_score, loan_amt, cost_of_funds = float(pd), float(risk_score), float(loan_amt), float(cost_of_funds)
+        if pd > cfg['MAX_PD_THRESHOLD']:
+            return {
+                'decision': 'REJECT_RISK',
+                'optimal_rate': 0.0,
+                'max_profit': 0.0,
+                'prob_default': pd,
+                'risk_segment': 'High Risk',
+                'policy_notes': ["Pre-optimization PD Check"],
+                'source': 'surface',
+            }
+
+        segment = engine._determine_segment(risk_score)
+        seg = 0 if segment == 'Subprime' else 1 if segment == 'NearPrime' else 2
+        point = self._scalar_interpolate(pd, risk_score, loan_amt, term_years, cost_of_funds, seg) \
+            if self._fresh() else None
+        source = 'surface'
+        if point is not None:
+            raw_rate, max_profit = point
+            band = 2 * self.rate_tolerance
+            profit_band = 2 * self.profit_tolerance * max(abs(max_profit), cfg['MIN_PROFIT_MARGIN'])
+            if (abs(raw_rate - cfg['GLOBAL_MIN_RATE']) <= band or abs(raw_rate - cfg['GLOBAL_MAX_RATE']) <= band
+                    or (seg == 2 and abs(raw_rate - cfg['PRIME_MAX_RATE']) <= band)
+                    or abs(max_profit - cfg['MIN_PROFIT_MARGIN']) <= profit_band):
+                point = None
+        if point is None:
+            rates, profits = _exact_rates(engine, np.array([pd], dtype=float), np.array([risk_score], dtype=float),
+                                          np.array([loan_amt], dtype=float), np.array([term_years], dtype=float),
+                                          cost_of_funds)
+            raw_rate, max_profit = rates[0], profits[0]
+            source = 'exact'
+
+        decision, final_rate, notes = engine._apply_governance(raw_rate, pd, segment, max_profit)
+        return {
+            'optimal_rate': final_rate,
+            'max_profit': max_profit,
+            'decision': decision,
+            'prob_default': pd,
+            'risk_segment': segment,
+            'policy_notes': notes,
+            'source': source,
+        }
+
+    def quote(self, applicant_data, pd_multiplier=1.0, cost_of_funds=None):
+        """get_optimal_rate() with the rate search replaced by lookup(); PD still comes from Brain 1."""
+        engine = self.engine
+        pd_prob = min(engine._predict_pd_matrix(engine._risk_matrix(applicant_data))[0] * pd_multiplier, 1.0)
+        return self.lookup(pd_prob, applicant_data.get('risk_score_norm', 0.5),
+                           applicant_data.get('LoanOriginalAmount', 15000), applicant_data.get('term_years', 3),
+                           cost_of_funds)
+
+    def lookup_many(self, pds, risk_scores, loan_amts, term_years, cost_of_funds=None, index=None):
+        """Vectorized lookup(); returns a DataFrame shaped like get_optimal_rates() plus 'source'."""
+        engine = self.engine
+        cfg = engine.policy_config
+        pds, risk_scores, loan_amts, term_years = (np.asarray(x, dtype=float)
+                                                    for x in (pds, risk_scores, loan_amts, term_years))
+        if cost_of_funds is None:
+            cost_of_funds = engine.cost_of_funds
+        cofs = np.broadcast_to(np.asarray(cost_of_funds, dtype=float), pds.shape)
+
+        raw_rates, profits, served = self._interpolate(pds, risk_scores, loan_amts, term_years, cofs)
+        high_risk = pds > cfg['MAX_PD_THRESHOLD']
+        served &= self._outside_guard_bands(raw_rates, profits, risk_scores) & self._fresh()
+        fallback = np.flatnonzero(~served & ~high_risk)
+        if len(fallback):
+            raw_rates[fallback], profits[fallback] = _exact_rates(
+                engine, pds[fallback], risk_scores[fallback], loan_amts[fallback], term_years[fallback], cofs[fallback]
+            )
+
+        segments = np.array(SEGMENTS, dtype=object)[engine._segment_index(risk_scores)]
+        decisions, final_rates, notes = engine._apply_governance_batch(raw_rates, pds, segments, profits)
+        segments[high_risk] = 'High Risk'
+        profits[high_risk] = 0.0
+        for i in np.flatnonzero(high_risk):
+            notes[i] = ["Pre-optimization PD Check"]
+        return pd.DataFrame({
+            'optimal_rate': final_rates,
+            'max_profit': profits,
+            'decision': decisions,
+            'prob_default': pds,
+            'risk_segment': segments,
+            'policy_notes': notes,
+            'source': np.where(served | high_risk, 'surface', 'exact'),
+        }, index=index)
+
+
+def _exact_rates(engine, pd_probs, risk_scores, loan_amts, term_years, cost_of_funds=None, chunk_size=50000):
+    """The engine's continuous optimizer, in chunks; cost_of_funds may be a scalar or one value per row."""
+    n = len(pd_probs)
+    if cost_of_funds is not None and np.ndim(cost_of_funds) == 1:
+        cost_of_funds = np.asarray(cost_of_funds, dtype=float)[:, None]
+    rates, profits = np.empty(n), np.empty(n)
+    for start in range(0, n, chunk_size):
+        sl = slice(start, start + chunk_size)
+        cof = cost_of_funds[sl] if np.ndim(cost_of_funds) == 2 else cost_of_funds
+        rates[sl], profits[sl] = engine._refine_rates(pd_probs[sl], risk_scores[sl], loan_amts[sl],
+                                                      term_years[sl], cof)
+    return rates, profits
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Build the precomputed pricing surface')
+    parser.add_argument('--out', default=os.path.join(ROOT, 'models/pricing_surface.npz'))
+    parser.add_argument('--risk-model', default=os.path.join(ROOT, 'models/risk_model_xgb.pkl'))
+    parser.add_argument('--elasticity-model', default=os.path.join(ROOT, 'models/elasticity_model_logit.pkl'))
+    parser.add_argument('--artifact-dir', default=None, help='Build from fast-start artifacts instead of the pickles')
+    parser.add_argument('--pd-points', type=int, default=DEFAULT_GRID['pd_points'])
+    parser.add_argument('--score-points', type=int, default=DEFAULT_GRID['score_points'],
+                        help='Score grid points per risk segment')
+    parser.add_argument('--amount', type=float, nargs=3, default=DEFAULT_GRID['amount'],
+                        metavar=('LOW', 'HIGH', 'POINTS'))
+    parser.add_argument('--terms', type=float, nargs='+', default=DEFAULT_GRID['terms'],
+                        help='Loan terms (years) to tabulate; other terms are priced exactly')
+    parser.add_argument('--cof', type=float, nargs=3, default=DEFAULT_GRID['cost_of_funds'],
+                        metavar=('LOW', 'HIGH', 'POINTS'), help='Cost of Funds axis')
+    parser.add_argument('--rate-tolerance', type=float, default=1e-4, help='Max rate error per cell (1e-4 = 1bp)')
+    parser.add_argument('--profit-tolerance', type=float, default=1e-3, help='Max relative profit error per cell')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    print("⏳ Initializing Adaptive Pricing Engine...")
+    try:
+        if args.artifact_dir:
+            engine = LoanPricingEngine(artifact_dir=args.artifact_dir, optimizer='continuous')
+        else:
+            engine = LoanPricingEngine(args.risk_model, args.elasticity_model, optimizer='continuous')
+    except FileNotFoundError as e:
+        print(f"❌ CRITICAL ERROR: Model files not found. {e}")
+        sys.exit(1)
+
+    def axis(spec):
+        return (spec[0], spec[1], int(spec[2]))
+
+    print("⏳ Building pricing surface...")
+    started = time.perf_counter()
+    surface = PricingSurface.build(engine, pd_points=args.pd_points, score_points=args.score_points,
+                                   amount=axis(args.amount), terms=args.terms,
+                                   cost_of_funds=axis(args.cof), rate_tolerance=args.rate_tolerance,
+                                   profit_tolerance=args.profit_tolerance)
+    surface.save(args.out)
+    bound = surface.error_bound
+    print(f"✅ Surface (format v{SURFACE_VERSION}, {surface.rate.size:,} nodes) built in "
+          f"{time.perf_counter() - started:.1f}s and saved to: {args.out}")
+    print(f"   Cells within tolerance: {surface.cell_ok.mean():.1%}")
+    print(f"   Served from surface: {bound['served_fraction']:.1%} of {bound['validation_points']} random quotes")
+    print(f"   Rate error: max {bound['max_rate_error'] * 1e4:.3f}bp, p99 {bound['p99_rate_error'] * 1e4:.3f}bp")
+    print(f"   Profit error: max {bound['max_profit_error']:.2e}, p99 {bound['p99_profit_error']:.2e} (relative)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,178 @@
+import os
+import argparse
+
 import pandas as pd
 import numpy as np
-import tqdm  
+import tqdm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Prosper columns carried into the synthetic set: what the EDA and feature-engineering
+# notebooks (03, 05) read to build the elasticity model's training data
+KEEP_COLUMNS = [
+    'BorrowerRate',
+    'LoanOriginalAmount',
+    'Term',
+    'ProsperScore',
+    'CreditScoreRangeLower',
+    'DebtToIncomeRatio',
+    'StatedMonthlyIncome',
+    'EmploymentStatus',
+    'IsBorrowerHomeowner',
+    'FirstRecordedCreditLine',
+    'ListingCreationDate',
+]
+
+# Read as float so every chunk (and every Parquet row group) gets the same dtype, NaNs or not
+FLOAT_COLUMNS = ['BorrowerRate', 'ProsperScore', 'CreditScoreRangeLower', 'DebtToIncomeRatio',
+                 'StatedMonthlyIncome']
 
-try:
-    prosper = pd.read_csv("data/prosperLoanData.csv")
-except FileNotFoundError:
-    prosper = pd.read_csv("ProsperLoanData.csv")
+FUNDED_STATUSES = ['Completed', 'Current', 'Paid']
 
-funded_loans = prosper[prosper['LoanStatus'].isin(['Completed', 'Current', 'Paid'])].copy()
 
 def generate_rates():
     """Generates a fixed grid of interest rates from 5% to 40%."""
     return np.linspace(0.05, 0.40, 15)
 
-def acceptance_probability(offered_rate, actual_rate, alpha=30):
-    """Calculates probability of acceptance with strict price sensitivity."""
-    if offered_rate <= actual_rate:
-        return min(0.99, 0.95 + np.random.normal(0, 0.01))
-    
-    diff = offered_rate - actual_rate
-    prob = 1.0 / (1.0 + np.exp(alpha * diff))
-    return prob
 
-print(f"Generating synthetic data for {len(funded_loans)} loans...")
+def acceptance_probability(offered_rates, actual_rates, noise, alpha=30):
+    """
+    Calculates probability of acceptance with strict price sensitivity, for a whole
+    loans x rates grid at once. `noise` is N(0, 0.01) jitter for at-or-below-market offers.
+    """
+    diff = offered_rates - actual_rates
+    sigmoid = 1.0 / (1.0 + np.exp(alpha * diff))
+    return np.where(offered_rates <= actual_rates, np.minimum(0.99, 0.95 + noise), sigmoid)
+
+
+def simulate_chunk(loans, rates, noise_rng, accept_rng, alpha=30):
+    """
+    Expands one chunk of funded loans into len(loans) x len(rates) synthetic offers
+    (loan-major, same row order as the original row-by-row loop).
+    """
+    n_loans, n_rates = len(loans), len(rates)
+    if 'BorrowerRate' in loans.columns:
+        actual_rates = loans['BorrowerRate'].to_numpy(dtype=float)
+    else:
+        actual_rates = np.full(n_loans, 0.15)
+
+    # Both streams are consumed strictly in row order, so output doesn't depend on chunk size
+    noise = noise_rng.normal(0, 0.01, size=(n_loans, n_rates))
+    uniforms = accept_rng.random(size=(n_loans, n_rates))
 
-synthetic_rows = []
-iter_data = funded_loans
+    prob_accept = acceptance_probability(rates[None, :], actual_rates[:, None], noise, alpha=alpha)
+    accepted = (uniforms < prob_accept).astype(np.int64)
 
+    synthetic = loans.iloc[np.repeat(np.arange(n_loans), n_rates)].reset_index(drop=True)
+    synthetic['OfferedRate'] = np.tile(rates, n_loans)
+    synthetic['Accepted'] = accepted.ravel()
+    synthetic['True_Prob_Accept'] = prob_accept.ravel()
+    return synthetic
+
+
+class ChunkWriter:
+    """Appends DataFrame chunks to one CSV or Parquet file (chosen by extension)."""
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith('.parquet')
+        self._writer = None
+        self._header = True
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = pa.Table.from_pandas(df, schema=self._writer.schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode='a', header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def generate_synthetic_data(input_path, output_path, seed=42, chunk_size=10000, alpha=30, columns=None):
+    """
+    Streams the Prosper CSV in chunks, simulates 15 rate offers per funded loan and appends
+    the result to `output_path`. Memory is bounded by `chunk_size`, not by the file size.
+    The same seed always gives the same output. Returns summary stats for the calibration check.
+    """
+    columns = columns or KEEP_COLUMNS
+    available = pd.read_csv(input_path, nrows=0).columns
+    usecols = [col for col in columns if col in available] + ['LoanStatus']
+    dtype = {col: float for col in FLOAT_COLUMNS if col in usecols}
 
-for idx, row in tqdm.tqdm(iter_data.iterrows(), total=iter_data.shape[0], desc="Simulating Loans"):
-    actual_rate = row.get('BorrowerRate', row.get('InterestRate', 0.15))
-    
     rates = generate_rates()
-    
-    for r in rates:
-        prob_accept = acceptance_probability(r, actual_rate, alpha=30)
-        accepted = np.random.binomial(1, prob_accept)
-        
-        new_row = row.copy()
-        new_row['OfferedRate'] = r
-        new_row['Accepted'] = accepted
-        new_row['True_Prob_Accept'] = prob_accept 
-        
-        synthetic_rows.append(new_row)
-
-
-synthetic_df = pd.DataFrame(synthetic_rows)
-output_path = "data/Prosper_Synthetic_Elasticity.csv" 
-
-synthetic_df.to_csv(output_path, index=False)
-
-print(f"Synthetic dataset created! Shape: {synthetic_df.shape}")
-print(f"   Saved to: {output_path}")
-
-print("\n--- Calibration Check ---")
-print("Avg Acceptance at 5% Rate: ", synthetic_df[synthetic_df['OfferedRate'] <= 0.055]['Accepted'].mean())
-print("Avg Acceptance at 35% Rate:", synthetic_df[synthetic_df['OfferedRate'] >= 0.35]['Accepted'].mean())
-print("(Target: >90% at low rates, <10% at high rates)")
\ No newline at end of file
+    noise_rng, accept_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2))
+
+    writer = ChunkWriter(output_path)
+    stats = {'loans': 0, 'rows': 0, 'low_accepts': 0, 'low_rows': 0, 'high_accepts': 0, 'high_rows': 0}
+    low, high = rates <= 0.055, rates >= 0.35
+
+    try:
+        reader = pd.read_csv(input_path, usecols=usecols, dtype=dtype, chunksize=chunk_size)
+        for chunk in tqdm.tqdm(reader, desc="Simulating Loans", unit="chunk"):
+            funded = chunk[chunk['LoanStatus'].isin(FUNDED_STATUSES)].drop(columns='LoanStatus')
+            if funded.empty:
+                continue
+            synthetic = simulate_chunk(funded, rates, noise_rng, accept_rng, alpha=alpha)
+            writer.write(synthetic)
+
+            accepted = synthetic['Accepted'].to_numpy().reshape(len(funded), len(rates))
+            stats['loans'] += len(funded)
+            stats['rows'] += len(synthetic)
+            stats['low_accepts'] += int(accepted[:, low].sum())
+            stats['low_rows'] += accepted[:, low].size
+            stats['high_accepts'] += int(accepted[:, high].sum())
+            stats['high_rows'] += accepted[:, high].size
+    finally:
+        writer.close()
+
+    stats['columns'] = len(usecols) - 1 + 3
+    return stats
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Generate the synthetic price-elasticity dataset')
+    parser.add_argument('--input', default=None,
+                        help='Prosper loan CSV (default: data/prosperLoanData.csv, then ProsperLoanData.csv)')
+    parser.add_argument('--output', default=os.path.join(ROOT, 'data/Prosper_Synthetic_Elasticity.csv'),
+                        help='Output path; .parquet writes Parquet, anything else CSV')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same dataset)')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Prosper rows read per chunk')
+    parser.add_argument('--alpha', type=float, default=30, help='Price sensitivity above the market rate')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    input_path = args.input
+    if input_path is None:
+        input_path = os.path.join(ROOT, 'data/prosperLoanData.csv')
+        if not os.path.exists(input_path):
+            input_path = "ProsperLoanData.csv"
+
+    print(f"Generating synthetic data from {input_path}...")
+    stats = generate_synthetic_data(input_path, args.output, seed=args.seed, chunk_size=args.chunk_size,
+                                    alpha=args.alpha)
+
+    print(f"Synthetic dataset created! Shape: ({stats['rows']}, {stats['columns']}) from {stats['loans']} loans")
+    print(f"   Saved to: {args.output}")
+
+    print("\n--- Calibration Check ---")
+    print("Avg Acceptance at 5% Rate: ", stats['low_accepts'] / stats['low_rows'] if stats['low_rows'] else float('nan'))
+    print("Avg Acceptance at 35% Rate:", stats['high_accepts'] / stats['high_rows'] if stats['high_rows'] else float('nan'))
+    print("(Target: >90% at low rates, <10% at high rates)")
+
+
+if __name__ == "__main__":
+    main()